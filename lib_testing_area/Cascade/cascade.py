@@ -0,0 +1,239 @@
+# STD LIBRARIES
+import os
+import sys
+import copy
+import time
+import pathlib
+from typing import List
+
+# PERSONAL LIBRARIES
+sys.path.append(os.path.abspath(os.path.pardir))
+from utility_lib import picture_class, execution_handler, json_class, graph_lib
+import configuration
+import results
+import ImageHash.imagehash_test as image_hash
+import TLSH.tlsh_test as tlsh
+import OpenCV.opencv as opencv
+import OpenCV.bow as bow
+
+HASH_ALGOS = [configuration.ALGO_TYPE.A_HASH,
+              configuration.ALGO_TYPE.P_HASH,
+              configuration.ALGO_TYPE.P_HASH_SIMPLE,
+              configuration.ALGO_TYPE.D_HASH,
+              configuration.ALGO_TYPE.D_HASH_VERTICAL,
+              configuration.ALGO_TYPE.W_HASH]
+
+TLSH_ALGOS = [configuration.ALGO_TYPE.TLSH,
+              configuration.ALGO_TYPE.TLSH_NO_LENGTH]
+
+
+def get_stage_handler_class(stage_conf: configuration.Default_configuration):
+    '''
+    Give the execution handler able to run the provided stage configuration
+    :param stage_conf: configuration of one stage of the cascade
+    :return: execution handler class (not instanciated)
+    '''
+    if type(stage_conf) == configuration.ORB_default_configuration:
+        return opencv.OpenCV_execution_handler
+    elif type(stage_conf) == configuration.BoW_ORB_default_configuration:
+        return bow.BoW_execution_handler
+    elif stage_conf.ALGO in TLSH_ALGOS:
+        return tlsh.TLSH_execution_handler
+    elif stage_conf.ALGO in HASH_ALGOS:
+        return image_hash.Image_hash_execution_handler
+    else:
+        raise Exception(f"CASCADE WRAPPER : No execution handler for stage configuration {stage_conf.ALGO.name}")
+
+
+# ==== Action definition ====
+class Cascade_execution_handler(execution_handler.Execution_handler):
+    def __init__(self, conf: configuration.Cascade_default_configuration):
+        super().__init__(conf)
+        self.conf = conf
+        self.results_storage = results.Cascade_RESULTS()
+
+        # ===================================== STAGES HANDLERS =====================================
+        # Stages configurations are copied, to not modify the launcher configuration while building handlers
+        self.first_stage_handler = self.create_stage_handler(conf.FIRST_STAGE_CONFIGURATION, "FIRST_STAGE", save_pictures=False)
+        self.second_stage_handler = self.create_stage_handler(conf.SECOND_STAGE_CONFIGURATION, "SECOND_STAGE", save_pictures=True)
+
+        # Pictures are loaded by the expensive handler, which needs the richer representation
+        self.Local_Picture_class_ref = self.second_stage_handler.Local_Picture_class_ref
+        # Pictures hold features of both stages
+        self.checkpoint_attributes = self.first_stage_handler.checkpoint_attributes + self.second_stage_handler.checkpoint_attributes
+        # Drawing of results is the one of the expensive handler (matches, ransac, ...)
+        self.printer = self.second_stage_handler.printer
+
+        # Per-target shortlist and second stage ranking, to compute the recall loss of each stage
+        self.shortlist_dict = {}
+        self.ranking_dict = {}
+        self.time_first_stage_matching = 0
+        self.time_second_stage_matching = 0
+
+    def create_stage_handler(self, stage_conf: configuration.Default_configuration, stage_name: str, save_pictures: bool):
+        stage_conf = copy.deepcopy(stage_conf)
+        stage_conf.SOURCE_DIR = self.conf.SOURCE_DIR
+        stage_conf.GROUND_TRUTH_PATH = self.conf.GROUND_TRUTH_PATH
+        stage_conf.IMG_TYPE = self.conf.IMG_TYPE
+        stage_conf.MANIFEST_PATH = self.conf.MANIFEST_PATH
+        stage_conf.DECODE_CACHE_DIR = self.conf.DECODE_CACHE_DIR
+        stage_conf.DECODE_CACHE_GRAYSCALE = self.conf.DECODE_CACHE_GRAYSCALE
+        stage_conf.DECODE_CACHE_MAX_SIZE = self.conf.DECODE_CACHE_MAX_SIZE
+        stage_conf.DESCRIPTOR_STORE_DIR = self.conf.DESCRIPTOR_STORE_DIR
+        stage_conf.DESCRIPTOR_STORE_READ_ONLY = self.conf.DESCRIPTOR_STORE_READ_ONLY
+        stage_conf.OUTPUT_DIR = self.conf.OUTPUT_DIR / stage_name
+        stage_conf.SAVE_PICTURE_INSTRUCTION_LIST = self.conf.SAVE_PICTURE_INSTRUCTION_LIST if save_pictures else []
+        # Stages are not runs of their own in the results store
+        stage_conf.RESULTS_DB_PATH = None
+        stage_conf.EXPORT_TO_FOLDER = self.conf.EXPORT_TO_FOLDER
+
+        handler_class = get_stage_handler_class(stage_conf)
+        self.logger.info(f"Cascade {stage_name} handled by {handler_class.__name__}")
+
+        stage_handler = handler_class(conf=stage_conf)
+        # Durations of the stage are gathered with the ones of the cascade, under the stage name
+        stage_handler.timer = self.timer.get_child(stage_name + ".")
+        stage_handler.tracer = self.tracer
+
+        return stage_handler
+
+    # ==== Resources estimation ====
+    @staticmethod
+    def estimate_resources(conf: configuration.Cascade_default_configuration, nb_pictures: int, nb_pixels: float):
+        memory_1, preparation_time_1, pair_time_1 = get_stage_handler_class(conf.FIRST_STAGE_CONFIGURATION).estimate_resources(conf.FIRST_STAGE_CONFIGURATION, nb_pictures, nb_pixels)
+        memory_2, preparation_time_2, pair_time_2 = get_stage_handler_class(conf.SECOND_STAGE_CONFIGURATION).estimate_resources(conf.SECOND_STAGE_CONFIGURATION, nb_pictures, nb_pixels)
+
+        # Both stages are in one process, and the second stage only compares the shortlist of each target
+        memory = memory_1 + memory_2 - execution_handler.PROCESS_MEMORY
+        pair_time = pair_time_1 + pair_time_2 * min(1, conf.CASCADE_SHORTLIST_SIZE / max(nb_pictures, 1))
+
+        return memory, preparation_time_1 + preparation_time_2, pair_time
+
+    # ==== Preparation ====
+    def TO_OVERWRITE_prepare_dataset(self, picture_list):
+        self.logger.info("Prepare first stage of the cascade ... ")
+        start_time = time.time()
+        picture_list = self.first_stage_handler.TO_OVERWRITE_prepare_dataset(picture_list)
+        self.results_storage.TIME_FIRST_STAGE_PRE_COMPUTING = time.time() - start_time
+
+        self.logger.info("Prepare second stage of the cascade ... ")
+        start_time = time.time()
+        picture_list = self.second_stage_handler.TO_OVERWRITE_prepare_dataset(picture_list)
+        self.results_storage.TIME_SECOND_STAGE_PRE_COMPUTING = time.time() - start_time
+
+        return picture_list
+
+    def TO_OVERWRITE_restore_dataset(self, picture_list):
+        picture_list = self.first_stage_handler.TO_OVERWRITE_restore_dataset(picture_list)
+        picture_list = self.second_stage_handler.TO_OVERWRITE_restore_dataset(picture_list)
+        return picture_list
+
+    def TO_OVERWRITE_prepare_target_picture(self, target_picture):
+        target_picture = self.first_stage_handler.TO_OVERWRITE_prepare_target_picture(target_picture)
+        target_picture = self.second_stage_handler.TO_OVERWRITE_prepare_target_picture(target_picture)
+        return target_picture
+
+    # ==== Matching ====
+    def find_top_k_closest_pictures(self, picture_list, target_picture):
+        # Shortlist candidates with the cheap handler
+        start_time = time.time()
+        fast_sorted_picture_list = self.first_stage_handler.find_top_k_closest_pictures(picture_list, target_picture)
+        shortlist = self.get_shortlist(fast_sorted_picture_list, target_picture)
+        self.time_first_stage_matching += time.time() - start_time
+
+        self.shortlist_dict[target_picture.id] = [curr_picture.id for curr_picture in shortlist if not target_picture.is_same_picture_as(curr_picture)]
+        self.logger.debug(f"Shortlist length for {target_picture.path.name} : {len(shortlist)}")
+
+        # Re-rank the shortlist only with the expensive handler
+        start_time = time.time()
+        sorted_picture_list = self.second_stage_handler.find_top_k_closest_pictures(shortlist, target_picture)
+        self.time_second_stage_matching += time.time() - start_time
+
+        self.ranking_dict[target_picture.id] = [curr_picture.id for curr_picture in sorted_picture_list if not target_picture.is_same_picture_as(curr_picture)]
+
+        return sorted_picture_list
+
+    def get_shortlist(self, sorted_picture_list: List[picture_class.Picture], target_picture: picture_class.Picture):
+        '''
+        Keep the CASCADE_SHORTLIST_SIZE best candidates, the target picture excluded.
+        The target picture is kept in the shortlist if present, to behave as any other handler output.
+        '''
+        shortlist = []
+        nb_candidates = 0
+
+        for curr_picture in sorted_picture_list:
+            if target_picture.is_same_picture_as(curr_picture):
+                shortlist.append(curr_picture)
+            elif nb_candidates < self.conf.CASCADE_SHORTLIST_SIZE:
+                shortlist.append(curr_picture)
+                nb_candidates += 1
+
+        return shortlist
+
+    def TO_OVERWRITE_compute_distance(self, pic1: picture_class.Picture, pic2: picture_class.Picture):
+        # Final distance is the one of the expensive handler
+        return self.second_stage_handler.TO_OVERWRITE_compute_distance(pic1, pic2)
+
+    def get_checkpoint_state(self):
+        return {"shortlist_dict": self.shortlist_dict,
+                "ranking_dict": self.ranking_dict,
+                "time_first_stage_matching": self.time_first_stage_matching,
+                "time_second_stage_matching": self.time_second_stage_matching}
+
+    def set_checkpoint_state(self, state: dict):
+        self.shortlist_dict = state["shortlist_dict"]
+        self.ranking_dict = state["ranking_dict"]
+        self.time_first_stage_matching = state["time_first_stage_matching"]
+        self.time_second_stage_matching = state["time_second_stage_matching"]
+
+    def iterate_over_dataset(self, picture_list, json_handler):
+        json_handler, list_time = super().iterate_over_dataset(picture_list, json_handler)
+
+        self.results_storage.TIME_FIRST_STAGE_MATCHING = self.time_first_stage_matching
+        self.results_storage.TIME_SECOND_STAGE_MATCHING = self.time_second_stage_matching
+
+        return json_handler, list_time
+
+    # ==== Evaluation ====
+    def evaluate_JSON(self, json_handler, baseline_path):
+        json_handler = super().evaluate_JSON(json_handler, baseline_path)
+        self.evaluate_shortlists(json_handler, pathlib.Path(baseline_path))
+        return json_handler
+
+    def evaluate_shortlists(self, json_handler, baseline_path: pathlib.Path):
+        '''
+        Compute the recall loss of each stage, given the ground truth graphe.
+        First stage loses ground truth matches absent from the shortlist,
+        second stage loses ground truth matches present in the shortlist but not ranked in its top-K,
+        K being the number of ground truth matches of the target.
+        Final edges are not used : they are cut to TOP_K_EDGE per target, which would count any target
+        with more than TOP_K_EDGE ground truth matches as a loss of the second stage.
+        '''
+        ground_truth_graphe = graph_lib.Graphe()
+        ground_truth_graphe.load_from_json(json_handler.import_json(baseline_path))
+        mapping_dict = json_class.create_node_mapping(json_handler.graphe, ground_truth_graphe)
+
+        # Ground truth matches, per ground truth node
+        expected_dict = {}
+        for curr_edge in ground_truth_graphe.edges:
+            expected_dict.setdefault(curr_edge["from"], set()).add(curr_edge["to"])
+
+        nb_expected = 0
+        nb_in_shortlist = 0
+        nb_in_results = 0
+        for target_id, shortlist_ids in self.shortlist_dict.items():
+            expected = expected_dict.get(mapping_dict.get(target_id), set())
+            in_shortlist = expected & {mapping_dict.get(i) for i in shortlist_ids}
+            top_k_ids = self.ranking_dict.get(target_id, [])[:len(expected)]
+            in_results = in_shortlist & {mapping_dict.get(i) for i in top_k_ids}
+
+            nb_expected += len(expected)
+            nb_in_shortlist += len(in_shortlist)
+            nb_in_results += len(in_results)
+
+        # Prevent 0-division
+        self.results_storage.FIRST_STAGE_RECALL_LOSS = 1 - nb_in_shortlist / nb_expected if nb_expected != 0 else 0
+        self.results_storage.SECOND_STAGE_RECALL_LOSS = 1 - nb_in_results / nb_in_shortlist if nb_in_shortlist != 0 else 0
+
+        self.logger.info(f"Recall loss of first stage : {self.results_storage.FIRST_STAGE_RECALL_LOSS}")
+        self.logger.info(f"Recall loss of second stage : {self.results_storage.SECOND_STAGE_RECALL_LOSS}")
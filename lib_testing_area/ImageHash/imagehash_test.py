@@ -1,15 +1,18 @@
 # STD LIBRARIES
 import os
 import sys
+import operator
 from typing import List
 
 import imagehash
+import numpy as np
 from PIL import Image
 
 # PERSONAL LIBRARIES
 sys.path.append(os.path.abspath(os.path.pardir))
 from utility_lib import picture_class, execution_handler
 import configuration
+from . import multi_hash
 
 
 class Image_hash_execution_handler(execution_handler.Execution_handler):
@@ -17,8 +20,21 @@ class Image_hash_execution_handler(execution_handler.Execution_handler):
         super().__init__(conf)
         self.Local_Picture_class_ref = picture_class.Picture
 
+        # Packed hashes of the last list of candidates : (picture list, its length, array)
+        self.packed_hashes_cache = (None, 0, None)
+
     # ==== Action definition ====
     def TO_OVERWRITE_prepare_dataset(self, picture_list):
+        # Hashes of all image hash algorithms computed once, if enabled (see HASH_STORE_PATH)
+        hash_store = multi_hash.Hash_store.get_store(self.conf)
+        if hash_store is not None:
+            if not hash_store.open(picture_list):
+                self.logger.info("Hash pictures for all image hash algorithms ... ")
+                hash_store.write(picture_list, self.conf, self.timer)
+            for curr_picture in picture_list:
+                curr_picture.hash = hash_store.get_hash(curr_picture, self.conf.ALGO)
+            return picture_list
+
         self.logger.info("Hash pictures ... ")
         picture_list = self.hash_pictures(picture_list)
         return picture_list
@@ -29,38 +45,58 @@ class Image_hash_execution_handler(execution_handler.Execution_handler):
 
     # ==== Hashing ====
     def hash_pictures(self, picture_list: List[picture_class.Picture]):
-
-        for i, curr_picture in enumerate(picture_list):
-            # Load and Hash picture
-            self.hash_picture(curr_picture)
-            if i % 40 == 0:
-                self.logger.debug(f"Picture {i} out of {len(picture_list)}")
+        # Hashed by batches (see multi_hash.compute_batch_hashes). Pictures which can't be hashed keep a None hash.
+        hashes, valid = multi_hash.hash_pictures(picture_list, [self.conf.ALGO], self.conf, self.timer)
+        for curr_picture, packed_hash, is_valid in zip(picture_list, hashes[self.conf.ALGO], valid):
+            # TO NORMALIZE : https://fullstackml.com/wavelet-image-hash-in-python-3504fdd282b5
+            curr_picture.hash = multi_hash.to_image_hash(packed_hash) if is_valid else None
 
         return picture_list
 
     def hash_picture(self, curr_picture: picture_class.Picture):
-        try:
-            if self.conf.ALGO == configuration.ALGO_TYPE.A_HASH:  # Average
-                target_hash = imagehash.average_hash(Image.open(curr_picture.path))
-            elif self.conf.ALGO == configuration.ALGO_TYPE.P_HASH:  # Perception
-                target_hash = imagehash.phash(Image.open(curr_picture.path))
-            elif self.conf.ALGO == configuration.ALGO_TYPE.P_HASH_SIMPLE:  # Perception - simple
-                target_hash = imagehash.phash_simple(Image.open(curr_picture.path))
-            elif self.conf.ALGO == configuration.ALGO_TYPE.D_HASH:  # D
-                target_hash = imagehash.dhash(Image.open(curr_picture.path))
-            elif self.conf.ALGO == configuration.ALGO_TYPE.D_HASH_VERTICAL:  # D-vertical
-                target_hash = imagehash.dhash_vertical(Image.open(curr_picture.path))
-            elif self.conf.ALGO == configuration.ALGO_TYPE.W_HASH:  # Wavelet
-                target_hash = imagehash.whash(Image.open(curr_picture.path))
-            else:
-                raise Exception('IMAGEHASH WRAPPER : HASH_CHOICE NOT CORRECT')
+        return self.hash_pictures([curr_picture])[0]
 
-            # TO NORMALIZE : https://fullstackml.com/wavelet-image-hash-in-python-3504fdd282b5
-            curr_picture.hash = target_hash
-        except Exception as e:
-            self.logger.error("Error during hashing : " + str(e))
+    # ==== Resources estimation ====
+    @staticmethod
+    def estimate_resources(conf: configuration.Default_configuration, nb_pictures: int, nb_pixels: float):
+        memory, preparation_time, pair_time = execution_handler.Execution_handler.estimate_resources(conf, nb_pictures, nb_pixels)
+        # Hashes are compared as python objects
+        return memory, preparation_time, 2e-5
 
-        return curr_picture
+    # ==== Top K search ====
+    def find_top_k_closest_pictures(self, picture_list, target_picture):
+        packed_hashes = self.get_packed_hashes(picture_list)
+        if packed_hashes is None or target_picture.hash is None:
+            # Some pictures could not be hashed : distances per pair
+            return super().find_top_k_closest_pictures(picture_list, target_picture)
+
+        # Distances of all candidates to the target at once, identical to the ones of TO_OVERWRITE_compute_distance
+        start_ns = self.timer.start()
+        packed_target_hash = np.packbits(target_picture.hash.hash.reshape(-1))
+        # Divided by the number of bits of the candidate hashes, as TO_OVERWRITE_compute_distance
+        distance_list = (multi_hash.get_hamming_distances(packed_hashes, packed_target_hash) / (packed_hashes.shape[1] * 8 * 4)).tolist()
+        self.timer.stop("distance", start_ns, count=len(picture_list))
+
+        for curr_pic, distance in zip(picture_list, distance_list):
+            curr_pic.distance = distance
+
+        self.logger.debug("Extract top K images ... ")
+        # Stable sort : same ties ordering as get_top
+        return sorted(picture_list, key=operator.attrgetter('distance'))
+
+    def get_packed_hashes(self, picture_list: List[picture_class.Picture]):
+        '''
+        Hashes of the candidates packed in one array, None if some pictures have no hash.
+        Same list of candidates for all targets : packed once. Another list (cascade shortlists, ...) is packed again.
+        '''
+        cached_picture_list, cached_length, packed_hashes = self.packed_hashes_cache
+        if cached_picture_list is not picture_list or cached_length != len(picture_list):
+            if any(curr_pic.hash is None for curr_pic in picture_list):
+                packed_hashes = None
+            else:
+                packed_hashes = np.packbits(np.stack([curr_pic.hash.hash.reshape(-1) for curr_pic in picture_list]), axis=1)
+            self.packed_hashes_cache = (picture_list, len(picture_list), packed_hashes)
+        return packed_hashes
 
     def TO_OVERWRITE_compute_distance(self, pic1: picture_class.Picture, pic2: picture_class.Picture):
         #TODO : To review if we divide by 2 or not. * 0.5
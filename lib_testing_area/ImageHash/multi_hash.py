@@ -0,0 +1,199 @@
+import logging
+import pathlib
+from typing import List
+
+import imagehash
+import numpy as np
+import scipy.fft
+from PIL import Image
+
+from utility_lib import picture_class, decode_cache_lib, filesystem_lib
+import configuration
+
+HASH_STORE_FILE = "image_hashes.npz" # In the output folder of the image hash configurations
+HASH_SIZE = 8 # Default of imagehash : 8 x 8 bits
+HIGHFREQ_FACTOR = 4 # Default of imagehash p-hashes : DCT of 32 x 32 thumbnails
+BATCH_SIZE = 256 # Pictures decoded and hashed together : their gray levels and thumbnails are in memory at the same time
+BIT_COUNT_TABLE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8) # Number of set bits of each byte
+
+IMAGE_HASH_ALGOS = [configuration.ALGO_TYPE.A_HASH,
+                    configuration.ALGO_TYPE.P_HASH,
+                    configuration.ALGO_TYPE.P_HASH_SIMPLE,
+                    configuration.ALGO_TYPE.D_HASH,
+                    configuration.ALGO_TYPE.D_HASH_VERTICAL,
+                    configuration.ALGO_TYPE.W_HASH]
+
+
+def compute_batch_hashes(gray_image_list: List[Image.Image], algo_list: List[configuration.ALGO_TYPE]):
+    '''
+    Hashes of a batch of pictures (in gray levels) for several algorithms, bit-identical to the ones of imagehash.
+    Thumbnails are resized as imagehash does, once per size for all algorithms, and stacked in (N, h, w) arrays.
+    Average, difference and perceptual hashes are then computed for the whole batch at once. Wavelet hashes are computed per picture.
+    :return: {algo : packed hashes (N, HASH_SIZE * HASH_SIZE / 8), bits in imagehash order}
+    '''
+    thumbnails = {}
+
+    def get_thumbnails(size):
+        # resize(w, h), but arrays are (h, w)
+        if size not in thumbnails:
+            thumbnails[size] = np.stack([np.asarray(gray_image.resize(size, imagehash.ANTIALIAS)) for gray_image in gray_image_list])
+        return thumbnails[size]
+
+    hashes = {}
+    for algo in algo_list:
+        if algo == configuration.ALGO_TYPE.A_HASH:
+            pixels = get_thumbnails((HASH_SIZE, HASH_SIZE))
+            diff = pixels > pixels.mean(axis=(1, 2), keepdims=True)
+        elif algo == configuration.ALGO_TYPE.P_HASH:
+            pixels = get_thumbnails((HASH_SIZE * HIGHFREQ_FACTOR, HASH_SIZE * HIGHFREQ_FACTOR)).astype(np.float64)
+            dct_low_freq = scipy.fft.dct(scipy.fft.dct(pixels, axis=1), axis=2)[:, :HASH_SIZE, :HASH_SIZE]
+            diff = dct_low_freq > np.median(dct_low_freq.reshape(len(gray_image_list), -1), axis=1)[:, None, None]
+        elif algo == configuration.ALGO_TYPE.P_HASH_SIMPLE:
+            pixels = get_thumbnails((HASH_SIZE * HIGHFREQ_FACTOR, HASH_SIZE * HIGHFREQ_FACTOR)).astype(np.float64)
+            dct_low_freq = scipy.fft.dct(pixels, axis=2)[:, :HASH_SIZE, 1:HASH_SIZE + 1]
+            diff = dct_low_freq > dct_low_freq.mean(axis=(1, 2), keepdims=True)
+        elif algo == configuration.ALGO_TYPE.D_HASH:
+            pixels = get_thumbnails((HASH_SIZE + 1, HASH_SIZE))
+            diff = pixels[:, :, 1:] > pixels[:, :, :-1]
+        elif algo == configuration.ALGO_TYPE.D_HASH_VERTICAL:
+            pixels = get_thumbnails((HASH_SIZE, HASH_SIZE + 1))
+            diff = pixels[:, 1:, :] > pixels[:, :-1, :]
+        elif algo == configuration.ALGO_TYPE.W_HASH:
+            # Scale chosen by imagehash from the size of each picture : no common thumbnail
+            diff_list = []
+            for gray_image in gray_image_list:
+                image_scale = max(2 ** int(np.log2(min(gray_image.size))), HASH_SIZE)
+                diff_list.append(imagehash.whash(gray_image.resize((image_scale, image_scale), imagehash.ANTIALIAS), image_scale=image_scale).hash)
+            diff = np.array(diff_list, dtype=bool).reshape(len(gray_image_list), HASH_SIZE, HASH_SIZE)
+        else:
+            raise Exception('IMAGEHASH WRAPPER : HASH_CHOICE NOT CORRECT')
+
+        hashes[algo] = np.packbits(diff.reshape(len(gray_image_list), -1), axis=1)
+
+    return hashes
+
+
+def hash_pictures(picture_list: List[picture_class.Picture], algo_list: List[configuration.ALGO_TYPE], conf: configuration.Default_configuration, timer=None):
+    '''
+    Hash pictures by batches (see compute_batch_hashes). Pictures which can't be decoded are logged and skipped.
+    :return: {algo : packed hashes (nb pictures, HASH_SIZE * HASH_SIZE / 8)}, valid (nb pictures,) False for skipped pictures
+    '''
+    logger = logging.getLogger('__main__.' + __name__)
+    hashes = {algo: np.zeros((len(picture_list), HASH_SIZE * HASH_SIZE // 8), dtype=np.uint8) for algo in algo_list}
+    valid = np.zeros(len(picture_list), dtype=bool)
+
+    for batch_start in range(0, len(picture_list), BATCH_SIZE):
+        start_ns = timer.start() if timer is not None else None
+
+        index_list, gray_image_list = [], []
+        for i in range(batch_start, min(batch_start + BATCH_SIZE, len(picture_list))):
+            try:
+                gray_image_list.append(decode_cache_lib.load_pil(picture_list[i].path, conf).convert('L'))
+                index_list.append(i)
+            except Exception as e:
+                logger.error(f"Error during hashing of {picture_list[i].path.name} : {e}")
+
+        try:
+            batch_hashes = compute_batch_hashes(gray_image_list, algo_list)
+        except Exception as e:
+            # Hashed one by one : only the faulty pictures are skipped
+            logger.debug(f"Batch hashing failed, pictures hashed one by one : {e}")
+            batch_hashes = None
+
+        for j, i in enumerate(index_list):
+            try:
+                curr_hashes = {algo: packed_hashes[j] for algo, packed_hashes in batch_hashes.items()} if batch_hashes is not None \
+                              else {algo: packed_hashes[0] for algo, packed_hashes in compute_batch_hashes([gray_image_list[j]], algo_list).items()}
+            except Exception as e:
+                logger.error(f"Error during hashing of {picture_list[i].path.name} : {e}")
+                continue
+            for algo, packed_hash in curr_hashes.items():
+                hashes[algo][i] = packed_hash
+            valid[i] = True
+
+        if timer is not None:
+            timer.stop("hash", start_ns, count=len(index_list))
+        logger.debug(f"Picture {batch_start + BATCH_SIZE} out of {len(picture_list)}")
+
+    return hashes, valid
+
+
+def to_image_hash(packed_hash: np.ndarray):
+    return imagehash.ImageHash(np.unpackbits(packed_hash).reshape(HASH_SIZE, HASH_SIZE).astype(bool))
+
+
+def get_hamming_distances(packed_hashes: np.ndarray, packed_target_hash: np.ndarray):
+    '''
+    Number of different bits between each packed hash and the target one, as abs(hash_1 - hash_2) of imagehash
+    '''
+    return BIT_COUNT_TABLE[packed_hashes ^ packed_target_hash].sum(axis=1, dtype=np.int64)
+
+
+class Hash_store():
+    '''
+    Hashes of a dataset for all image hash algorithms, computed together (see compute_batch_hashes) : each picture is decoded once for all configurations.
+    Stored packed (8 bytes per hash) in one file, read by the configuration of each algorithm instead of hashing again.
+    '''
+
+    def __init__(self, store_path: pathlib.Path, variant: str = ""):
+        self.logger = logging.getLogger('__main__.' + __name__)
+        self.store_path = pathlib.Path(store_path)
+        # Pictures decoded otherwise (see DECODE_CACHE_DIR) may give other hashes : stored hashes are of one decoding only
+        self.variant = variant
+
+        self.rows = {} # picture key : row
+        self.valid = None # False for pictures which could not be hashed
+        self.hashes = {} # algo name : packed hashes (nb pictures, HASH_SIZE * HASH_SIZE / 8)
+
+    @staticmethod
+    def get_store(conf: configuration.Default_configuration):
+        # Store of the configuration, None if disabled
+        if conf.HASH_STORE_PATH is None:
+            return None
+        variant = "FILE" if conf.DECODE_CACHE_DIR is None else f"CACHE|{conf.DECODE_CACHE_GRAYSCALE}|{conf.DECODE_CACHE_MAX_SIZE}"
+        return Hash_store(conf.HASH_STORE_PATH, variant=variant)
+
+    def open(self, picture_list: List[picture_class.Picture]):
+        '''
+        Load the stored hashes, if they cover all these pictures
+        :return: True if loaded
+        '''
+        try:
+            with np.load(str(self.store_path)) as data:
+                if str(data["VARIANT"]) != self.variant:
+                    return False
+                rows = {key: i for i, key in enumerate(data["PICTURES"].tolist())}
+                if any(filesystem_lib.get_picture_key(curr_picture.path) not in rows for curr_picture in picture_list):
+                    return False
+                self.valid = data["VALID"]
+                self.hashes = {algo.name: data[algo.name] for algo in IMAGE_HASH_ALGOS}
+        except (OSError, ValueError, KeyError) as e:
+            # Absent, outdated or written meanwhile : pictures are hashed (again)
+            self.logger.debug(f"Hash store {self.store_path} not opened : {e}")
+            return False
+
+        self.rows = rows
+        return True
+
+    def write(self, picture_list: List[picture_class.Picture], conf: configuration.Default_configuration, timer=None):
+        '''
+        Hash all pictures for all image hash algorithms, write the hashes and load them
+        '''
+        hashes, valid = hash_pictures(picture_list, IMAGE_HASH_ALGOS, conf, timer)
+
+        arrays = {algo.name: packed_hashes for algo, packed_hashes in hashes.items()}
+        arrays.update(VARIANT=np.array(self.variant), PICTURES=np.array([filesystem_lib.get_picture_key(p.path) for p in picture_list]), VALID=valid)
+        filesystem_lib.atomic_write(self.store_path, lambda tmp_path: np.savez(str(tmp_path), **arrays))
+
+        self.logger.info(f"Hashes of {len(picture_list)} pictures for {len(IMAGE_HASH_ALGOS)} algorithms written to {self.store_path}")
+        if not self.open(picture_list):
+            raise Exception(f"Impossible to open the hash store just written : {self.store_path}")
+
+    def get_hash(self, curr_picture: picture_class.Picture, algo: configuration.ALGO_TYPE):
+        '''
+        :return: stored hash of the picture, as an imagehash.ImageHash. None if it could not be hashed
+        '''
+        i = self.rows[filesystem_lib.get_picture_key(curr_picture.path)]
+        if not self.valid[i]:
+            return None
+        return to_image_hash(self.hashes[algo.name][i])
@@ -13,7 +13,7 @@ import numpy as np
 
 # PERSONAL LIBRARIES
 sys.path.append(os.path.abspath(os.path.pardir))
-from utility_lib import filesystem_lib, printing_lib, picture_class, execution_handler, json_class
+from utility_lib import filesystem_lib, printing_lib, picture_class, execution_handler, json_class, decode_cache_lib
 import configuration
 
 
@@ -23,8 +23,8 @@ class Local_Picture(picture_class.Picture):
         if path is None or path == "":
             raise Exception("Path specified void")
             return None
-        image = cv2.imread(str(path))
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)  # Convert from cv's BRG default color order to RGB
+        # From the decoded pictures cache if enabled (see DECODE_CACHE_DIR)
+        image = decode_cache_lib.load_rgb(path, self.conf)
 
         return image
 
@@ -34,6 +34,8 @@ class BoW_execution_handler(execution_handler.Execution_handler):
     def __init__(self, conf: configuration.BoW_ORB_default_configuration):
         super().__init__(conf)
         self.Local_Picture_class_ref = Local_Picture
+        # Description of a prepared picture is its histogram over the vocabulary, which is not needed anymore for a full test
+        self.checkpoint_attributes = ["key_points", "description"]
         self.conf = conf
 
         # self.printer = Custom_printer(self.conf)
@@ -62,6 +64,23 @@ class BoW_execution_handler(execution_handler.Execution_handler):
 
         return picture_list
 
+    # ==== Resources estimation ====
+    @staticmethod
+    def estimate_resources(conf: configuration.BoW_ORB_default_configuration, nb_pictures: int, nb_pixels: float):
+        memory, preparation_time, pair_time = execution_handler.Execution_handler.estimate_resources(conf, nb_pictures, nb_pixels)
+
+        # Decoded RGB picture, descriptors and histogram of each picture are kept
+        memory += nb_pictures * (nb_pixels * 3 + conf.ORB_KEYPOINTS_NB * 32 + conf.BOW_SIZE * 4)
+        # The trainer stores all descriptors as float32, and the vocabulary
+        memory += nb_pictures * conf.ORB_KEYPOINTS_NB * 32 * 4 + conf.BOW_SIZE * 32 * 4
+
+        # Keypoints detection, then clustering of all descriptors
+        preparation_time = preparation_time * 5 + nb_pictures * conf.ORB_KEYPOINTS_NB * conf.BOW_SIZE * 1e-8
+        # Histograms comparison
+        pair_time = 1e-5 + conf.BOW_SIZE * 1e-8
+
+        return memory, preparation_time, pair_time
+
     # ==== Descriptors ====
     def describe_pictures(self, picture_list: List[Local_Picture]):
         clean_picture_list = []
@@ -69,7 +88,8 @@ class BoW_execution_handler(execution_handler.Execution_handler):
         for i, curr_picture in enumerate(picture_list):
 
             # ===================================== GIVE DESCRIPTORS FOR ONE PICTURE =====================================
-            self.describe_picture(curr_picture)
+            with self.tracer.span("describe_picture", "prepare", sampled=True, args={"picture": curr_picture.path.name}):
+                self.describe_picture(curr_picture)
 
             if i % 40 == 0:
                 self.logger.info(f"Picture {i} out of {len(picture_list)}")
@@ -93,18 +113,21 @@ class BoW_execution_handler(execution_handler.Execution_handler):
         # TODO : ONLY KDTREE FLANN ! OR BF (but does nothing)
 
         # ===================================== BOW TRAINING =====================================
-        for curr_image in picture_list:
-            self.bow_trainer.add(np.float32(curr_image.description))
+        with self.timer.stage("bow_training"):
+            for curr_image in picture_list:
+                self.bow_trainer.add(np.float32(curr_image.description))
 
-        self.vocab = self.bow_trainer.cluster().astype(picture_list[0].description.dtype)
-        self.bow_descriptor.setVocabulary(self.vocab)
+            self.vocab = self.bow_trainer.cluster().astype(picture_list[0].description.dtype)
+            self.bow_descriptor.setVocabulary(self.vocab)
 
     def describe_pictures_with_vocabulary(self, picture_list: List[Local_Picture]):
 
         # Compute new description given vocabulary
         for i, curr_picture in enumerate(picture_list):
             # keypoints = detector.detect(img, None)
+            start_ns = self.timer.start()
             description = self.bow_descriptor.compute(curr_picture.image, curr_picture.key_points)
+            self.timer.stop("bow_histogram", start_ns)
             curr_picture.description = description
 
         return picture_list
@@ -116,7 +139,9 @@ class BoW_execution_handler(execution_handler.Execution_handler):
     def describe_picture(self, curr_picture: Local_Picture):
         try:
             # Picture loading handled in picture load_image overwrite
+            start_ns = self.timer.start()
             key_points, description = self.algo.detectAndCompute(curr_picture.image, None)
+            self.timer.stop("detect_compute", start_ns)
 
             # Store representation information in the picture itself
             curr_picture.key_points = key_points
@@ -8,22 +8,53 @@ import math
 import pathlib
 import traceback
 
-from utility_lib import filesystem_lib, printing_lib, picture_class, execution_handler, json_class
+from utility_lib import filesystem_lib, printing_lib, picture_class, execution_handler, json_class, decode_cache_lib, descriptor_store_lib
 
 class Local_Picture(picture_class.Picture):
+    # Keypoints of a picture described from the descriptor store (see DESCRIPTOR_STORE_DIR), as a table slice
+    key_points_table = None
+    _key_points = None
+
+    @property
+    def key_points(self):
+        # Keypoints objects built on first use only (drawings), from the table of the store
+        if self._key_points is None and self.key_points_table is not None:
+            self._key_points = descriptor_store_lib.table_to_keypoints(self.key_points_table)
+        return self._key_points
+
+    @key_points.setter
+    def key_points(self, key_points):
+        self._key_points = key_points
 
     def load_image(self, path):
         if path is None or path == "":
             raise Exception("Path specified void")
             return None
-        image = cv2.imread(str(path))
-        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)  # Convert from cv's BRG default color order to RGB
+        # From the decoded pictures cache if enabled (see DECODE_CACHE_DIR)
+        image = decode_cache_lib.load_rgb(path, self.conf)
 
         return image
 
 class Custom_printer(printing_lib.Printer):
+    def __init__(self, conf: configuration.ORB_default_configuration, match_details: dict = None):
+        super().__init__(conf)
+        # Matches details of the pairs to draw, filled by the execution handler : {target path : {candidate path : Match_details}}
+        self.match_details = match_details if match_details is not None else {}
+
+    def get_match_details(self, curr_picture: Local_Picture, target_picture: Local_Picture):
+        details = self.match_details.get(target_picture.path, {}).get(curr_picture.path)
+        if details is None:
+            raise Exception(f"No matches details kept for {curr_picture.path.name} and target {target_picture.path.name}")
+        return details
 
     def save_pictures(self, sorted_picture_list: List[Local_Picture], target_picture: Local_Picture, file_name : pathlib.Path):
+        try:
+            self.save_pictures_from_instructions(sorted_picture_list, target_picture, file_name)
+        finally:
+            # Details of this target are not needed anymore
+            self.match_details.pop(target_picture.path, None)
+
+    def save_pictures_from_instructions(self, sorted_picture_list: List[Local_Picture], target_picture: Local_Picture, file_name : pathlib.Path):
 
         if configuration.PICTURE_SAVE_MODE.TOP3 in self.conf.SAVE_PICTURE_INSTRUCTION_LIST:
             try :
@@ -78,7 +109,8 @@ class Custom_printer(printing_lib.Printer):
         y_offset = 0
         for i in range(0, min(NB_BEST_PICTURES, len(sorted_picture_list))):
             # Get the matches
-            output = self.draw_matches(sorted_picture_list[i + offset], target_picture, sorted_picture_list[i + offset].matches)
+            details = self.get_match_details(sorted_picture_list[i + offset], target_picture)
+            output = self.draw_matches(sorted_picture_list[i + offset], target_picture, details.matches.to_dmatch_list())
 
             # img3 = cv.drawMatchesKnn(img1, kp1, img2, kp2, good, None, flags=2)
             # SAVE : tmp_img = Image.fromarray(outImg_good_matches)
@@ -118,15 +150,16 @@ class Custom_printer(printing_lib.Printer):
         y_offset = 0
         for i in range(0, min(NB_BEST_PICTURES, len(sorted_picture_list))):
             # Get the matches
+            details = self.get_match_details(sorted_picture_list[i + offset], target_picture)
             output = cv2.drawMatches(sorted_picture_list[i + offset].image, sorted_picture_list[i + offset].key_points,
                                      target_picture.image, target_picture.key_points,
-                                     sorted_picture_list[i + offset].not_filtered_matches, None, matchColor = (255,0,0))  # Draw circles.
+                                     details.not_filtered_matches.to_dmatch_list(), None, matchColor = (255,0,0))  # Draw circles.
             output = cv2.drawMatches(sorted_picture_list[i + offset].image, sorted_picture_list[i + offset].key_points,
                                      target_picture.image, target_picture.key_points,
-                                     sorted_picture_list[i + offset].matches, output,
-                                     # sorted_picture_list[i + offset].not_filtered_matches, output,
+                                     details.matches.to_dmatch_list(), output,
+                                     # details.not_filtered_matches, output,
                                      matchColor = (0,255,0), flags=1)  # Draw circles.
-                                     # matchesMask = sorted_picture_list[i + offset].matchesMask, matchColor = (0,255,0), flags=1)  # Draw circles.
+                                     # matchesMask = details.matchesMask, matchColor = (0,255,0), flags=1)  # Draw circles.
 
             tmp_img = Image.fromarray(output)
 
@@ -200,17 +233,19 @@ class Custom_printer(printing_lib.Printer):
 
         y_offset = 0
         for i in range(0, min(NB_BEST_PICTURES, len(sorted_picture_list))):
-            trans_matrix_sorted_to_target = sorted_picture_list[i + offset].transformation_matrix
-            trans_matrix_target_to_sorted = np.linalg.inv(sorted_picture_list[i + offset].transformation_matrix)
+            details = self.get_match_details(sorted_picture_list[i + offset], target_picture)
+            trans_matrix_sorted_to_target = details.transformation_matrix
+            trans_matrix_target_to_sorted = np.linalg.inv(details.transformation_matrix)
 
             # Affine version
             add_row = np.array([[0,0,1]])
-            trans_matrix_sorted_to_target_affine = np.concatenate((sorted_picture_list[i + offset].transformation_rigid_matrix, add_row), axis=0)
-            trans_matrix_target_to_sorted_affine = np.linalg.inv(np.concatenate((sorted_picture_list[i + offset].transformation_rigid_matrix, add_row), axis=0))
+            trans_matrix_sorted_to_target_affine = np.concatenate((details.transformation_rigid_matrix, add_row), axis=0)
+            trans_matrix_target_to_sorted_affine = np.linalg.inv(np.concatenate((details.transformation_rigid_matrix, add_row), axis=0))
 
             # Get the size of the current matching picture
-            h_target, w_target, d_target = target_picture.image.shape
-            h_sorted, w_sorted, d_sorted = sorted_picture_list[i + offset].image.shape
+            # Grayscale pictures (see DECODE_CACHE_GRAYSCALE) have no channel dimension
+            h_target, w_target = target_picture.image.shape[:2]
+            h_sorted, w_sorted = sorted_picture_list[i + offset].image.shape[:2]
 
             # Get the position of the 4 corners of the current matching picture
             pts_target = np.float32([[0, 0], [0, h_target - 1], [w_target - 1, h_target - 1], [w_target - 1, 0]]).reshape(-1, 1, 2)
@@ -242,7 +277,7 @@ class Custom_printer(printing_lib.Printer):
             # Draw matches side to side between picture reference and picture request
             output = cv2.drawMatches(img_sorted_affine, sorted_picture_list[i + offset].key_points,
                                      img_target_affine, target_picture.key_points,
-                                     sorted_picture_list[i + offset].matches, None)
+                                     details.matches.to_dmatch_list(), None)
 
             # Compute the transformation between picture reference and picture request (scale, and 3D angle)
             # see https://ch.mathworks.com/help/images/examples/find-image-rotation-and-scale-using-automated-feature-matching.html for details
@@ -306,8 +341,9 @@ class Custom_printer(printing_lib.Printer):
         else:
             P6 = "NONE DESCRIPTORS RIGHT "
 
-        if sorted_curr_picture.matches is not None:
-            P7 = str(len(sorted_curr_picture.matches)) + "# matches "
+        details = self.match_details.get(target_picture.path, {}).get(sorted_curr_picture.path)
+        if details is not None and details.matches is not None:
+            P7 = str(len(details.matches)) + "# matches "
         else:
             P7 = "NONE MATCHES "
 
@@ -0,0 +1,85 @@
+import cv2
+import numpy as np
+
+
+class Match_array():
+    '''
+    Matches between a query picture and a train picture, stored as NumPy arrays instead of lists of cv2.DMatch.
+    Filters and distances are computed as vectorized operations on these arrays.
+    DMatch objects are only created when a printer needs to draw the matches.
+    '''
+
+    def __init__(self, query_idx: np.ndarray, train_idx: np.ndarray, distance: np.ndarray, second_distance: np.ndarray = None):
+        self.query_idx = query_idx
+        self.train_idx = train_idx
+        self.distance = distance
+        # Only for KNN matches : distance of the second best match, NaN if there is none
+        self.second_distance = second_distance
+
+    # =========================== -------------------------- ===========================
+    #                                   CONVERSION
+
+    @staticmethod
+    def from_matches(matches):
+        '''
+        Convert the output of matcher.match() (one DMatch per query descriptor)
+        '''
+        values = np.array([(m.queryIdx, m.trainIdx, m.distance) for m in matches], dtype=np.float64).reshape(-1, 3)
+
+        return Match_array(query_idx=values[:, 0].astype(np.int32),
+                           train_idx=values[:, 1].astype(np.int32),
+                           distance=values[:, 2])
+
+    @staticmethod
+    def from_knn_matches(knn_matches):
+        '''
+        Convert the output of matcher.knnMatch() (k DMatch per query descriptor, best first)
+        Only the best match is kept, with the distance of the second best for the ratio test.
+        Query descriptors without any neighbour (empty rows, given by FLANN LSH only) are not matches and are dropped :
+        a brute force knnMatch has no empty row, and gives as many matches as the knnMatch list.
+        '''
+        values = np.array([(m[0].queryIdx, m[0].trainIdx, m[0].distance, m[1].distance if len(m) > 1 else np.nan)
+                           for m in knn_matches if len(m) > 0], dtype=np.float64).reshape(-1, 4)
+
+        return Match_array(query_idx=values[:, 0].astype(np.int32),
+                           train_idx=values[:, 1].astype(np.int32),
+                           distance=values[:, 2],
+                           second_distance=values[:, 3])
+
+    def to_dmatch_list(self):
+        '''
+        Create DMatch objects, sorted by distance (best first), e.g. to draw them with cv2.drawMatches
+        '''
+        order = np.argsort(self.distance, kind="stable")
+        return [cv2.DMatch(int(self.query_idx[i]), int(self.train_idx[i]), float(self.distance[i])) for i in order]
+
+    # =========================== -------------------------- ===========================
+    #                                   OPERATIONS
+
+    def filter(self, mask: np.ndarray):
+        '''
+        Keep only matches for which mask is True
+        '''
+        return Match_array(query_idx=self.query_idx[mask],
+                           train_idx=self.train_idx[mask],
+                           distance=self.distance[mask],
+                           second_distance=self.second_distance[mask] if self.second_distance is not None else None)
+
+    def __len__(self):
+        return len(self.distance)
+
+
+class Match_details():
+    '''
+    Matches and RANSAC transformation computed between one candidate picture and one target picture.
+    Only kept for pairs the printer draws, see OpenCV_execution_handler.keep_match_details.
+    '''
+
+    def __init__(self, not_filtered_matches: Match_array = None, matches: Match_array = None):
+        self.not_filtered_matches = not_filtered_matches
+        self.matches = matches
+
+        # Only for RANSAC filtering
+        self.transformation_matrix = None  # Transformation matrix between source and dest
+        self.transformation_rigid_matrix = None  # Rigid transformation matrix between source and dest
+        self.matchesMask = None  # Mask of matches indicating if a match is an in or outlier
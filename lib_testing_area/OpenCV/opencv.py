@@ -6,6 +6,8 @@ from typing import List
 import logging
 import pathlib
 import math
+import heapq
+import operator
 
 import cv2
 import matplotlib.pyplot as plt
@@ -13,18 +15,30 @@ import numpy as np
 
 # PERSONAL LIBRARIES
 sys.path.append(os.path.abspath(os.path.pardir))
-from utility_lib import filesystem_lib, printing_lib, picture_class, execution_handler, json_class
+from utility_lib import filesystem_lib, printing_lib, picture_class, execution_handler, json_class, descriptor_store_lib
 import configuration
 from .custom_printer import Custom_printer, Local_Picture
+from .match_array import Match_array, Match_details
+
+NB_BEST_PICTURES = 3 # Number of best pictures drawn by the printer
 
 # ==== Action definition ====
 class OpenCV_execution_handler(execution_handler.Execution_handler):
     def __init__(self, conf: configuration.ORB_default_configuration):
         super().__init__(conf)
         self.Local_Picture_class_ref = Local_Picture
+        self.checkpoint_attributes = ["key_points", "description", "key_points_coordinates"]
         self.conf = conf
 
-        self.printer = Custom_printer(self.conf)
+        # Descriptors of the dataset memory mapped from their store, if enabled (see DESCRIPTOR_STORE_DIR)
+        self.descriptor_store = descriptor_store_lib.Descriptor_store.get_store(conf)
+        if self.descriptor_store is not None:
+            # Already on disk : checkpoints only list the prepared pictures
+            self.checkpoint_attributes = []
+
+        # Matches details of the drawn pairs : {target path : {candidate path : Match_details}}
+        self.match_details = {}
+        self.printer = Custom_printer(self.conf, match_details=self.match_details)
 
         # ===================================== CROSSCHECK =====================================
         # Crosscheck can't be activated with some option. e.g. KNN match can't work with
@@ -56,16 +70,66 @@ class OpenCV_execution_handler(execution_handler.Execution_handler):
         else:
             raise Exception("DATASTRUCT value in configuration is wrong. Please review the value.")
 
+        # Only the brute force matcher applies the crosscheck : FLANN may match one target descriptor to many candidate ones
+        self.MATCHER_CROSSCHECK = self.CROSSCHECK and self.conf.DATASTRUCT == configuration.DATASTRUCT_TYPE.BRUTE_FORCE
+
     def TO_OVERWRITE_prepare_dataset(self, picture_list):
         # ===================================== PREPARE PICTURES = GIVE DESCRIPTORS =====================================
+        if self.descriptor_store is not None and self.descriptor_store.open(picture_list):
+            self.logger.info(f"Descriptors of pictures memory mapped from {self.descriptor_store.store_dir} ... ")
+            return self.attach_descriptors(picture_list)
+
         self.logger.info(f"Describe pictures from repository {self.conf.SOURCE_DIR} ... ")
-        picture_list = self.describe_pictures(picture_list)
+        described_picture_list = self.describe_pictures(picture_list)
+
+        if self.descriptor_store is not None and self.conf.DESCRIPTOR_STORE_READ_ONLY:
+            # Written by the launcher only : processes run in parallel don't write it together
+            self.logger.warning(f"Descriptor store {self.descriptor_store.store_dir} not built beforehand : descriptors kept in memory")
+        elif self.descriptor_store is not None:
+            # Per picture arrays are replaced by slices of the store, shared with other processes
+            self.descriptor_store.write(picture_list)
+            described_picture_list = self.attach_descriptors(described_picture_list)
+
+        # No datastructure to construct : pairs are matched with their own train descriptors (match(query, train)),
+        # the matcher keeps no collection of the dataset descriptors
+        return described_picture_list
+
+    def TO_OVERWRITE_restore_dataset(self, picture_list):
+        if self.descriptor_store is not None:
+            if self.descriptor_store.open(picture_list):
+                picture_list = self.attach_descriptors(picture_list)
+            elif self.conf.DESCRIPTOR_STORE_READ_ONLY:
+                # Descriptors were kept in memory only (see TO_OVERWRITE_prepare_dataset) : not in the checkpoint
+                picture_list = self.describe_pictures(picture_list)
+            else:
+                raise Exception(f"Descriptor store of the checkpointed execution not found : {self.descriptor_store.store_dir}")
+        return picture_list
 
-        # ===================================== CONSTRUCT DATASTRUCTURE =====================================
-        self.logger.info("Add cluster of trained images to matcher and train it ...")
-        self.train_on_images(picture_list)
+    def attach_descriptors(self, picture_list: List[Local_Picture]):
+        # Pictures without descriptors are removed, as by describe_pictures
+        for curr_picture in picture_list:
+            self.descriptor_store.attach(curr_picture)
+        clean_picture_list = [curr_picture for curr_picture in picture_list if curr_picture.description is not None]
 
-        return picture_list
+        if len(clean_picture_list) != len(picture_list):
+            self.logger.warning(f"{len(picture_list) - len(clean_picture_list)} pictures removed, due to lack of descriptors")
+        return clean_picture_list
+
+    # ==== Resources estimation ====
+    @staticmethod
+    def estimate_resources(conf: configuration.ORB_default_configuration, nb_pictures: int, nb_pixels: float):
+        memory, preparation_time, pair_time = execution_handler.Execution_handler.estimate_resources(conf, nb_pictures, nb_pixels)
+
+        # Decoded RGB picture, descriptors (32 bytes) and keypoints of each picture are kept
+        memory += nb_pictures * (nb_pixels * 3 + conf.ORB_KEYPOINTS_NB * 150)
+        # Keypoints detection
+        preparation_time *= 5
+        # Each descriptor is compared to each descriptor of the other picture
+        pair_time = 1e-4 + conf.ORB_KEYPOINTS_NB * conf.ORB_KEYPOINTS_NB * 2e-9
+        if conf.FILTER == configuration.FILTER_TYPE.RANSAC:
+            pair_time *= 2
+
+        return memory, preparation_time, pair_time
 
     # ==== Descriptors ====
     def describe_pictures(self, picture_list: List[Local_Picture]):
@@ -74,7 +138,8 @@ class OpenCV_execution_handler(execution_handler.Execution_handler):
         for i, curr_picture in enumerate(picture_list):
 
             # ===================================== GIVE DESCRIPTORS FOR ONE PICTURE =====================================
-            self.describe_picture(curr_picture)
+            with self.tracer.span("describe_picture", "prepare", sampled=True, args={"picture": curr_picture.path.name}):
+                self.describe_picture(curr_picture)
 
             if i % 40 == 0:
                 self.logger.info(f"Picture {i} out of {len(picture_list)}")
@@ -95,22 +160,6 @@ class OpenCV_execution_handler(execution_handler.Execution_handler):
 
         return clean_picture_list
 
-    def train_on_images(self, picture_list: List[Local_Picture]):
-        # TODO : ONLY KDTREE FLANN ! OR BF (but does nothing)
-
-        # ===================================== ALL OTHER TRAINING =====================================
-        # Construct a "magic good datastructure" as KDTree, for example.
-
-        for curr_image in picture_list:
-            self.matcher.add(curr_image.description)
-            # TODO : To decomment ? curr_image.storage = self.matcher  # Store it to allow pictures to compute it
-
-        # TODO : To decomment ? if self.conf.DATASTRUCT != configuration.DATASTRUCT_TYPE.FLANN_LSH:
-        self.matcher.train()
-        # Train: Does nothing for BruteForceMatcher though.
-        # TODO : To decomment ? else:
-        # TODO : To decomment ?     self.logger.warning("No training on the matcher : FLANN LSH selected.")
-
     def TO_OVERWRITE_prepare_target_picture(self, target_picture):
         target_picture = self.describe_picture(target_picture)
         return target_picture
@@ -118,11 +167,15 @@ class OpenCV_execution_handler(execution_handler.Execution_handler):
     def describe_picture(self, curr_picture: Local_Picture):
         try:
             # Picture loading handled in picture load_image overwrite
+            start_ns = self.timer.start()
             key_points, description = self.algo.detectAndCompute(curr_picture.image, None)
+            self.timer.stop("detect_compute", start_ns)
 
             # Store representation information in the picture itself
             curr_picture.key_points = key_points
             curr_picture.description = description
+            # Coordinates as array, to gather matched points without iterating over keypoints
+            curr_picture.key_points_coordinates = cv2.KeyPoint_convert(key_points) if key_points is not None else None
 
             if key_points is None:
                 self.logger.warning(f"WARNING : picture {curr_picture.path.name} has no keypoints")
@@ -134,48 +187,176 @@ class OpenCV_execution_handler(execution_handler.Execution_handler):
 
         return curr_picture
 
+    # ==== Top K search ====
+    def find_top_k_closest_pictures(self, picture_list, target_picture):
+        if self.is_bound_pruning_possible():
+            sorted_picture_list = self.find_top_k_closest_pictures_with_bounds(picture_list, target_picture)
+        else:
+            sorted_picture_list = super().find_top_k_closest_pictures(picture_list, target_picture)
+
+        if self.is_match_details_needed():
+            self.keep_match_details(sorted_picture_list, target_picture)
+
+        return sorted_picture_list
+
+    def find_top_k_closest_pictures_with_bounds(self, picture_list, target_picture):
+        '''
+        Give the same top-K as find_top_k_closest_pictures, without computing distances of candidates which can't reach it.
+        Skipped candidates keep a None distance, and are appended after the ranked ones, by increasing bound :
+        callers get every candidate, but only the top-K (see get_needed_top_k) is ranked by distance.
+        '''
+        # Visit candidates from the most to the least promising bound
+        for curr_pic in picture_list:
+            curr_pic.distance = None
+        bound_list = sorted(enumerate(picture_list), key=lambda x: self.get_distance_lower_bound(x[1], target_picture))
+
+        top_k = self.get_needed_top_k()
+        top_k_heap = []  # Max-heap (negated distances) of the K best distances found so far
+        nb_matched = 0
+
+        for i, curr_pic in bound_list:
+            # Bounds are sorted : if this one can't reach the top-K, none of the remaining can
+            if len(top_k_heap) >= top_k and self.get_distance_lower_bound(curr_pic, target_picture) > -top_k_heap[0]:
+                break
+
+            start_ns = self.timer.start()
+            curr_pic.distance = self.TO_OVERWRITE_compute_distance(curr_pic, target_picture)
+            self.timer.stop("distance", start_ns)
+            nb_matched += 1
+
+            if curr_pic.distance is not None:
+                heapq.heappush(top_k_heap, -curr_pic.distance)
+                if len(top_k_heap) > top_k:
+                    heapq.heappop(top_k_heap)
+
+        self.logger.debug(f"Bound pruning : {len(picture_list) - nb_matched} candidates skipped out of {len(picture_list)}")
+
+        # Candidates without distance are removed, as in the full search. Original order is kept for identical ties ordering.
+        sorted_picture_list = sorted([curr_pic for curr_pic in picture_list if curr_pic.distance is not None], key=operator.attrgetter('distance'))
+        # Pruned candidates are only known to be further than the top-K
+        sorted_picture_list += [curr_pic for i, curr_pic in bound_list[nb_matched:]]
+
+        return sorted_picture_list
+
+    def is_bound_pruning_possible(self):
+        # Post filter can change the distance in any direction : no bound is known
+        # LEN_MIN bound is never above 0 (see get_distance_lower_bound) : it can't prune anything
+        return self.conf.BOUND_PRUNING and \
+               self.conf.DISTANCE == configuration.DISTANCE_TYPE.LEN_MAX and \
+               self.conf.POST_FILTER_CHOSEN == configuration.POST_FILTER.NONE
+
+    def get_needed_top_k(self):
+        # Number of best pictures used after the search : edges of the graphe, and drawn pictures
+        top_k = json_class.TOP_K_EDGE
+        if self.conf.SAVE_PICTURE_INSTRUCTION_LIST != []:
+            top_k = max(top_k, NB_BEST_PICTURES)
+
+        # The target picture itself is part of the candidates
+        return top_k + 1
+
+    def is_match_details_needed(self):
+        # Only these drawings use matches and transformations of a pair
+        return configuration.PICTURE_SAVE_MODE.FEATURE_MATCHES_TOP3 in self.conf.SAVE_PICTURE_INSTRUCTION_LIST or \
+               configuration.PICTURE_SAVE_MODE.RANSAC_MATRIX in self.conf.SAVE_PICTURE_INSTRUCTION_LIST
+
+    def keep_match_details(self, sorted_picture_list: List[Local_Picture], target_picture: Local_Picture):
+        '''
+        Store matches details of the best pictures only, per (target, candidate) pair.
+        Details are computed again for these few pairs, instead of being kept for all pairs during the search.
+        Stored details are released by the printer, once pictures of the target are saved.
+        '''
+        curr_details = {}
+
+        # The target picture itself may be part of the best pictures
+        for curr_picture in sorted_picture_list[:NB_BEST_PICTURES + 1]:
+            _, curr_details[curr_picture.path] = self.compute_distance_and_details(curr_picture, target_picture)
+
+        self.match_details[target_picture.path] = curr_details
+
+    def get_distance_lower_bound(self, pic1: Local_Picture, pic2: Local_Picture):
+        '''
+        Give a lower bound of the distance between pic1 (candidate) and pic2 (target), from descriptors counts only.
+        Each descriptor of pic1 gets at most one match, and with a crosschecking matcher, each descriptor of pic2 too.
+        Filters only remove matches, so the number of good matches is bounded the same way.
+        LEN_MIN bound is 1 - max_good / min(len1, len2) <= 0 : given for completeness, not used for pruning.
+        '''
+        if pic1.description is None or pic2.description is None:
+            # Distance is given without any matching
+            return 0
+
+        len1 = len(pic1.description)
+        len2 = len(pic2.description)
+        max_good = min(len1, len2) if self.MATCHER_CROSSCHECK else len1
+
+        if self.conf.DISTANCE == configuration.DISTANCE_TYPE.LEN_MIN:
+            return 1 - max_good / min(len1, len2)
+        elif self.conf.DISTANCE == configuration.DISTANCE_TYPE.LEN_MAX:
+            return 1 - max_good / max(len1, len2)
+        else:
+            raise Exception('OPENCV WRAPPER : NO DISTANCE BOUND FOR THIS DISTANCE_CHOSEN')
+
     def TO_OVERWRITE_compute_distance(self, pic1: Local_Picture, pic2: Local_Picture):  # self, target
+        dist, _ = self.compute_distance_and_details(pic1, pic2)
+        return dist
+
+    def compute_distance_and_details(self, pic1: Local_Picture, pic2: Local_Picture):  # self, target
+        '''
+        Compute the distance between pic1 (candidate) and pic2 (target), and give the matches details of this pair.
+        Nothing is stored in the pictures : they are shared between all pairs.
+        :return: distance, Match_details (None if pictures have no description)
+        '''
 
         if pic1.description is None or pic2.description is None:
             if pic1.description is None and pic2.description is None:
-                return 0  # Pictures that have no description matches together
+                return 0, None  # Pictures that have no description matches together
             else:
-                return None
+                return None, None
 
-        matches = []
-        good = []
-
-        # bfmatcher is stored in Picture local storage
+        # Matcher output is converted once to arrays. Filters and distances work on these arrays.
+        start_ns = self.timer.start()
         if self.conf.MATCH == configuration.MATCH_TYPE.STD:
-            matches = self.matcher.match(pic1.description, pic2.description)
-            # self.matches = sorted(matches, key=lambda x: x.distance)  # Sort matches by distance.  Best come first.
+            matches = Match_array.from_matches(self.matcher.match(pic1.description, pic2.description))
         elif self.conf.MATCH == configuration.MATCH_TYPE.KNN:
-            if self.conf.CROSSCHECK :
+            if self.CROSSCHECK :
                 raise Exception("CROSSCHECK ACTIVATED WITH KNN_MATCH : ABORTED")
-            matches = self.matcher.knnMatch(pic1.description, pic2.description, k=self.conf.MATCH_K_FOR_KNN)
+            matches = Match_array.from_knn_matches(self.matcher.knnMatch(pic1.description, pic2.description, k=self.conf.MATCH_K_FOR_KNN))
         else:
             raise Exception('OPENCV WRAPPER : MATCH_CHOSEN NOT CORRECT')
 
             # THREESHOLD ? TODO
             # TODO : Previously MIN, test with MEAN ?
             # TODO : Test with Mean of matches.distance .. verify what are matches distance ..
+        self.timer.stop("match", start_ns)
+
+        # Matches and transformation of this pair only (the pictures are shared between all pairs)
+        details = Match_details()
 
         if self.conf.FILTER == configuration.FILTER_TYPE.NO_FILTER:
             good = matches
         # elif self.conf.FILTER == configuration.FILTER_TYPE.RATIO_BAD:
         #    good = self.ratio_bad(matches)
         elif self.conf.FILTER == configuration.FILTER_TYPE.RATIO_CORRECT:
+            start_ns = self.timer.start()
             good = self.ratio_good(matches)
+            self.timer.stop("ratio_filter", start_ns)
         elif self.conf.FILTER == configuration.FILTER_TYPE.FAR_THREESHOLD:
+            start_ns = self.timer.start()
             good = self.ratio_good(matches)
             good = self.threeshold_distance_filter(good)
+            self.timer.stop("ratio_filter", start_ns)
         # elif self.conf.FILTER == configuration.FILTER_TYPE.BASIC_THRESHOLD :
         #    good = self.threeshold_distance_filter(good)
         elif self.conf.FILTER == configuration.FILTER_TYPE.RANSAC:
-            good, _ = self.ransac_filter(matches, pic1, pic2)
+            start_ns = self.timer.start()
+            good = self.ransac_filter(matches, pic1, pic2, details)
+            self.timer.stop("ransac", start_ns)
         else:
             raise Exception('OPENCV WRAPPER : FILTER_CHOSEN NOT CORRECT')
 
+        # Matches are sorted by distance only when drawn (see Match_array.to_dmatch_list)
+        details.not_filtered_matches = matches
+        details.matches = good
+
         if self.conf.DISTANCE == configuration.DISTANCE_TYPE.LEN_MIN:  # MIN
             dist = 1 - len(good) / (min(len(pic1.description), len(pic2.description)))
         elif self.conf.DISTANCE == configuration.DISTANCE_TYPE.LEN_MAX:  # MAX
@@ -199,22 +380,17 @@ class OpenCV_execution_handler(execution_handler.Execution_handler):
             #Do nothing
             self.logger.debug("No post filtering")
         elif self.conf.POST_FILTER_CHOSEN == configuration.POST_FILTER.MATRIX_CHECK :
-            dist = self.matrix_filtering(dist, pic1, pic2)
+            start_ns = self.timer.start()
+            dist = self.matrix_filtering(dist, pic1, pic2, details)
+            self.timer.stop("matrix_filter", start_ns)
         else :
             raise Exception('OPENCV WRAPPER : POST_FILTER CHOSEN NOT CORRECT.')
 
-            # if DISTANCE_CHOSEN == DISTANCE_TYPE.RATIO_LEN or DISTANCE_CHOSEN == DISTANCE_TYPE.RATIO_TEST :
-        pic1.not_filtered_matches = sorted(matches, key=lambda x: x.distance)
-        pic1.matches = sorted(good, key=lambda x: x.distance)  # Sort matches by distance.  Best come first.
-
-        return dist
+        return dist, details
 
     @staticmethod
-    def mean_matches_dist(matches):
-        mean_dist = 0
-        for curr_match in matches:
-            mean_dist += curr_match.distance
-        mean_dist /= len(matches)
+    def mean_matches_dist(matches: Match_array):
+        mean_dist = float(np.mean(matches.distance))
 
         logging.debug(f"Current mean dist : {mean_dist}")
         return mean_dist
@@ -232,55 +408,42 @@ class OpenCV_execution_handler(execution_handler.Execution_handler):
         return good
 
     @staticmethod
-    def ratio_good(matches):
-        # Apply ratio test
-        good = []
-        for curr_matches in matches:
-            if len(curr_matches) == 0:
-                continue
-            elif len(curr_matches) == 1:
-                good.append(curr_matches[0])
-            elif curr_matches[0].distance < 0.75 * curr_matches[1].distance:
-                good.append(curr_matches[0])
-        return good
+    def ratio_good(matches: Match_array):
+        # Apply ratio test. Matches without second best match are kept.
+        if matches.second_distance is None:
+            raise Exception("OPENCV WRAPPER : RATIO TEST NEEDS KNN MATCHES")
+
+        with np.errstate(invalid='ignore'):
+            mask = np.isnan(matches.second_distance) | (matches.distance < 0.75 * matches.second_distance)
+        return matches.filter(mask)
 
     @staticmethod
-    def threeshold_distance_filter(matches):
+    def threeshold_distance_filter(matches: Match_array):
         dist_th = 64
-        good = []
-
-        for curr_matches in matches:
-            if curr_matches.distance < dist_th:
-                good.append(curr_matches)
-
-        return good
+        return matches.filter(matches.distance < dist_th)
 
-    def ransac_filter(self, matches, pic1, pic2):
+    def ransac_filter(self, matches, pic1, pic2, details: Match_details):
         '''
         Find a geomatrical transformation with RANSAC algorithms and filter outliers points thanks to the found transformation.
-        Does store the transformation matrix in the source picture (pic1).
+        Does store the transformation matrix in the details of the pair.
         '''
 
         MIN_MATCH_COUNT = 10
-        good = []
-        transformation_matrix = None
+        good = matches.filter(np.zeros(len(matches), dtype=bool))
 
         # ======================= --------------------------- =======================
         #                        Filter matches to accelerate
         # Do remove the farthest matches to greatly accelerate RANSAC
         # From : http://answers.opencv.org/question/984/performance-of-findhomography/
 
-        diminished_matches = []
-        for m in matches :
-            if m.distance < self.conf.RANSAC_ACCELERATOR_THRESHOLD :
-                diminished_matches.append(m)
+        diminished_matches = matches.filter(matches.distance < self.conf.RANSAC_ACCELERATOR_THRESHOLD)
 
         # ======================= --------------------------- =======================
         #                        Compute homography with RANSAC
 
         if len(diminished_matches) > MIN_MATCH_COUNT:
-            src_pts = np.float32([pic1.key_points[m.queryIdx].pt for m in diminished_matches]).reshape(-1, 1, 2)
-            dst_pts = np.float32([pic2.key_points[m.trainIdx].pt for m in diminished_matches]).reshape(-1, 1, 2)
+            src_pts = pic1.key_points_coordinates[diminished_matches.query_idx].reshape(-1, 1, 2)
+            dst_pts = pic2.key_points_coordinates[diminished_matches.train_idx].reshape(-1, 1, 2)
 
             # Find the transformation between points
             transformation_matrix, mask = cv2.findHomography(src_pts, dst_pts, cv2.RANSAC, 5.0)
@@ -295,32 +458,30 @@ class OpenCV_execution_handler(execution_handler.Execution_handler):
             matchesMask = mask.ravel().tolist()
 
             # Filter the matches list thanks to the mask
-            for i, element in enumerate(matchesMask):
-                if element == 1:
-                    good.append(diminished_matches[i])
+            good = diminished_matches.filter(mask.ravel() == 1)
             # h, w = pic1.image.shape
             # pts = np.float32([[0, 0], [0, h - 1], [w - 1, h - 1], [w - 1, 0]]).reshape(-1, 1, 2)
             # dst = cv2.perspectiveTransform(pts, M)
 
             # img2 = cv2.polylines(img2, [np.int32(dst)], True, 255, 3, cv2.LINE_AA)
-            pic1.transformation_matrix = transformation_matrix
-            pic1.transformation_rigid_matrix = transformation_rigid_matrix
-            pic1.matchesMask = matchesMask
+            details.transformation_matrix = transformation_matrix
+            details.transformation_rigid_matrix = transformation_rigid_matrix
+            details.matchesMask = matchesMask
 
         else:
             logger = logging.getLogger()
             logger.info(f"not enough matches between {pic1.path.name} and {pic2.path.name}")
 
-        return good, transformation_matrix
+        return good
 
-    def matrix_filtering(self, dist, pic1, pic2):
+    def matrix_filtering(self, dist, pic1, pic2, details: Match_details):
         # Ideas from :
         # - https://stackoverflow.com/questions/10972438/detecting-garbage-homographies-from-findhomography-in-opencv/10981249#10981249
         # - https://stackoverflow.com/questions/14954220/how-to-check-if-obtained-homography-matrix-is-good?noredirect=1&lq=1
         # - https://stackoverflow.com/questions/16439792/how-can-i-compute-svd-and-and-verify-that-the-ratio-of-the-first-to-last-singula?noredirect=1&lq=1
         # - https://answers.opencv.org/question/2588/check-if-homography-is-good/
 
-        if pic1.transformation_matrix is None :
+        if details.transformation_matrix is None :
             self.logger.error(f"NO TRANSFORMATION MATRIX FOR : {pic1.path.name}")
             return dist
 
@@ -330,7 +491,7 @@ class OpenCV_execution_handler(execution_handler.Execution_handler):
         Compute the determinant of the top left 2x2 homography matrix, and check if it's "too close" to zero for comfort...
         btw you can also check if it's *too *far from zero because then the invert matrix would have a determinant too close to zero.
         '''
-        det = pic1.transformation_matrix[0][0] * pic1.transformation_matrix[0][0] - pic1.transformation_matrix[1][0]*pic1.transformation_matrix[0][1]
+        det = details.transformation_matrix[0][0] * details.transformation_matrix[0][0] - details.transformation_matrix[1][0]*details.transformation_matrix[0][1]
 
         '''
         A determinant of zero would mean the matrix is not inversible, too close to zero would mean *singular
@@ -373,7 +534,7 @@ class OpenCV_execution_handler(execution_handler.Execution_handler):
 
 
         # Get the size of the current matching picture
-        h, w, d = pic1.image.shape
+        h, w = pic1.image.shape[:2]
         # Get the position of the 4 corners of the current matching picture
         pts = np.float32([[0, 0], [0, h - 1], [w - 1, h - 1], [w - 1, 0]]).reshape(-1, 1, 2)
         max = 4 * cv2.norm(np.float32([[w,h]]), cv2.NORM_L2)
@@ -382,11 +543,11 @@ class OpenCV_execution_handler(execution_handler.Execution_handler):
         dst = None
         try:
             # Transform the 4 corners thanks to the transformation matrix calculated
-            dst = cv2.perspectiveTransform(pts, pic1.transformation_matrix)
+            dst = cv2.perspectiveTransform(pts, details.transformation_matrix)
 
             # Make affine transformation
             add_row = np.array([[0,0,1]])
-            affine_matrix = np.concatenate((pic1.transformation_rigid_matrix, add_row), axis=0)
+            affine_matrix = np.concatenate((details.transformation_rigid_matrix, add_row), axis=0)
             dst_affine = cv2.perspectiveTransform(pts, affine_matrix)
 
             # Draw the transformed 4 corners on the target picture (pic2, request)
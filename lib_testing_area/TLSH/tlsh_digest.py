@@ -0,0 +1,104 @@
+import tlsh
+import numpy as np
+
+VERSION_PREFIX = "T1"
+DIGEST_HEX_LEN = 70 # After the version prefix : checksum, length, quartile ratios and 32 body bytes (default TLSH build)
+CODE_SIZE = 32
+RANGE_LVALUE = 256
+RANGE_QRATIO = 16
+
+
+def get_byte_diff_table():
+    # Distance of each pair of body bytes : sum over their 4 buckets of 2 bits, buckets 3 levels apart count for 6
+    buckets = (np.arange(256)[:, None] >> np.array([6, 4, 2, 0])) & 0x03
+    bucket_diff = np.abs(buckets[:, None, :] - buckets[None, :, :])
+    bucket_diff[bucket_diff == 3] = 6
+    return bucket_diff.sum(axis=2).astype(np.int32)
+
+BYTE_DIFF_TABLE = get_byte_diff_table() # 256 x 256
+
+
+def mod_diff(x: np.ndarray, y, r: int):
+    # Distance on a circular range, as TLSH compares lengths and ratios
+    diff = np.abs(x - y)
+    return np.minimum(diff, r - diff)
+
+
+class Digest_array():
+    '''
+    TLSH digests decoded once into NumPy arrays : checksum, length value, quartile ratios and body bytes (4 buckets of 2 bits each).
+    Distances (tlsh.diff and tlsh.diffxlen scores) of one digest to all digests are computed as vectorized operations.
+    Body bytes are stored per position (column-major) : the buckets distance is one table lookup per position for all digests.
+    Digests which can't be decoded (other TLSH builds, TNULL, ...) are compared with the tlsh module.
+    '''
+
+    def __init__(self, digest_list):
+        self.digest_list = list(digest_list)
+        self.lengths = np.array([len(digest) for digest in self.digest_list], dtype=np.float64)
+
+        raw_list = [Digest_array.decode(digest) for digest in self.digest_list]
+        self.decoded = np.array([raw is not None for raw in raw_list], dtype=bool)
+        raw = np.frombuffer(b"".join(raw if raw is not None else bytes(3 + CODE_SIZE) for raw in raw_list), dtype=np.uint8)
+        raw = raw.reshape(-1, 3 + CODE_SIZE).astype(np.int32)
+
+        # Bytes of the digest string have swapped nibbles
+        self.checksum = raw[:, 0]
+        self.l_value = ((raw[:, 1] & 0x0F) << 4) | (raw[:, 1] >> 4)
+        self.q1_ratio = raw[:, 2] >> 4
+        self.q2_ratio = raw[:, 2] & 0x0F
+        # Body bytes are reversed in the string : same order for all digests, same distance
+        self.body = np.ascontiguousarray(raw[:, 3:].T.astype(np.uint8))
+
+    @staticmethod
+    def decode(digest: str):
+        '''
+        :return: bytes of the digest (checksum, length, ratios, body), None if not a digest of the default TLSH build
+        '''
+        if digest is None:
+            return None
+        if digest.startswith(VERSION_PREFIX):
+            digest = digest[len(VERSION_PREFIX):]
+        if len(digest) != DIGEST_HEX_LEN:
+            return None
+        try:
+            return bytes.fromhex(digest)
+        except ValueError:
+            return None
+
+    def diff(self, digest: str, len_diff: bool = True):
+        '''
+        TLSH distance of all digests to this digest, as tlsh.diff (with the length term) or tlsh.diffxlen (without)
+        :return: integer array, one distance per digest
+        '''
+        other = Digest_array([digest])
+        if not other.decoded[0]:
+            return self.diff_with_module(digest, len_diff, np.ones(len(self.digest_list), dtype=bool))
+
+        diff = np.zeros(len(self.digest_list), dtype=np.int32)
+        if len_diff:
+            l_diff = mod_diff(self.l_value, other.l_value[0], RANGE_LVALUE)
+            diff += np.where(l_diff <= 1, l_diff, l_diff * 12)
+
+        q1_diff = mod_diff(self.q1_ratio, other.q1_ratio[0], RANGE_QRATIO)
+        diff += np.where(q1_diff <= 1, q1_diff, (q1_diff - 1) * 12)
+        q2_diff = mod_diff(self.q2_ratio, other.q2_ratio[0], RANGE_QRATIO)
+        diff += np.where(q2_diff <= 1, q2_diff, (q2_diff - 1) * 12)
+
+        diff += self.checksum != other.checksum[0]
+
+        # Distances of the body bytes at each position, to the byte of this digest
+        byte_diff_table = BYTE_DIFF_TABLE[other.body[:, 0]]
+        for i in range(CODE_SIZE):
+            diff += byte_diff_table[i].take(self.body[i])
+
+        if not self.decoded.all():
+            diff[~self.decoded] = self.diff_with_module(digest, len_diff, ~self.decoded)[~self.decoded]
+
+        return diff
+
+    def diff_with_module(self, digest: str, len_diff: bool, mask: np.ndarray):
+        diff = np.zeros(len(self.digest_list), dtype=np.int32)
+        diff_function = tlsh.diff if len_diff else tlsh.diffxlen
+        for i in np.flatnonzero(mask):
+            diff[i] = diff_function(self.digest_list[i], digest)
+        return diff
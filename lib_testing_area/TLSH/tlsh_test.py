@@ -3,12 +3,14 @@ import os
 
 import sys
 import tlsh
+import operator
 from typing import List
 
 # PERSONAL LIBRARIES
 sys.path.append(os.path.abspath(os.path.pardir))
 from utility_lib import filesystem_lib, picture_class, execution_handler
 import configuration
+from .tlsh_digest import Digest_array
 
 # ==== Action definition ====
 class TLSH_execution_handler(execution_handler.Execution_handler) :
@@ -16,9 +18,14 @@ class TLSH_execution_handler(execution_handler.Execution_handler) :
         super().__init__(conf)
         self.Local_Picture_class_ref = picture_class.Picture
 
+        # Decoded digests of the last list of candidates : (picture list, Digest_array)
+        self.digest_array_cache = (None, None)
+
     def TO_OVERWRITE_prepare_dataset(self, picture_list):
         self.logger.info("Hash pictures ... ")
         picture_list = self.hash_pictures(picture_list)
+        # Digests decoded once for all targets
+        self.get_digest_array(picture_list)
         return picture_list
 
     def TO_OVERWRITE_prepare_target_picture(self, target_picture):
@@ -42,7 +49,9 @@ class TLSH_execution_handler(execution_handler.Execution_handler) :
 
     def hash_picture(self, curr_picture: picture_class.Picture):
         # target_hash = tlsh.hash(Image.open(curr_picture.path))
+        start_ns = self.timer.start()
         target_hash = tlsh.hash(open(curr_picture.path, 'rb').read()) # From https://github.com/trendmicro/tlsh
+        self.timer.stop("hash", start_ns)
 
         curr_picture.hash = target_hash
 
@@ -53,6 +62,47 @@ class TLSH_execution_handler(execution_handler.Execution_handler) :
 
         return curr_picture
 
+    # ==== Resources estimation ====
+    @staticmethod
+    def estimate_resources(conf: configuration.Default_configuration, nb_pictures: int, nb_pixels: float):
+        memory, preparation_time, pair_time = execution_handler.Execution_handler.estimate_resources(conf, nb_pictures, nb_pixels)
+        # Hashes are computed on the compressed file, not on decoded pixels
+        return memory, preparation_time / 10, 1e-5
+
+    # ==== Top K search ====
+    def find_top_k_closest_pictures(self, picture_list, target_picture):
+        # Distances of all candidates to the target at once, identical to the ones of TO_OVERWRITE_compute_distance
+        start_ns = self.timer.start()
+        distance_list = self.get_distances(picture_list, target_picture)
+        self.timer.stop("distance", start_ns, count=len(picture_list))
+
+        for curr_pic, distance in zip(picture_list, distance_list):
+            curr_pic.distance = distance
+
+        self.logger.debug("Extract top K images ... ")
+        # Stable sort : same ties ordering as get_top
+        return sorted(picture_list, key=operator.attrgetter('distance'))
+
+    def get_digest_array(self, picture_list: List[picture_class.Picture]):
+        # Same list of candidates for all targets : decoded once. Another list (cascade shortlists, ...) is decoded again.
+        cached_picture_list, digest_array = self.digest_array_cache
+        if cached_picture_list is not picture_list or len(digest_array.digest_list) != len(picture_list):
+            digest_array = Digest_array([curr_pic.hash for curr_pic in picture_list])
+            self.digest_array_cache = (picture_list, digest_array)
+        return digest_array
+
+    def get_distances(self, picture_list: List[picture_class.Picture], target_picture: picture_class.Picture):
+        digest_array = self.get_digest_array(picture_list)
+        if self.conf.ALGO == configuration.ALGO_TYPE.TLSH:
+            diff = digest_array.diff(target_picture.hash, len_diff=True)
+        elif self.conf.ALGO == configuration.ALGO_TYPE.TLSH_NO_LENGTH:
+            diff = digest_array.diff(target_picture.hash, len_diff=False)
+        else :
+            raise Exception("Invalid algorithm type for TLSH execution handler during distance computing : " + str(self.conf.ALGO.name))
+
+        # Divided by the length of the candidate digest, as TO_OVERWRITE_compute_distance
+        return (diff / digest_array.lengths).tolist()
+
     def TO_OVERWRITE_compute_distance(self, pic1: picture_class.Picture, pic2: picture_class.Picture):
         dist = None
         if self.conf.ALGO == configuration.ALGO_TYPE.TLSH:
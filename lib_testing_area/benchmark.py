@@ -0,0 +1,186 @@
+# ==================== ------------------------ ====================
+#                       Micro-benchmarks of hot paths
+# STD imports
+import logging
+import pathlib
+import argparse
+import tempfile
+
+import cv2
+import tlsh
+import numpy as np
+from PIL import Image
+
+import configuration
+import results
+import utility_lib.benchmark_lib as benchmark_lib
+import utility_lib.filesystem_lib as filesystem_lib
+import ImageHash.imagehash_test as image_hash
+import TLSH.tlsh_test as tlsh_test
+import OpenCV.opencv as opencv
+import OpenCV.bow as bow
+from OpenCV.match_array import Match_array, Match_details
+
+# Launch example :
+# python3 ./benchmark.py -r 50 -w 5 -o ./benchmark.json
+# python3 ./benchmark.py -k imagehash tlsh -o ./benchmark_hashes.json
+
+DEFAULT_SOURCE_DIR = pathlib.Path(__file__).parent / "tests" / "test_files" / "MINI_DATASET"
+DEFAULT_GROUND_TRUTH = pathlib.Path(__file__).parent / "tests" / "test_files" / "MINI_DATASET.json"
+
+IMAGEHASH_ALGOS = [configuration.ALGO_TYPE.A_HASH,
+                   configuration.ALGO_TYPE.P_HASH,
+                   configuration.ALGO_TYPE.P_HASH_SIMPLE,
+                   configuration.ALGO_TYPE.D_HASH,
+                   configuration.ALGO_TYPE.D_HASH_VERTICAL,
+                   configuration.ALGO_TYPE.W_HASH]
+
+
+def get_conf(conf, source_dir: pathlib.Path, ground_truth_json: pathlib.Path, output_dir: pathlib.Path):
+    conf.SOURCE_DIR = source_dir
+    conf.GROUND_TRUTH_PATH = ground_truth_json
+    conf.OUTPUT_DIR = output_dir # Handlers write their configuration only
+    conf.SAVE_PICTURE_INSTRUCTION_LIST = []
+    return conf
+
+
+def get_pair(source_dir: pathlib.Path, ground_truth_json: pathlib.Path):
+    '''
+    Paths of a matching pair of the ground truth (target, candidate), to benchmark pair functions on a realistic pair
+    '''
+    ground_truth = filesystem_lib.File_System.load_json(ground_truth_json)
+    names = {node["id"]: node["image"] for node in ground_truth["nodes"]}
+    edge = ground_truth["edges"][0]
+    return source_dir / names[edge["from"]], source_dir / names[edge["to"]]
+
+
+def get_histogram(description, size: int):
+    # Normalized histogram, as the BoW descriptor extractor gives : float32 of shape (1, size)
+    histogram, _ = np.histogram(description, bins=size, range=(0, 256))
+    return (histogram / max(histogram.sum(), 1)).astype(np.float32).reshape(1, -1)
+
+
+def prepare_handler(handler, source_dir: pathlib.Path):
+    # Pictures of the dataset, prepared as for a full test
+    picture_list = handler.load_pictures(source_dir, handler.Local_Picture_class_ref)
+    return handler.TO_OVERWRITE_prepare_dataset(picture_list)
+
+
+def create_suite(output_dir: pathlib.Path, source_dir: pathlib.Path = DEFAULT_SOURCE_DIR, ground_truth_json: pathlib.Path = DEFAULT_GROUND_TRUTH):
+    '''
+    Benchmark cases of each hot path, on fixed inputs of the dataset. Inputs are prepared once, only the call is measured.
+    '''
+    suite = benchmark_lib.Benchmark_suite()
+    target_path, candidate_path = get_pair(source_dir, ground_truth_json)
+
+    # ==== Pictures loading ====
+    suite.add("load_picture_PIL", lambda: Image.open(str(target_path)).load())
+    suite.add("load_picture_cv2", lambda: cv2.imread(str(target_path)))
+
+    # ==== Image hash ====
+    for algo in IMAGEHASH_ALGOS:
+        conf = get_conf(configuration.Default_configuration(), source_dir, ground_truth_json, output_dir)
+        conf.ALGO = algo
+        handler = image_hash.Image_hash_execution_handler(conf=conf)
+        picture = handler.Local_Picture_class_ref(id=0, conf=conf, path=target_path)
+        suite.add("imagehash_" + algo.name, lambda handler=handler, picture=picture: handler.hash_picture(picture))
+
+    # ==== TLSH ====
+    target_data = target_path.read_bytes()
+    target_hash = tlsh.hash(target_data)
+    candidate_hash = tlsh.hash(candidate_path.read_bytes())
+    suite.add("tlsh_hash", lambda: tlsh.hash(target_data))
+    suite.add("tlsh_diff", lambda: tlsh.diff(target_hash, candidate_hash))
+    suite.add("tlsh_diffxlen", lambda: tlsh.diffxlen(target_hash, candidate_hash))
+
+    # ==== ORB ====
+    conf = get_conf(configuration.ORB_default_configuration(), source_dir, ground_truth_json, output_dir)
+    orb_handler = opencv.OpenCV_execution_handler(conf=conf)
+    target_picture = orb_handler.describe_picture(opencv.Local_Picture(id=0, conf=conf, path=target_path))
+    candidate_picture = orb_handler.describe_picture(opencv.Local_Picture(id=1, conf=conf, path=candidate_path))
+    suite.add("orb_describe_picture", lambda: orb_handler.describe_picture(target_picture))
+
+    knn_conf = get_conf(configuration.ORB_default_configuration(), source_dir, ground_truth_json, output_dir)
+    knn_conf.MATCH = configuration.MATCH_TYPE.KNN
+    knn_handler = opencv.OpenCV_execution_handler(conf=knn_conf)
+    suite.add("orb_match", lambda: orb_handler.matcher.match(candidate_picture.description, target_picture.description))
+    suite.add("orb_knnMatch", lambda: knn_handler.matcher.knnMatch(candidate_picture.description, target_picture.description, k=knn_conf.MATCH_K_FOR_KNN))
+
+    matches = Match_array.from_matches(orb_handler.matcher.match(candidate_picture.description, target_picture.description))
+    suite.add("orb_ransac_filter", lambda: orb_handler.ransac_filter(matches, candidate_picture, target_picture, Match_details()))
+
+    # ==== BoW ====
+    conf = get_conf(configuration.BoW_ORB_default_configuration(), source_dir, ground_truth_json, output_dir)
+    try:
+        bow_picture_list = prepare_handler(bow.BoW_execution_handler(conf=conf), source_dir)
+        target_histogram, candidate_histogram = bow_picture_list[0].description, bow_picture_list[1].description
+    except Exception as e:
+        # OpenCV builds without BoW : histograms of the same size and type, comparison time does not depend on values
+        logging.getLogger(__name__).warning(f"BoW unavailable ({e}) : histograms are built from ORB descriptors values")
+        target_histogram = get_histogram(target_picture.description, conf.BOW_SIZE)
+        candidate_histogram = get_histogram(candidate_picture.description, conf.BOW_SIZE)
+    suite.add("bow_compareHist_CORREL", lambda: cv2.compareHist(candidate_histogram, target_histogram, cv2.HISTCMP_CORREL))
+    suite.add("bow_compareHist_BHATTACHARYYA", lambda: cv2.compareHist(candidate_histogram, target_histogram, cv2.HISTCMP_BHATTACHARYYA))
+
+    # ==== Top-K search over the dataset, for one target ====
+    conf = get_conf(configuration.Default_configuration(), source_dir, ground_truth_json, output_dir)
+    conf.ALGO = configuration.ALGO_TYPE.A_HASH
+    hash_handler = image_hash.Image_hash_execution_handler(conf=conf)
+    hash_picture_list = prepare_handler(hash_handler, source_dir)
+    suite.add("find_top_k_closest_pictures_A_HASH", lambda: hash_handler.find_top_k_closest_pictures(hash_picture_list, hash_picture_list[0]),
+              nb_operations=len(hash_picture_list))
+
+    conf = get_conf(configuration.Default_configuration(), source_dir, ground_truth_json, output_dir)
+    conf.ALGO = configuration.ALGO_TYPE.TLSH
+    tlsh_handler = tlsh_test.TLSH_execution_handler(conf=conf)
+    tlsh_picture_list = prepare_handler(tlsh_handler, source_dir)
+    suite.add("find_top_k_closest_pictures_TLSH", lambda: tlsh_handler.find_top_k_closest_pictures(tlsh_picture_list, tlsh_picture_list[0]),
+              nb_operations=len(tlsh_picture_list))
+
+    orb_picture_list = prepare_handler(orb_handler, source_dir)
+    suite.add("find_top_k_closest_pictures_ORB", lambda: orb_handler.find_top_k_closest_pictures(orb_picture_list, orb_picture_list[0]),
+              nb_operations=len(orb_picture_list))
+
+    # ==== Evaluation of an output graphe ====
+    json_handler = hash_handler.prepare_initial_JSON(hash_picture_list, hash_handler.json_handler)
+    json_handler, _ = hash_handler.iterate_over_dataset(hash_picture_list, json_handler)
+    suite.add("evaluate_json", lambda: json_handler.evaluate_json(ground_truth_json, results.RESULTS()))
+
+    return suite
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmarks of the hot paths of each handler, on fixed inputs")
+    parser.add_argument("-i", "--input", dest="input_folder", type=str, help="read pictures from this folder", default=str(DEFAULT_SOURCE_DIR))
+    parser.add_argument("-gt", "--ground_truth", dest="ground_truth", type=str, help="ground truth file (a pair of its first edge is benchmarked)", default=str(DEFAULT_GROUND_TRUTH))
+    parser.add_argument("-o", "--output", dest="output_file", type=str, help="write results to this JSON file", default="benchmark.json")
+    parser.add_argument("-r", "--repetitions", dest="repetitions", type=int, help="measured calls of each case", default=benchmark_lib.DEFAULT_REPETITIONS)
+    parser.add_argument("-w", "--warmup", dest="warmup", type=int, help="calls of each case before measures", default=benchmark_lib.DEFAULT_WARMUP)
+    parser.add_argument("-k", "--filter", dest="name_filter", nargs="+", help="only run cases whose name contains one of these", default=None)
+    parser.add_argument("-ref", "--reference", dest="reference", type=str, help="results JSON file of a previous run, to compare medians with", default=None)
+    parser.add_argument("-v", "--verbosity", dest='verbose', help="increase output verbosity", action="count", default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(message)s', level=logging.INFO if args.verbose > 0 else logging.WARNING)
+    # Handlers log as children of __main__ : the report has its own logger
+    logger = logging.getLogger("benchmark")
+    logger.setLevel(logging.INFO)
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        suite = create_suite(pathlib.Path(output_dir), pathlib.Path(args.input_folder).resolve(), pathlib.Path(args.ground_truth).resolve())
+        benchmark_results = suite.run(repetitions=args.repetitions, warmup=args.warmup, name_filter=args.name_filter)
+
+    for name, stats in benchmark_results["RESULTS"].items():
+        logger.info(f"{name:<40} median {stats['MEDIAN'] * 1000:10.4f}ms   IQR {stats['IQR'] * 1000:10.4f}ms")
+
+    if args.reference is not None:
+        reference = filesystem_lib.File_System.load_json(pathlib.Path(args.reference))
+        for name, ratio in benchmark_lib.Benchmark_suite.compare_results(reference, benchmark_results).items():
+            logger.info(f"{name:<40} x{ratio:.3f} of reference median")
+
+    benchmark_lib.Benchmark_suite.save_results(benchmark_results, pathlib.Path(args.output_file).resolve())
+    logger.info(f"Results written to {args.output_file}")
+
+
+if __name__ == '__main__':
+    main()
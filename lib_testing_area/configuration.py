@@ -27,6 +27,7 @@ class ALGO_TYPE(JSON_parsable_Enum, Enum):
     TLSH = auto()
     TLSH_NO_LENGTH = auto()
     ORB = auto()
+    CASCADE = auto()
 
 # Threshold finder
 class THRESHOLD_MODE(JSON_parsable_Enum, Enum):
@@ -46,6 +47,13 @@ class Default_configuration(JSON_parsable_Dict):
     def __init__(self):
         # Inputs
         self.SOURCE_DIR = None
+        self.DECODE_CACHE_DIR = None # Decoded pictures stored once as .npy, memory mapped by all configurations (see utility_lib/decode_cache_lib.py). None for no cache
+        self.DECODE_CACHE_GRAYSCALE = False # Cached pictures in gray levels : 3 times smaller, same ORB keypoints and hashes (one entry per consumer)
+        self.DECODE_CACHE_MAX_SIZE = None # Cached pictures downscaled to this maximum side (pixels). Changes results. None to keep the size
+        self.DESCRIPTOR_STORE_DIR = None # ORB descriptors of the dataset written once, memory mapped by all configurations and runs (see utility_lib/descriptor_store_lib.py). None to keep them in memory only
+        self.DESCRIPTOR_STORE_READ_ONLY = False # Store written beforehand (by the launcher) : only mapped, pictures are described in memory if it misses them
+        self.HASH_STORE_PATH = None # Hashes of all image hash algorithms computed from one decoding, read by each configuration (see ImageHash/multi_hash.py). None to hash per configuration
+        self.MANIFEST_PATH = None # Pictures of SOURCE_DIR with their stable ids (see utility_lib/manifest_lib.py). None for <OUTPUT_DIR>/<dataset>.manifest.json
         self.GROUND_TRUTH_PATH = None
         self.IMG_TYPE = SUPPORTED_IMAGE_TYPE.PNG
         # Processing
@@ -56,6 +64,15 @@ class Default_configuration(JSON_parsable_Dict):
         # Output
         self.SAVE_PICTURE_INSTRUCTION_LIST = []
         self.OUTPUT_DIR = None
+        self.RESULTS_DB_PATH = None # SQLite results store (see utility_lib/results_db.py), None to disable
+        self.EXPORT_TO_FOLDER = True # Write conf.txt, stats.txt and graphe.py in OUTPUT_DIR
+        self.CHECKPOINT_INTERVAL = None # Seconds between checkpoints of a full test in OUTPUT_DIR, to resume it. None to disable (set by the launcher)
+        self.RESOURCE_ACCOUNTING = False # CPU times, RSS and context switches of each step of a full test, in stats.txt (see utility_lib/resources_lib.py)
+        self.TRACE_MEMORY = False # Python allocations of each step with tracemalloc, if RESOURCE_ACCOUNTING. Slows down the run
+        self.STAGE_TIMING = False # Durations of each stage (decode, match, ransac, ...) in stats.txt, see utility_lib/timing_lib.py
+        self.TRACE_SAMPLING_PERIOD = None # Write spans to trace.json (Perfetto, chrome://tracing), one per-picture/per-target span out of N. None for no trace
+        self.TIME_LIST_MAX_TARGETS = 10000 # Matching time of each target kept in stats.txt and checkpoints up to this number of targets. Above, latency percentiles only (see stats_lib.Latency_sketch). None to always keep them
+        self.TARGET_SUBSET = None # Names of the pictures picked as targets (still matched against all pictures). None for all pictures
 
 
 # ==================== ------------------------ ====================
@@ -125,6 +142,9 @@ class ORB_default_configuration(Default_configuration, JSON_parsable_Dict):
         self.RANSAC_ACCELERATOR_THRESHOLD = 65 # Remove farthest matches
         self.POST_FILTER_CHOSEN = POST_FILTER.NONE
 
+        # Skip matching of candidates which can't reach the top-K, given their number of descriptors (LEN_MAX only : LEN_MIN has no useful bound)
+        self.BOUND_PRUNING = True
+
 # ==================== ------------------------ ====================
 #                      BoW ORB POSSIBLE CONFIGURATIONS
 #
@@ -144,5 +164,27 @@ class BoW_ORB_default_configuration(Default_configuration, JSON_parsable_Dict):
         self.BOW_CMP_HIST = BOW_CMP_HIST.CORREL
 
 
+# ==================== ------------------------ ====================
+#                      CASCADE POSSIBLE CONFIGURATIONS
+# A fast (global) configuration shortlists candidates, a slow (local) configuration re-ranks them
+
+class Cascade_default_configuration(Default_configuration, JSON_parsable_Dict):
+    def __init__(self):
+        super().__init__()
+
+        self.ALGO = ALGO_TYPE.CASCADE
+
+        # First stage : cheap handler (ImageHash, TLSH) used to shortlist candidates
+        self.FIRST_STAGE_CONFIGURATION = Default_configuration()
+        self.FIRST_STAGE_CONFIGURATION.ALGO = ALGO_TYPE.P_HASH
+
+        # Second stage : expensive handler (ORB, BoW) used only on the shortlist
+        self.SECOND_STAGE_CONFIGURATION = ORB_default_configuration()
+        self.SECOND_STAGE_CONFIGURATION.ALGO = ALGO_TYPE.ORB
+
+        # Number of candidates (target excluded) kept per target by the first stage
+        self.CASCADE_SHORTLIST_SIZE = 50
+
+
 # ==================== ------------------------ ====================
 #                        Custom configuration
\ No newline at end of file
@@ -6,16 +6,30 @@ import pathlib
 import json
 import traceback
 import pprint
+import copy
+import math
+import random
+import numpy as np
 
 # Own imports
 import utility_lib.filesystem_lib as filesystem_lib
 import utility_lib.graph_lib as graph_lib
+import utility_lib.results_db as results_db
+import utility_lib.scheduler_lib as scheduler_lib
+import utility_lib.checkpoint_lib as checkpoint_lib
+import utility_lib.manifest_lib as manifest_lib
+import utility_lib.descriptor_store_lib as descriptor_store_lib
 import configuration
 import ImageHash.imagehash_test as image_hash
+import ImageHash.multi_hash as multi_hash
 import TLSH.tlsh_test as tlsh
 import OpenCV.opencv as opencv
 import OpenCV.bow as bow
 import Void_baseline.void_baseline as void_baseline
+import Cascade.cascade as cascade
+
+SUCCESSIVE_HALVING_FOLDER = "successive_halving" # Partial runs of the rounds, and their scores, in the output folder
+SUCCESSIVE_HALVING_SEED = 0 # Same random subsets of targets from one launch to the other, to resume rounds
 
 class Configuration_launcher():
     def __init__(self,
@@ -24,7 +38,22 @@ class Configuration_launcher():
                  ground_truth_json: pathlib.Path,
                  img_type: configuration.SUPPORTED_IMAGE_TYPE,
                  overwrite_folder : bool,
-                 args):
+                 args,
+                 results_db_path: pathlib.Path = None,
+                 export_to_folder: bool = True,
+                 nb_processes: int = 1,
+                 memory_budget: float = None,
+                 sh_initial_subset: int = 50,
+                 sh_keep_share: float = 0.5,
+                 stage_timing: bool = False,
+                 resource_accounting: bool = False,
+                 trace_memory: bool = False,
+                 trace_sampling_period: int = None,
+                 decode_cache_dir: pathlib.Path = None,
+                 decode_cache_grayscale: bool = False,
+                 decode_cache_max_size: int = None,
+                 descriptor_store_dir: pathlib.Path = None,
+                 checkpoint_interval: float = 60):
 
         # /!\ Logging doesn't work in IDE, but works in terminal /!\
 
@@ -41,17 +70,53 @@ class Configuration_launcher():
 
         self.logger.warning("Creation of filesystem handler : deletion of 0-sized pictures in source folder.")
         self.filesystem_handler = filesystem_lib.File_System(conf=tmp_conf)
-        self.filesystem_handler.clean_folder(self.source_pictures_dir)
+        # Only walk of the source folder : configurations list pictures from its refreshed manifest, kept with the results
+        self.manifest_path = manifest_lib.get_default_manifest_path(self.source_pictures_dir, self.output_folder)
+        self.filesystem_handler.clean_folder(self.source_pictures_dir, manifest_path=self.manifest_path)
 
         self.overwrite_folder = overwrite_folder
 
+        # Where each configuration stores its results (see utility_lib/results_db.py)
+        self.results_db_path = results_db_path
+        self.export_to_folder = export_to_folder
+        self.stage_timing = stage_timing
+        self.resource_accounting = resource_accounting
+        self.trace_memory = trace_memory
+        self.trace_sampling_period = trace_sampling_period
+        # Decoded pictures shared by all configurations (see utility_lib/decode_cache_lib.py)
+        self.decode_cache_dir = decode_cache_dir
+        self.decode_cache_grayscale = decode_cache_grayscale
+        self.decode_cache_max_size = decode_cache_max_size
+        # ORB descriptors shared by all configurations (see utility_lib/descriptor_store_lib.py)
+        self.descriptor_store_dir = descriptor_store_dir
+        # Launched configurations save their progress this often (seconds), to be resumed (see utility_lib/checkpoint_lib.py)
+        self.checkpoint_interval = checkpoint_interval
+
+        # Configurations are run in parallel processes if more than one process
+        self.scheduler = None
+        if nb_processes > 1:
+            nb_pictures, nb_pixels = scheduler_lib.get_dataset_size(self.source_pictures_dir, self.img_type, manifest_path=self.manifest_path)
+            memory_budget = memory_budget if memory_budget is not None else scheduler_lib.get_default_memory_budget()
+            self.scheduler = scheduler_lib.Configuration_scheduler(nb_processes=nb_processes, memory_budget=memory_budget,
+                                                                   nb_pictures=nb_pictures, nb_pixels=nb_pixels)
+
+        # Successive halving : number of targets of the first round, share of configurations kept after each round
+        if not 0 < sh_keep_share < 1:
+            raise Exception(f"Share of configurations kept by successive halving should be within ]0, 1[ : {sh_keep_share}")
+        self.sh_initial_subset = sh_initial_subset
+        self.sh_keep_share = sh_keep_share
+
         self.args = args
+        # Hash stores and descriptor stores already built by the launcher
+        self.prepared_hash_store_list = []
+        self.prepared_descriptor_store_list = []
 
     def add_logfile(self, curr_configuration):
-        if not curr_configuration.OUTPUT_DIR.exists() : curr_configuration.OUTPUT_DIR.mkdir()
+        if not curr_configuration.OUTPUT_DIR.exists() : curr_configuration.OUTPUT_DIR.mkdir(parents=True)
         logger = logging.getLogger()  # See : https://stackoverflow.com/questions/50714316/how-to-use-logging-getlogger-name-in-multiple-modules
+        # Appended, to keep the log of an interrupted execution which is resumed
         tmp_log_file_handler = logging.FileHandler(str(curr_configuration.OUTPUT_DIR / pathlib.Path('execution.log')),
-                                                   'w')
+                                                   'a')
         tmp_log_file_handler.setLevel(logging.INFO)
         tmp_log_file_handler.setFormatter(configuration.FORMATTER)
         logger.addHandler(tmp_log_file_handler)
@@ -64,7 +129,33 @@ class Configuration_launcher():
         logger.handlers = [
             h for h in logger.handlers if not h == loghandler]
 
+    def schedule_exec_handler(self, exec_handler, curr_configuration):
+        # Launch now, or queue a copy (the configuration is modified for the next one) to be launched in parallel
+        if self.scheduler is None:
+            self.launch_exec_handler(exec_handler, curr_configuration)
+        else:
+            self.scheduler.add(exec_handler, copy.deepcopy(curr_configuration))
+
+    def set_launcher_options(self, curr_configuration):
+        # Runs on a subset of targets are partial : written to their folder only, not to the results store
+        is_partial = curr_configuration.TARGET_SUBSET is not None
+        curr_configuration.RESULTS_DB_PATH = None if is_partial else self.results_db_path
+        curr_configuration.EXPORT_TO_FOLDER = True if is_partial else self.export_to_folder
+        curr_configuration.STAGE_TIMING = self.stage_timing
+        curr_configuration.RESOURCE_ACCOUNTING = self.resource_accounting
+        curr_configuration.TRACE_MEMORY = self.trace_memory
+        curr_configuration.TRACE_SAMPLING_PERIOD = self.trace_sampling_period
+        curr_configuration.DECODE_CACHE_DIR = self.decode_cache_dir
+        curr_configuration.DECODE_CACHE_GRAYSCALE = self.decode_cache_grayscale
+        curr_configuration.DECODE_CACHE_MAX_SIZE = self.decode_cache_max_size
+        curr_configuration.DESCRIPTOR_STORE_DIR = self.descriptor_store_dir
+        # Stores are built by the launcher before configurations are scheduled (see prepare_descriptor_store)
+        curr_configuration.DESCRIPTOR_STORE_READ_ONLY = self.descriptor_store_dir is not None
+        curr_configuration.MANIFEST_PATH = self.manifest_path
+        curr_configuration.CHECKPOINT_INTERVAL = self.checkpoint_interval
+
     def launch_exec_handler(self, exec_handler, curr_configuration):
+        self.set_launcher_options(curr_configuration)
         tmp_log_handler = self.add_logfile(curr_configuration)
 
         try:
@@ -75,17 +166,80 @@ class Configuration_launcher():
         except Exception as e:
             self.logger.error(f"Aborting this configuration. Current configuration thrown an error : {e} ")
             self.logger.error(traceback.print_tb(e.__traceback__))
+            return False
         finally:
             self.rem_logfile(tmp_log_handler)
 
+        return True
+
+    def prepare_hash_store(self, curr_configuration, hash_store_path: pathlib.Path):
+        '''
+        Hash the dataset for all image hash algorithms once, before configurations reading these hashes are scheduled.
+        Configurations run in parallel would all start without the store, and all hash the dataset.
+        '''
+        if hash_store_path in self.prepared_hash_store_list:
+            return
+        self.prepared_hash_store_list.append(hash_store_path)
+
+        store_configuration = copy.deepcopy(curr_configuration)
+        store_configuration.HASH_STORE_PATH = hash_store_path
+        # Same decoding as the configurations
+        self.set_launcher_options(store_configuration)
+        try:
+            picture_list = filesystem_lib.File_System(conf=store_configuration).get_Pictures_from_directory(store_configuration.SOURCE_DIR)
+            hash_store = multi_hash.Hash_store.get_store(store_configuration)
+            if not hash_store.open(picture_list):
+                hash_store.write(picture_list, store_configuration)
+        except Exception as e:
+            # Each configuration hashes the dataset itself
+            self.logger.error(f"Hash store not built : {e}")
+
+    def prepare_descriptor_store(self, curr_configuration):
+        '''
+        Describe the dataset once, before ORB configurations reading the descriptor store are scheduled.
+        Configurations only map the store : run in parallel, they would all describe the dataset and write it.
+        '''
+        store_configuration = copy.deepcopy(curr_configuration)
+        # Same decoding and store as the configurations
+        self.set_launcher_options(store_configuration)
+        descriptor_store = descriptor_store_lib.Descriptor_store.get_store(store_configuration)
+        if descriptor_store is None or descriptor_store.store_dir in self.prepared_descriptor_store_list:
+            return
+        self.prepared_descriptor_store_list.append(descriptor_store.store_dir)
+
+        # Only the store is written : not a run of its own
+        store_configuration.DESCRIPTOR_STORE_READ_ONLY = False
+        store_configuration.RESULTS_DB_PATH = None
+        store_configuration.EXPORT_TO_FOLDER = False
+        store_configuration.OUTPUT_DIR = self.output_folder
+        try:
+            eh = opencv.OpenCV_execution_handler(conf=store_configuration)
+            eh.TO_OVERWRITE_prepare_dataset(eh.load_pictures(store_configuration.SOURCE_DIR, eh.Local_Picture_class_ref))
+        except Exception as e:
+            # Each configuration describes the dataset in memory
+            self.logger.error(f"Descriptor store not built : {e}")
+
+    def get_cascade_second_stage_configuration(self, curr_configuration):
+        # Second stage as run by the cascade (see Cascade_execution_handler.create_stage_handler)
+        stage_configuration = copy.deepcopy(curr_configuration.SECOND_STAGE_CONFIGURATION)
+        stage_configuration.SOURCE_DIR = curr_configuration.SOURCE_DIR
+        stage_configuration.GROUND_TRUTH_PATH = curr_configuration.GROUND_TRUTH_PATH
+        stage_configuration.IMG_TYPE = curr_configuration.IMG_TYPE
+        return stage_configuration
+
     def skip_if_already_computed(self, curr_configuration):
         # Jump to next configuration if we are not overwriting current results
-        if not self.overwrite_folder and curr_configuration.OUTPUT_DIR.exists():
+        if not self.overwrite_folder and checkpoint_lib.is_completed(curr_configuration.OUTPUT_DIR):
             self.logger.warning(f"Configuration skipped, no overwrite and already exists : {curr_configuration.OUTPUT_DIR} \n")
             return True
         elif self.overwrite_folder :
+            # Start from scratch, without previous checkpoints
+            checkpoint_lib.clear(curr_configuration.OUTPUT_DIR)
             self.logger.info(f"Configuration overwriten. Name generation : {curr_configuration.OUTPUT_DIR}")
             return False
+        elif curr_configuration.OUTPUT_DIR.exists():
+            self.logger.warning(f"Configuration incomplete, resumed from its checkpoints if any : {curr_configuration.OUTPUT_DIR}")
+            return False
         else :
             self.logger.info(f"Configuration absent. Name generation : {curr_configuration.OUTPUT_DIR}")
             return False
@@ -94,9 +248,16 @@ class Configuration_launcher():
         self.logger.info("==== ----- LAUNCHING AUTO CONF LAUNCHER ---- ==== ")
         if self.args.imagehash :     self.auto_launch_image_hash()
         if self.args.tlsh :          self.auto_launch_tlsh()
-        if self.args.orb_normal :    self.auto_launch_orb()
-        if self.args.orb_bow :       self.auto_launch_orb_BOW()
+        if self.args.successive_halving and (self.args.orb_normal or self.args.orb_bow):
+            self.auto_launch_successive_halving()
+        else :
+            if self.args.orb_normal :    self.auto_launch_orb()
+            if self.args.orb_bow :       self.auto_launch_orb_BOW()
         if self.args.void :          self.auto_launch_void()
+        if self.args.cascade :       self.auto_launch_cascade()
+
+        # Run queued configurations, if in parallel
+        if self.scheduler is not None : self.scheduler.run(self.launch_exec_handler)
 
 
     def auto_launch_image_hash(self):
@@ -112,6 +273,8 @@ class Configuration_launcher():
         else :
             curr_configuration.SAVE_PICTURE_INSTRUCTION_LIST = [] # No saving
         curr_configuration.OUTPUT_DIR = self.output_folder
+        # Pictures decoded once : hashed for all algorithms before the configurations, which read the hashes
+        curr_configuration.HASH_STORE_PATH = self.output_folder / multi_hash.HASH_STORE_FILE
 
         list_to_execute = [configuration.ALGO_TYPE.A_HASH,
                            configuration.ALGO_TYPE.P_HASH,
@@ -129,7 +292,8 @@ class Configuration_launcher():
             if self.skip_if_already_computed(curr_configuration) : continue
 
             # Launch configuration
-            self.launch_exec_handler(image_hash.Image_hash_execution_handler, curr_configuration)
+            self.prepare_hash_store(curr_configuration, curr_configuration.HASH_STORE_PATH)
+            self.schedule_exec_handler(image_hash.Image_hash_execution_handler, curr_configuration)
 
     def auto_launch_tlsh(self):
         self.logger.info("==== ----- LAUNCHING TLSH algos ---- ==== ")
@@ -158,11 +322,23 @@ class Configuration_launcher():
             if self.skip_if_already_computed(curr_configuration) : continue
 
             # Launch configuration
-            self.launch_exec_handler(tlsh.TLSH_execution_handler, curr_configuration)
+            self.schedule_exec_handler(tlsh.TLSH_execution_handler, curr_configuration)
 
     def auto_launch_orb(self):
         self.logger.info("==== ----- LAUNCHING ORB algos ---- ==== ")
 
+        for curr_configuration in self.get_orb_configurations():
+            # Jump to next configuration if we are not overwriting current results
+            if self.skip_if_already_computed(curr_configuration): continue
+
+            # Launch configuration
+            self.prepare_descriptor_store(curr_configuration)
+            self.schedule_exec_handler(opencv.OpenCV_execution_handler, curr_configuration)
+
+    def get_orb_configurations(self):
+        '''
+        Valid ORB configurations, one copy each
+        '''
         # Create conf
         curr_configuration = configuration.ORB_default_configuration()
         curr_configuration.SOURCE_DIR = self.source_pictures_dir
@@ -222,16 +398,22 @@ class Configuration_launcher():
 
                                 curr_configuration.OUTPUT_DIR = self.output_folder / opencv.OpenCV_execution_handler.conf_to_string(curr_configuration)
 
-                                # Jump to next configuration if we are not overwriting current results
-                                if self.skip_if_already_computed(curr_configuration): continue
-
-                                # Launch configuration
-                                self.launch_exec_handler(opencv.OpenCV_execution_handler, curr_configuration)
-
+                                yield copy.deepcopy(curr_configuration)
 
     def auto_launch_orb_BOW(self):
         self.logger.info("==== ----- LAUNCHING ORB algos ---- ==== ")
 
+        for curr_configuration in self.get_orb_BOW_configurations():
+            # Jump to next configuration if we are not overwriting current results
+            if self.skip_if_already_computed(curr_configuration): continue
+
+            # Launch configuration
+            self.schedule_exec_handler(bow.BoW_execution_handler, curr_configuration)
+
+    def get_orb_BOW_configurations(self):
+        '''
+        Valid BoW ORB configurations, one copy each
+        '''
         # Create conf
         curr_configuration = configuration.BoW_ORB_default_configuration()
         curr_configuration.SOURCE_DIR = self.source_pictures_dir
@@ -260,11 +442,107 @@ class Configuration_launcher():
 
                 curr_configuration.OUTPUT_DIR = self.output_folder / opencv.OpenCV_execution_handler.conf_to_string(curr_configuration)
 
-                # Jump to next configuration if we are not overwriting current results
-                if self.skip_if_already_computed(curr_configuration): continue
+                yield copy.deepcopy(curr_configuration)
 
-                # Launch configuration
-                self.launch_exec_handler(bow.BoW_execution_handler, curr_configuration)
+    # =========================== -------------------------- ===========================
+    #                                SUCCESSIVE HALVING
+
+    def auto_launch_successive_halving(self):
+        '''
+        Search of the best ORB/BoW configurations, instead of a full run of each one.
+        All configurations are run on a small random subset of targets, the best share (by TRUE_POSITIVE_RATE) is kept,
+        the subset grows and the survivors are run again ... Survivors of the last round are run on the whole dataset.
+        Scores of each round are written in the successive halving folder of the output folder.
+        '''
+        self.logger.info("==== ----- LAUNCHING SUCCESSIVE HALVING over ORB algos ---- ==== ")
+
+        candidate_list = []
+        if self.args.orb_normal :
+            candidate_list.extend([[opencv.OpenCV_execution_handler, c] for c in self.get_orb_configurations()])
+        if self.args.orb_bow :
+            candidate_list.extend([[bow.BoW_execution_handler, c] for c in self.get_orb_BOW_configurations()])
+
+        # Targets of a round are the first ones of a random order of the dataset : subsets are nested
+        picture_names = [path.name for _, path, _ in manifest_lib.Dataset_manifest.get_manifest(self.source_pictures_dir, manifest_path=self.manifest_path).get_pictures(self.img_type)]
+        random.Random(SUCCESSIVE_HALVING_SEED).shuffle(picture_names)
+
+        subset_size = self.sh_initial_subset
+        round_number = 0
+        while len(candidate_list) > 1 and subset_size < len(picture_names):
+            candidate_list = self.run_successive_halving_round(candidate_list, picture_names[:subset_size], round_number)
+
+            subset_size = math.ceil(subset_size / self.sh_keep_share)
+            round_number += 1
+
+        # Survivors on the whole dataset, as any configuration
+        for exec_handler, curr_configuration in candidate_list:
+            # Jump to next configuration if we are not overwriting current results
+            if self.skip_if_already_computed(curr_configuration): continue
+
+            # Launch configuration
+            if exec_handler == opencv.OpenCV_execution_handler:
+                self.prepare_descriptor_store(curr_configuration)
+            self.schedule_exec_handler(exec_handler, curr_configuration)
+
+    def run_successive_halving_round(self, candidate_list, target_subset, round_number: int):
+        '''
+        Run all candidates on the subset of targets, and keep the best ones
+        :param candidate_list: list of [execution handler, configuration] (configurations as run on the whole dataset)
+        :return: kept candidates
+        '''
+        round_folder = self.output_folder / SUCCESSIVE_HALVING_FOLDER / f"round_{round_number}"
+        self.logger.info(f"Successive halving round {round_number} : {len(candidate_list)} configurations on {len(target_subset)} targets")
+
+        round_configuration_list = []
+        for exec_handler, curr_configuration in candidate_list:
+            round_configuration = copy.deepcopy(curr_configuration)
+            round_configuration.TARGET_SUBSET = target_subset
+            round_configuration.OUTPUT_DIR = round_folder / curr_configuration.OUTPUT_DIR.name
+            round_configuration_list.append(round_configuration)
+
+            # Rounds already done by a previous launch are not run again
+            if self.skip_if_already_computed(round_configuration): continue
+
+            if exec_handler == opencv.OpenCV_execution_handler:
+                self.prepare_descriptor_store(round_configuration)
+            self.schedule_exec_handler(exec_handler, round_configuration)
+
+        # The whole round is needed to rank the configurations
+        if self.scheduler is not None : self.scheduler.run(self.launch_exec_handler)
+
+        # Failed configurations are ranked last
+        score_list = [Configuration_launcher.get_true_positive_rate(c.OUTPUT_DIR) for c in round_configuration_list]
+        ranking = sorted(range(len(candidate_list)), key=lambda i: score_list[i] if score_list[i] is not None else -1, reverse=True)
+        kept_index_list = ranking[:max(1, math.ceil(len(candidate_list) * self.sh_keep_share))]
+
+        round_scores = {"ROUND": round_number,
+                        "NB_TARGETS": len(target_subset),
+                        "TARGET_SUBSET": target_subset,
+                        "CONFIGURATIONS": [{"name": round_configuration_list[i].OUTPUT_DIR.name,
+                                            "TRUE_POSITIVE_RATE": score_list[i],
+                                            "KEPT": i in kept_index_list} for i in ranking]}
+        filesystem_lib.File_System.save_json(round_scores, self.output_folder / SUCCESSIVE_HALVING_FOLDER / f"round_{round_number}.json")
+
+        self.logger.info(f"Successive halving round {round_number} : {len(kept_index_list)} configurations kept, best is {round_configuration_list[ranking[0]].OUTPUT_DIR.name}")
+        return [candidate_list[i] for i in sorted(kept_index_list)]
+
+    @staticmethod
+    def get_true_positive_rate(output_dir: pathlib.Path):
+        # Score of a run, None if the run failed
+        try:
+            return filesystem_lib.File_System.load_json(output_dir / "stats.txt")["TRUE_POSITIVE_RATE"]
+        except Exception as e:
+            logging.getLogger().error(f"No score for {output_dir.name} : {e}")
+            return None
+
+    @staticmethod
+    def round_or_none(value, default=None):
+        return round(value, configuration.TO_ROUND) if value is not None else default
+
+    @staticmethod
+    def get_cpu_time(data: dict):
+        # User and system cpu time of all steps of a run, from its resource usage
+        return sum(usage["USER_CPU"] + usage["SYSTEM_CPU"] for usage in data["RESOURCE_USAGE"].values())
 
     def auto_launch_void(self):
         self.logger.info("==== ----- LAUNCHING Void baseline ---- ==== ")
@@ -278,21 +556,89 @@ class Configuration_launcher():
         curr_configuration.OUTPUT_DIR = self.output_folder / "void_baseline"
 
         # Launch configuration
-        self.launch_exec_handler(void_baseline.Void_baseline, curr_configuration)
+        self.schedule_exec_handler(void_baseline.Void_baseline, curr_configuration)
 
-    @staticmethod
-    def create_tldr(folder: pathlib.Path, output_file: pathlib.Path):
-        logger = logging.getLogger()
+    def auto_launch_cascade(self):
+        self.logger.info("==== ----- LAUNCHING Cascade algos ---- ==== ")
 
-        f = open(str(output_file.resolve()), "w+")  # Append and create if does not exist
+        # Create conf
+        curr_configuration = configuration.Cascade_default_configuration()
+        curr_configuration.SOURCE_DIR = self.source_pictures_dir
+        curr_configuration.GROUND_TRUTH_PATH = self.ground_truth_json
+        curr_configuration.IMG_TYPE = self.img_type
+
+        if self.args.save_pictures :
+            curr_configuration.SAVE_PICTURE_INSTRUCTION_LIST = [configuration.PICTURE_SAVE_MODE.TOP3,
+                                                                configuration.PICTURE_SAVE_MODE.FEATURE_MATCHES_TOP3]
+        else :
+            curr_configuration.SAVE_PICTURE_INSTRUCTION_LIST = [] # No saving
 
+        curr_configuration.OUTPUT_DIR = self.output_folder
+        # Hashes of the image hash sweep, read by hash first stages
+        curr_configuration.FIRST_STAGE_CONFIGURATION.HASH_STORE_PATH = self.output_folder / multi_hash.HASH_STORE_FILE
+
+        first_stage_list = [configuration.ALGO_TYPE.A_HASH,
+                            configuration.ALGO_TYPE.P_HASH,
+                            configuration.ALGO_TYPE.D_HASH,
+                            configuration.ALGO_TYPE.TLSH]
+        shortlist_size_list = [10, 50, 100]
+
+        for first_stage in first_stage_list:
+            for shortlist_size in shortlist_size_list:
+
+                curr_configuration.FIRST_STAGE_CONFIGURATION.ALGO = first_stage
+                curr_configuration.CASCADE_SHORTLIST_SIZE = shortlist_size
+
+                curr_configuration.OUTPUT_DIR = self.output_folder / cascade.Cascade_execution_handler.conf_to_string(curr_configuration)
+
+                # Jump to next configuration if we are not overwriting current results
+                if self.skip_if_already_computed(curr_configuration): continue
+
+                # Launch configuration
+                if first_stage in multi_hash.IMAGE_HASH_ALGOS:
+                    self.prepare_hash_store(curr_configuration, curr_configuration.FIRST_STAGE_CONFIGURATION.HASH_STORE_PATH)
+                if cascade.get_stage_handler_class(curr_configuration.SECOND_STAGE_CONFIGURATION) == opencv.OpenCV_execution_handler:
+                    self.prepare_descriptor_store(self.get_cascade_second_stage_configuration(curr_configuration))
+                self.schedule_exec_handler(cascade.Cascade_execution_handler, curr_configuration)
+
+    @staticmethod
+    def create_tldr_from_pair_table(table_file: pathlib.Path, output_file: pathlib.Path):
+        # Same overview as create_tldr, from the table of pairs instead of results folders
+        LEN = 34
         global_list = []
-        for x in folder.resolve().iterdir():
+        for curr_pair in graph_lib.Graph_handler.load_pair_table(table_file):
+            global_txt = (curr_pair["name"]).ljust(95, " ") + "\t"
+            global_txt += ("TRUE_POSITIVE = " + str(curr_pair["TRUE_POSITIVE_RATE"])).ljust(LEN, " ") + " \t"
+            global_txt += ("PRE_COMPUTING = " + str(curr_pair["TIME_PER_PICTURE_PRE_COMPUTING"])).ljust(LEN, " ") + " \t"
+            global_txt += ("MATCHING = " + str(curr_pair["TIME_PER_PICTURE_MATCHING"])).ljust(LEN, " ")
 
-            global_txt = ""
+            global_list.append([global_txt, curr_pair["TRUE_POSITIVE_RATE"]])
 
-            if x.is_dir():
-                global_txt += (x.name).ljust(95, " ") + "\t"
+        global_list = sorted(global_list, key=lambda l: l[1], reverse=True)
+
+        with open(str(output_file.resolve()), "w+") as f:
+            for x in global_list:
+                f.write(x[0] + "\r\n")
+
+        logger = logging.getLogger(__name__)
+        logger.info("Overview of pairs written")
+
+    @staticmethod
+    def get_stats_list(folder: pathlib.Path, db_path: pathlib.Path = None):
+        '''
+        Stats of each run, from the results store if provided, from the stats.txt of each results folder otherwise
+        :return: list of [name, stats (None if absent), error message (None if none)]
+        '''
+        logger = logging.getLogger()
+
+        if db_path is not None:
+            return [[name, data, None if data is not None else "NO RESULT / ERROR"]
+                    for name, data in results_db.Results_DB(db_path).get_stats_overview()]
+
+        stats_list = []
+        for x in folder.resolve().iterdir():
+            # Partial runs of a configuration search are not results
+            if x.is_dir() and x.name != SUCCESSIVE_HALVING_FOLDER:
                 stat_file = x / "stats.txt"
                 if stat_file.exists():
 
@@ -300,28 +646,48 @@ class Configuration_launcher():
                         data = filesystem_lib.File_System.load_json(stat_file)
                     except Exception as e:
                         logger.error(f"Impossible to load {stat_file}")
+                        stats_list.append([x.name, None, "FILE READING ERROR (JSON LOAD)"])
+                    else :
+                        stats_list.append([x.name, data, None])
 
-                        global_txt += "FILE READING ERROR (JSON LOAD)"
+                else:
+                    stats_list.append([x.name, None, "NO RESULT / ERROR"])
 
-                        global_list.append([global_txt, -1])
+        return stats_list
 
-                    else :
-                        LEN = 34
-                        global_txt += ("TRUE_POSITIVE = " + str(data["TRUE_POSITIVE_RATE"])).ljust(LEN, " ") + " \t"
-                        global_txt += ("PRE_COMPUTING = " + str(data["TIME_PER_PICTURE_PRE_COMPUTING"])).ljust(LEN, " ") + " \t"
-                        global_txt += ("MATCHING = " + str(data["TIME_PER_PICTURE_MATCHING"])).ljust(LEN, " ")
+    @staticmethod
+    def create_tldr(folder: pathlib.Path, output_file: pathlib.Path, db_path: pathlib.Path = None):
+        f = open(str(output_file.resolve()), "w+")  # Append and create if does not exist
 
-                        if hasattr(data, "COMPUTED_THREESHOLD") : # Backwards compatibility with previously generated stats
-                            global_txt += ("THREESHOLD DIST = " + str(data["COMPUTED_THREESHOLD"])).ljust(LEN, " ")
-                        if hasattr(data, "TRUE_POSITIVE_RATE_THREESHOLD") : # Backwards compatibility with previously generated stats
-                            global_txt += ("TRUE_POSITIVE_W_T = " + str(data["TRUE_POSITIVE_RATE_THREESHOLD"])).ljust(LEN, " ")
+        global_list = []
+        for name, data, error in Configuration_launcher.get_stats_list(folder, db_path=db_path):
 
-                        global_list.append([global_txt, data["TRUE_POSITIVE_RATE"]])
+            global_txt = ""
+            global_txt += (name).ljust(95, " ") + "\t"
 
-                else:
-                    global_txt += "NO RESULT / ERROR"
+            if data is None:
+                global_txt += error
+
+                global_list.append([global_txt, -1])
+
+            else :
+                LEN = 34
+                global_txt += ("TRUE_POSITIVE = " + str(data["TRUE_POSITIVE_RATE"])).ljust(LEN, " ") + " \t"
+                global_txt += ("PRE_COMPUTING = " + str(data["TIME_PER_PICTURE_PRE_COMPUTING"])).ljust(LEN, " ") + " \t"
+                global_txt += ("MATCHING = " + str(data["TIME_PER_PICTURE_MATCHING"])).ljust(LEN, " ")
+                if data.get("LATENCY_PERCENTILES") is not None : # Backwards compatibility with previously generated stats
+                    global_txt += ("P99 = " + str(round(data["LATENCY_PERCENTILES"]["P99"], configuration.TO_ROUND))).ljust(LEN, " ")
+                    global_txt += ("PAIRS/S = " + str(Configuration_launcher.round_or_none(data["PAIRS_PER_SECOND"]))).ljust(LEN, " ")
+                if data.get("MAX_RSS") is not None : # Only with resource accounting
+                    global_txt += ("MAX_RSS (MB) = " + str(round(data["MAX_RSS"] / 2 ** 20, configuration.TO_ROUND))).ljust(LEN, " ")
+                    global_txt += ("CPU = " + str(round(Configuration_launcher.get_cpu_time(data), configuration.TO_ROUND))).ljust(LEN, " ")
+
+                if hasattr(data, "COMPUTED_THREESHOLD") : # Backwards compatibility with previously generated stats
+                    global_txt += ("THREESHOLD DIST = " + str(data["COMPUTED_THREESHOLD"])).ljust(LEN, " ")
+                if hasattr(data, "TRUE_POSITIVE_RATE_THREESHOLD") : # Backwards compatibility with previously generated stats
+                    global_txt += ("TRUE_POSITIVE_W_T = " + str(data["TRUE_POSITIVE_RATE_THREESHOLD"])).ljust(LEN, " ")
 
-                    global_list.append([global_txt, -1])
+                global_list.append([global_txt, data["TRUE_POSITIVE_RATE"]])
 
         global_list = sorted(global_list, key=lambda l: l[1], reverse=True)
 
@@ -337,36 +703,29 @@ class Configuration_launcher():
     ## ORB \\ LEN MAX - KNN 2 \\Crosscheck : False \\FLANN LSH \\FAR THREESHOLD & 190 & 0.26489s & 1.57223s & 1.11384s & 0.04294s & -0.97579s & 1.09073 & 0.63158 \\ \hline
 
     @staticmethod
-    def create_latex_tldr(folder: pathlib.Path, output_file: pathlib.Path):
-        logger = logging.getLogger()
-
+    def create_latex_tldr(folder: pathlib.Path, output_file: pathlib.Path, db_path: pathlib.Path = None):
         f = open(str(output_file.resolve()), "w+")  # Append and create if does not exist
-        f.write("NAME & TRUE POSITIVE & PRE COMPUTING (sec) & MATCHING (sec)" + "\\\\ \hline \r\n")
+        f.write("NAME & TRUE POSITIVE & PRE COMPUTING (sec) & MATCHING (sec) & P50 (sec) & P99 (sec) & PICTURES/S & PAIRS/S" + "\\\\ \hline \r\n")
 
         global_list = []
-        for x in folder.resolve().iterdir():
+        for name, data, error in Configuration_launcher.get_stats_list(folder, db_path=db_path):
+            # Runs without results are not in the table
+            if data is None:
+                continue
 
             global_txt = ""
-
-            if x.is_dir():
-                global_txt += (x.name).replace("_", " ") + " & "
-                stat_file = x / "stats.txt"
-                if stat_file.exists():
-
-                    try :
-                        data = filesystem_lib.File_System.load_json(stat_file)
-                    except Exception as e:
-                        logger.error(f"Impossible to load {stat_file}")
-                    else :
-                        global_txt += str(round(data["TRUE_POSITIVE_RATE"], configuration.TO_ROUND)) + " & "
-                        global_txt += str(round(data["TIME_PER_PICTURE_PRE_COMPUTING"], configuration.TO_ROUND)) + " & "
-                        global_txt += str(round(data["TIME_PER_PICTURE_MATCHING"], configuration.TO_ROUND)) + "\\\\ \hline "
-
-                        global_list.append([global_txt, data["TRUE_POSITIVE_RATE"]])
-
-                # else:
-                #     global_txt += "NO RESULT / ERROR"
-                #     continue # Jump without adding it
+            global_txt += (name).replace("_", " ") + " & "
+            global_txt += str(round(data["TRUE_POSITIVE_RATE"], configuration.TO_ROUND)) + " & "
+            global_txt += str(round(data["TIME_PER_PICTURE_PRE_COMPUTING"], configuration.TO_ROUND)) + " & "
+            global_txt += str(round(data["TIME_PER_PICTURE_MATCHING"], configuration.TO_ROUND)) + " & "
+            # Stats generated before latency percentiles have empty cells
+            percentiles = data.get("LATENCY_PERCENTILES") or {}
+            global_txt += str(Configuration_launcher.round_or_none(percentiles.get("P50"), "-")) + " & "
+            global_txt += str(Configuration_launcher.round_or_none(percentiles.get("P99"), "-")) + " & "
+            global_txt += str(Configuration_launcher.round_or_none(data.get("PICTURES_PER_SECOND_MATCHING"), "-")) + " & "
+            global_txt += str(Configuration_launcher.round_or_none(data.get("PAIRS_PER_SECOND"), "-")) + "\\\\ \hline "
+
+            global_list.append([global_txt, data["TRUE_POSITIVE_RATE"]])
 
         global_list = sorted(global_list, key=lambda l: l[1], reverse=True)
 
@@ -379,22 +738,24 @@ class Configuration_launcher():
 
 
     @staticmethod
-    def create_and_export_inclusion_matrix(folder: pathlib.Path, output_file: pathlib.Path):
-        global_result = graph_lib.Graph_handler.create_inclusion_matrix(folder=folder)
-        graph_lib.Graph_handler.save_matrix_to_json(global_result, output_file.with_suffix(".json"))
+    def create_and_export_inclusion_matrix(folder: pathlib.Path, output_file: pathlib.Path, nb_processes: int = 1, db_path: pathlib.Path = None):
+        names, values = graph_lib.Graph_handler.create_inclusion_array(folder=folder, nb_processes=nb_processes, db_path=db_path)
 
-        ordo, absi, values = graph_lib.Graph_handler.inclusion_matrix_to_triple_array(global_result)
+        # Save the matrix as array (rows and columns in the order of the json sources)
+        np.save(str(output_file.with_suffix(".npy")), values)
+        global_result = graph_lib.Graph_handler.array_to_inclusion_matrix(names, values)
+        graph_lib.Graph_handler.save_matrix_to_json(global_result, output_file.with_suffix(".json"))
 
         graph = graph_lib.Graph_handler()
-        graph.set_values(ordo, absi, values)
+        graph.set_values(names, names, values)
 
         graph.save_matrix(output_file.with_suffix(".pdf"))
 
 
     @staticmethod
-    def create_and_export_pair_matrix(input_folder: pathlib.Path, ground_truth_json: pathlib.Path, output_file: pathlib.Path):
+    def create_and_export_pair_matrix(input_folder: pathlib.Path, ground_truth_json: pathlib.Path, output_file: pathlib.Path, db_path: pathlib.Path = None):
         # Generate pairs
-        global_result = graph_lib.Graph_handler.create_pair_matrix(folder=input_folder, ground_truth_json=ground_truth_json)
+        global_result = graph_lib.Graph_handler.create_pair_matrix(folder=input_folder, ground_truth_json=ground_truth_json, db_path=db_path)
 
         # Save the pair results
         graph_lib.Graph_handler.save_matrix_to_json(global_result, output_file.with_suffix(".json"))
@@ -409,9 +770,13 @@ class Configuration_launcher():
 
 
     @staticmethod
-    def create_paired_results(input_folder: pathlib.Path, target_pair_folder: pathlib.Path, ground_truth_json: pathlib.Path):
-        # Generate pairs
-        graph_lib.Graph_handler.generate_merged_pairs(input_folder=input_folder, target_pair_folder=target_pair_folder)
+    def create_paired_results(input_folder: pathlib.Path, target_pair_folder: pathlib.Path, ground_truth_json: pathlib.Path, output_table: pathlib.Path, shortlist=None, db_path: pathlib.Path = None):
+        # Evaluate all pairs in memory, into one table
+        graph_lib.Graph_handler.evaluate_pairs_to_table(input_folder=input_folder, ground_truth_json=ground_truth_json, output_table=output_table, db_path=db_path)
+
+        if shortlist :
+            # Generate pairs folders, only for the shortlist
+            graph_lib.Graph_handler.generate_merged_pairs(input_folder=input_folder, target_pair_folder=target_pair_folder, shortlist=shortlist, db_path=db_path)
 
-        # Evaluate each graphe
-        graph_lib.Graph_handler.evaluate_graphs(target_pair_folder=target_pair_folder, ground_truth_json=ground_truth_json)
+            # Evaluate each graphe
+            graph_lib.Graph_handler.evaluate_graphs(target_pair_folder=target_pair_folder, ground_truth_json=ground_truth_json)
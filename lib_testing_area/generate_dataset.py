@@ -0,0 +1,44 @@
+# ==================== ------------------------ ====================
+#                       Synthetic dataset generator
+# STD imports
+import logging
+import pathlib
+import argparse
+
+import configuration
+import utility_lib.synthetic_dataset_lib as synthetic_dataset_lib
+
+# Launch example :
+# python3 ./generate_dataset.py -o ../datasets/synthetic_10k -n 10000 -j 8
+# ./launcher.py -i ../datasets/synthetic_10k/pictures -gt ../datasets/synthetic_10k/ground_truth.json -o ../datasets/synthetic_10k -t PNG -ih -tlsh -tldr
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate web page like screenshots in families of near duplicates, with their ground truth graphe")
+    parser.add_argument("-o", "--output", dest="output_folder", type=str, required=True, help="write pictures and ground truth to this folder")
+    parser.add_argument("-n", "--nb_pictures", dest="nb_pictures", type=int, help="number of pictures to generate", default=1000)
+    parser.add_argument("-f", "--max_family_size", dest="max_family_size", type=int, help="maximum number of near duplicates of a page (original included)", default=5)
+    parser.add_argument("-W", "--width", dest="width", type=int, help="width of the original screenshots", default=640)
+    parser.add_argument("-H", "--height", dest="height", type=int, help="height of the original screenshots", default=360)
+    parser.add_argument("-t", "--type", dest="type", type=str, help="image type : PNG or BMP", default="PNG")
+    parser.add_argument("-s", "--seed", dest="seed", type=int, help="seed of the generation : same seed, same dataset", default=0)
+    parser.add_argument("-j", "--jobs", dest="jobs", type=int, help="number of processes generating pictures", default=1)
+    parser.add_argument("-v", "--verbosity", dest='verbose', help="increase output verbosity", action="count", default=0)
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(message)s', level=logging.INFO if args.verbose > 0 else logging.WARNING)
+
+    generator = synthetic_dataset_lib.Synthetic_dataset_generator(output_dir=pathlib.Path(args.output_folder).resolve(),
+                                                                  nb_pictures=args.nb_pictures,
+                                                                  max_family_size=args.max_family_size,
+                                                                  width=args.width,
+                                                                  height=args.height,
+                                                                  img_type=configuration.SUPPORTED_IMAGE_TYPE[args.type.upper()],
+                                                                  seed=args.seed,
+                                                                  nb_processes=args.jobs)
+    pictures_dir, ground_truth_path = generator.generate()
+    print(f"Pictures : {pictures_dir}\nGround truth : {ground_truth_path}")
+
+
+if __name__ == '__main__':
+    main()
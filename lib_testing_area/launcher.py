@@ -36,6 +36,18 @@ utilities = parser.add_argument_group('utilities')
 utilities.add_argument("-v", "--verbosity", dest='verbose',help="increase output verbosity : v is INFO level, vv is DEBUG level, ..", action="count",default=0)
 utilities.add_argument("-sp", "--save_pictures", dest='save_pictures',help="save_picture of algorithms outputs (top3, matches, ..)", action="store_true")
 utilities.add_argument("-Ov", "--overwrite", dest='overwrite', help="overwrite existing output folder and results",action="store_true")
+utilities.add_argument("-db", "--database", dest='database', type=str, help="store results of all configurations in this SQLite file, used by outputs instead of results folders", default=None)
+utilities.add_argument("-nfe", "--no_folder_export", dest='no_folder_export', help="do not write conf, stats and graphe files in results folders (needs a database)", action="store_true")
+utilities.add_argument("-j", "--jobs", dest='jobs', type=int, help="number of processes to run configurations and parallelizable outputs (inclusion matrix, ..) with", default=1)
+utilities.add_argument("-st", "--stage_timing", dest='stage_timing', help="measure durations of each stage (decode, match, ransac, ..) and write them to stats.txt", action="store_true")
+utilities.add_argument("-ra", "--resource_accounting", dest='resource_accounting', help="measure cpu times, memory and context switches of each step of configurations, and write them to stats.txt", action="store_true")
+utilities.add_argument("-tm", "--trace_memory", dest='trace_memory', help="with -ra, trace python allocations of each step with tracemalloc (slower)", action="store_true")
+utilities.add_argument("-tr", "--trace", dest='trace_sampling_period', type=int, help="write a trace of steps, pictures and targets (trace.json, for Perfetto or chrome://tracing) in results folders, keeping one picture or target span out of this number", default=None)
+utilities.add_argument("-dc", "--decode_cache", dest='decode_cache', type=str, help="store decoded pictures once in this folder, memory mapped by all configurations instead of decoding them again", default=None)
+utilities.add_argument("-dcg", "--decode_cache_grayscale", dest='decode_cache_grayscale', help="with -dc, store pictures in gray levels", action="store_true")
+utilities.add_argument("-dcs", "--decode_cache_max_size", dest='decode_cache_max_size', type=int, help="with -dc, downscale stored pictures to this maximum side (changes results)", default=None)
+utilities.add_argument("-ds", "--descriptor_store", dest='descriptor_store', type=str, help="store orb descriptors of the dataset once in this folder, memory mapped by all configurations and later runs instead of computing them again", default=None)
+utilities.add_argument("-mem", "--memory_budget", dest='memory_budget', type=float, help="memory (GB) configurations run in parallel may use together, 80%% of the machine memory by default", default=None)
 
 outputs_group = parser.add_argument_group('outputs')
 outputs_group.add_argument("-ao", "--all-outputs", dest='all_outputs',help="Use all ouputs methods", action="store_true")
@@ -43,6 +55,7 @@ outputs_group.add_argument("-tldr", "--toolongdidntread", dest='tldr', help="cre
 outputs_group.add_argument("-tldr_latex", "--toolongdidntread_in_latex", dest='tldr_latex',help="create an overview of results in latex format (table)", action="store_true")
 outputs_group.add_argument("-p", "--pair_results", dest='pair_results', help="pair algorithm results, evaluate and store them",action="store_true")
 outputs_group.add_argument("-tldr_pair", "--toolongdidntread_for_pairs", dest='tldr_pairs',help="create an overview of results for pairs", action="store_true")
+outputs_group.add_argument("-psl", "--pair_shortlist", dest='pair_shortlist', nargs="+", help="write results folders of these pairs only (<result A>_AND_<result B>)", default=None)
 outputs_group.add_argument("-im", "--inclusion_matrix", dest='inclusion_matrix', help="create an inclusion matrix of results",action="store_true")
 outputs_group.add_argument("-pm", "--inclusion_matrix_for_pairs", dest='inclusion_matrix_pairs',help="create an inclusion matrixof results for pairs", action="store_true")
 
@@ -53,6 +66,10 @@ group_algos.add_argument("-tlsh", "--tlsh", dest='tlsh', help="use tlsh hash alg
 group_algos.add_argument("-orb", "--orb", dest='orb_normal', help="use orb algorithms", action="store_true")
 group_algos.add_argument("-ob", "--orb_bow", dest='orb_bow', help="use orb BoW algorithms", action="store_true")
 group_algos.add_argument("-void", "--void", dest='void', help="use a void algorithm for reference", action="store_true")
+group_algos.add_argument("-cas", "--cascade", dest='cascade', help="use cascade algorithms (hash shortlist, then orb re-ranking)", action="store_true")
+group_algos.add_argument("-sh", "--successive_halving", dest='successive_halving', help="search the best orb (-orb) and orb BoW (-ob) configurations on growing subsets of targets, and run only the best ones on the whole dataset", action="store_true")
+group_algos.add_argument("-shs", "--sh_initial_subset", dest='sh_initial_subset', type=int, help="number of targets of the first round of the successive halving", default=50)
+group_algos.add_argument("-shk", "--sh_keep_share", dest='sh_keep_share', type=float, help="share of configurations kept after each round of the successive halving", default=0.5)
 
 args = parser.parse_args()
 
@@ -65,6 +82,7 @@ if args.all_algos :
     args.orb_normal = True
     args.orb_bow = True
     args.void = True
+    args.cascade = True
 
 if args.all_outputs :
     args.tldr = True
@@ -125,6 +143,7 @@ def manual():
         output_overview_file = pathlib.Path.cwd() / pathlib.Path(curr_base_path + "_output.overview")
         output_latex_overview_file = pathlib.Path.cwd() / pathlib.Path(curr_base_path + "_output.latex.overview")
         output_overview_paired_file = pathlib.Path.cwd() / pathlib.Path(curr_base_path + "_output_paired.overview")
+        output_paired_table = pathlib.Path.cwd() / pathlib.Path(curr_base_path + "_output_paired.csv")
 
         # Output matrix files
         output_similarity_matrix = pathlib.Path.cwd() / pathlib.Path(curr_base_path + "_output.matrix")
@@ -147,11 +166,11 @@ def manual():
         Configuration_launcher.create_latex_tldr(folder=output_folder, output_file=output_latex_overview_file)
 
         # Create overview for paired results
-        Configuration_launcher.create_paired_results(input_folder=output_folder,target_pair_folder=paired_output_folder,ground_truth_json=ground_truth_json)
-        Configuration_launcher.create_tldr(folder=paired_output_folder, output_file=output_overview_paired_file)
+        Configuration_launcher.create_paired_results(input_folder=output_folder,target_pair_folder=paired_output_folder,ground_truth_json=ground_truth_json,output_table=output_paired_table)
+        Configuration_launcher.create_tldr_from_pair_table(table_file=output_paired_table, output_file=output_overview_paired_file)
 
         # Create matrixes
-        Configuration_launcher.create_and_export_inclusion_matrix(folder=output_folder,output_file=output_similarity_matrix)
+        Configuration_launcher.create_and_export_inclusion_matrix(folder=output_folder,output_file=output_similarity_matrix,nb_processes=args.jobs)
         Configuration_launcher.create_and_export_pair_matrix(input_folder=output_folder,ground_truth_json=ground_truth_json,output_file=output_paired_matrix)
 
 
@@ -254,11 +273,20 @@ if __name__ == '__main__':
         output_overview_file = base_path / pathlib.Path(curr_base_path.name + "_output.overview")
         output_latex_overview_file = base_path / pathlib.Path(curr_base_path.name + "_output.latex.overview")
         output_overview_paired_file = base_path / pathlib.Path(curr_base_path.name + "_output_paired.overview")
+        output_paired_table = base_path / pathlib.Path(curr_base_path.name + "_output_paired.csv")
 
         # Output matrix files
         output_similarity_matrix = base_path / pathlib.Path(curr_base_path.name + "_output.matrix")
         output_paired_matrix = base_path / pathlib.Path(curr_base_path.name + "_output_paired.matrix")
 
+        # Results store, relative to the output path
+        results_db_path = None
+        if args.database is not None:
+            results_db_path = pathlib.Path(args.database) if pathlib.Path(args.database).is_absolute() else base_path / pathlib.Path(args.database)
+            logger.info(f"Results database : {results_db_path}")
+        elif args.no_folder_export:
+            logger.warning("No database provided : results are exported to folders anyway.")
+
         logger.info(f"Output path : {output_folder}")
 
         # =============================
@@ -268,7 +296,21 @@ if __name__ == '__main__':
                                                  ground_truth_json=ground_truth_json.resolve(),
                                                  img_type=img_type,
                                                  overwrite_folder=args.overwrite,
-                                                 args=args)
+                                                 args=args,
+                                                 results_db_path=results_db_path,
+                                                 export_to_folder=not (args.no_folder_export and results_db_path is not None),
+                                                 nb_processes=args.jobs,
+                                                 memory_budget=args.memory_budget * 2 ** 30 if args.memory_budget is not None else None,
+                                                 sh_initial_subset=args.sh_initial_subset,
+                                                 sh_keep_share=args.sh_keep_share,
+                                                 stage_timing=args.stage_timing,
+                                                 resource_accounting=args.resource_accounting,
+                                                 trace_memory=args.trace_memory,
+                                                 trace_sampling_period=args.trace_sampling_period,
+                                                 decode_cache_dir=pathlib.Path(args.decode_cache).resolve() if args.decode_cache is not None else None,
+                                                 decode_cache_grayscale=args.decode_cache_grayscale,
+                                                 decode_cache_max_size=args.decode_cache_max_size,
+                                                 descriptor_store_dir=pathlib.Path(args.descriptor_store).resolve() if args.descriptor_store is not None else None)
         try:
             # For profiling : cProfile.run("
             config_launcher.auto_launch()
@@ -280,39 +322,39 @@ if __name__ == '__main__':
 
         # Create overview for simple results
         try:
-            if args.tldr: Configuration_launcher.create_tldr(folder=output_folder, output_file=output_overview_file)
+            if args.tldr: Configuration_launcher.create_tldr(folder=output_folder, output_file=output_overview_file, db_path=results_db_path)
         except Exception as e:
             logger.error(f"Creation of TLDR aborted due to : {e}")
             logger.error(traceback.print_tb(e.__traceback__))
 
         try:
-            if args.tldr_latex: Configuration_launcher.create_latex_tldr(folder=output_folder,output_file=output_latex_overview_file)
+            if args.tldr_latex: Configuration_launcher.create_latex_tldr(folder=output_folder,output_file=output_latex_overview_file, db_path=results_db_path)
         except Exception as e:
             logger.error(f"Creation of TLDR LATEX aborted due to : {e}")
             logger.error(traceback.print_tb(e.__traceback__))
 
         # Create overview for paired results
         try:
-            if args.pair_results: Configuration_launcher.create_paired_results(input_folder=output_folder,target_pair_folder=paired_output_folder,ground_truth_json=ground_truth_json)
+            if args.pair_results: Configuration_launcher.create_paired_results(input_folder=output_folder,target_pair_folder=paired_output_folder,ground_truth_json=ground_truth_json,output_table=output_paired_table,shortlist=args.pair_shortlist, db_path=results_db_path)
         except Exception as e:
             logger.error(f"Creation of paired results aborted due to : {e}")
             logger.error(traceback.print_tb(e.__traceback__))
 
         try:
-            if args.tldr_pairs: Configuration_launcher.create_tldr(folder=paired_output_folder,output_file=output_overview_paired_file)
+            if args.tldr_pairs: Configuration_launcher.create_tldr_from_pair_table(table_file=output_paired_table,output_file=output_overview_paired_file)
         except Exception as e:
             logger.error(f"Creation of TLDR of paired results aborted due to : {e}")
             logger.error(traceback.print_tb(e.__traceback__))
 
         # Create matrixes
         try:
-            if args.inclusion_matrix: Configuration_launcher.create_and_export_inclusion_matrix(folder=output_folder,output_file=output_similarity_matrix)
+            if args.inclusion_matrix: Configuration_launcher.create_and_export_inclusion_matrix(folder=output_folder,output_file=output_similarity_matrix,nb_processes=args.jobs, db_path=results_db_path)
         except Exception as e:
             logger.error(f"Creation of inclusion matrix aborted due to : {e}")
             logger.error(traceback.print_tb(e.__traceback__))
 
         try:
-            if args.inclusion_matrix_pairs: Configuration_launcher.create_and_export_pair_matrix(input_folder=output_folder,ground_truth_json=ground_truth_json,output_file=output_paired_matrix)
+            if args.inclusion_matrix_pairs: Configuration_launcher.create_and_export_pair_matrix(input_folder=output_folder,ground_truth_json=ground_truth_json,output_file=output_paired_matrix, db_path=results_db_path)
         except Exception as e:
             logger.error(f"Creation of quality paired matrix aborted due to : {e}")
             logger.error(traceback.print_tb(e.__traceback__))
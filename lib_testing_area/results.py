@@ -19,10 +19,39 @@ class RESULTS(configuration.JSON_parsable_Dict):
         self.TIME_PER_PICTURE_PRE_COMPUTING = None
 
         self.TIME_TOTAL_MATCHING = None
-        self.TIME_LIST_MATCHING = None
+        self.TIME_LIST_MATCHING = None # Matching time of each target, None above TIME_LIST_MAX_TARGETS targets
         self.TIME_PER_PICTURE_MATCHING = None
+        self.LATENCY_PERCENTILES = None # P50, P90, P99, P99_9 of the matching time of one target (see stats_lib.Latency_sketch)
+        self.PICTURES_PER_SECOND_PRE_COMPUTING = None
+        self.PICTURES_PER_SECOND_MATCHING = None # Targets matched per second
+        self.PAIRS_PER_SECOND = None # Candidate pairs (target, picture) handled per second, pruned ones included
+        self.TIME_PER_STAGE = None # Count, total, extremes and histogram of the durations of each stage, if STAGE_TIMING
+
+        self.MAX_RSS = None # Peak resident memory during the steps of the run (bytes), if RESOURCE_ACCOUNTING
+        self.RESOURCE_USAGE = None # CPU times, memory and context switches of each step of the run, if RESOURCE_ACCOUNTING
 
         self.NB_PICTURE = None
         self.TRUE_POSITIVE_RATE = None
         self.COMPUTED_THREESHOLD = None
+        self.COMPUTED_THREESHOLD_PER_MODE = None # Threshold of each THRESHOLD_MODE, by mode name
         self.TRUE_POSITIVE_RATE_THREESHOLD = None
+
+
+class Cascade_RESULTS(RESULTS):
+    '''
+    Results of a cascade execution : the usual results, plus timings and recall loss of each stage
+    '''
+
+    def __init__(self):
+        super().__init__()
+
+        self.TIME_FIRST_STAGE_PRE_COMPUTING = None
+        self.TIME_SECOND_STAGE_PRE_COMPUTING = None
+
+        self.TIME_FIRST_STAGE_MATCHING = None
+        self.TIME_SECOND_STAGE_MATCHING = None
+
+        # Share of ground truth matches lost by the shortlist of the first stage
+        self.FIRST_STAGE_RECALL_LOSS = None
+        # Share of ground truth matches kept in the shortlist, but not chosen by the second stage
+        self.SECOND_STAGE_RECALL_LOSS = None
@@ -20,6 +20,7 @@ import utility_lib.filesystem_lib  as filesystem_lib
 import utility_lib.text_handler  as text_handler
 import utility_lib.picture_class  as picture_class
 import utility_lib.graph_lib  as graph_lib
+import utility_lib.results_db  as results_db
 import launcher
 
 import configuration
\ No newline at end of file
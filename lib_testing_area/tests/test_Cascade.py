@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+
+from .context import *
+import Cascade.cascade as cascade
+import tempfile
+
+import unittest
+
+
+class test_template(unittest.TestCase):
+    """Basic test cases."""
+
+    def setUp(self):
+        self.logger = logging.getLogger()
+        self.conf = configuration.Default_configuration()
+        self.test_file_path = pathlib.Path.cwd() / pathlib.Path("tests/test_files")
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+        self.curr_configuration = configuration.Cascade_default_configuration()
+        self.curr_configuration.SOURCE_DIR = self.test_file_path / "MINI_DATASET"
+        self.curr_configuration.GROUND_TRUTH_PATH = self.test_file_path / "MINI_DATASET.json"
+        self.curr_configuration.IMG_TYPE = configuration.SUPPORTED_IMAGE_TYPE.PNG
+        self.curr_configuration.SAVE_PICTURE_INSTRUCTION_LIST = []
+        self.curr_configuration.OUTPUT_DIR = pathlib.Path(self.tmp_dir.name) / "Cascade"
+
+    def test_absolute_truth_and_meaning(self):
+        self.assertTrue(True)
+
+    def test_get_stage_handler_class(self):
+        self.assertEqual(cascade.get_stage_handler_class(configuration.ORB_default_configuration()), opencv.OpenCV_execution_handler)
+
+        tmp_conf = configuration.Default_configuration()
+        tmp_conf.ALGO = configuration.ALGO_TYPE.TLSH
+        self.assertEqual(cascade.get_stage_handler_class(tmp_conf).__name__, "TLSH_execution_handler")
+
+        tmp_conf.ALGO = configuration.ALGO_TYPE.D_HASH
+        self.assertEqual(cascade.get_stage_handler_class(tmp_conf).__name__, "Image_hash_execution_handler")
+
+    def test_conf_to_string(self):
+        self.curr_configuration.FIRST_STAGE_CONFIGURATION.ALGO = configuration.ALGO_TYPE.A_HASH
+        self.curr_configuration.CASCADE_SHORTLIST_SIZE = 5
+        name = cascade.Cascade_execution_handler.conf_to_string(self.curr_configuration)
+
+        self.assertTrue(name.startswith("MINI_DATASET_PNG_CASCADE_A_HASH_SHORTLIST_5_ORB_500"))
+
+    def test_full_cascade(self):
+        self.curr_configuration.CASCADE_SHORTLIST_SIZE = 3
+
+        eh = cascade.Cascade_execution_handler(conf=self.curr_configuration)
+        eh.do_full_test()
+
+        # All 15 pictures of the mini dataset have a shortlist of 3 candidates
+        self.assertEqual(len(eh.shortlist_dict), 15)
+        for shortlist in eh.shortlist_dict.values():
+            self.assertEqual(len(shortlist), 3)
+
+        self.assertIsNotNone(eh.results_storage.TIME_FIRST_STAGE_MATCHING)
+        self.assertIsNotNone(eh.results_storage.TIME_SECOND_STAGE_MATCHING)
+        self.assertTrue(0 <= eh.results_storage.FIRST_STAGE_RECALL_LOSS <= 1)
+        self.assertTrue(0 <= eh.results_storage.SECOND_STAGE_RECALL_LOSS <= 1)
+
+        # Full shortlist : no candidate can be lost by the first stage
+        self.curr_configuration.CASCADE_SHORTLIST_SIZE = 100
+        eh = cascade.Cascade_execution_handler(conf=self.curr_configuration)
+        eh.do_full_test()
+        self.assertEqual(eh.results_storage.FIRST_STAGE_RECALL_LOSS, 0)
+
+    def test_recall_loss_uses_ranking(self):
+        # Target "a" has two ground truth matches, both in the shortlist and ranked first by the second stage
+        ground_truth = {"nodes": [{"id": i, "shape": "image", "image": name} for i, name in enumerate(["a", "b", "c", "d"])],
+                        "edges": [{"from": 0, "to": 1}, {"from": 0, "to": 2}]}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            baseline_path = pathlib.Path(tmp_dir) / "ground_truth.json"
+            baseline_path.write_text(json.dumps(ground_truth))
+
+            eh = cascade.Cascade_execution_handler(conf=self.curr_configuration)
+            json_handler = json_class.Json_handler(eh.conf)
+            json_handler.graphe.nodes = [{"id": 10 + i, "shape": "image", "image": name} for i, name in enumerate(["a", "b", "c", "d"])]
+            # Final edges are cut to one per target : only the best match is kept
+            json_handler.graphe.edges = [{"from": 10, "to": 12}]
+
+            eh.shortlist_dict = {10: [11, 12, 13]}
+            eh.ranking_dict = {10: [12, 11, 13]}
+            eh.evaluate_shortlists(json_handler, baseline_path)
+            self.assertEqual(eh.results_storage.FIRST_STAGE_RECALL_LOSS, 0)
+            self.assertEqual(eh.results_storage.SECOND_STAGE_RECALL_LOSS, 0)
+
+            # One of the matches is ranked after the top-2 of the second stage
+            eh.ranking_dict = {10: [12, 13, 11]}
+            eh.evaluate_shortlists(json_handler, baseline_path)
+            self.assertEqual(eh.results_storage.SECOND_STAGE_RECALL_LOSS, 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
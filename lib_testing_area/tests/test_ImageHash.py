@@ -3,6 +3,16 @@
 from .context import *
 
 import unittest
+import tempfile
+import argparse
+import imagehash
+import numpy as np
+from PIL import Image
+
+import ImageHash.imagehash_test as image_hash
+import ImageHash.multi_hash as multi_hash
+import utility_lib.execution_handler as execution_handler
+import configuration_launcher
 
 class test_template(unittest.TestCase):
     """Basic test cases."""
@@ -11,10 +21,100 @@ class test_template(unittest.TestCase):
         self.logger = logging.getLogger()
         self.conf = configuration.Default_configuration()
         self.test_file_path = pathlib.Path.cwd() / pathlib.Path("tests/test_files")
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.output_dir = pathlib.Path(self.tmp_dir.name)
 
     def test_absolute_truth_and_meaning(self):
         self.assertTrue(True)
 
+    def test_compute_batch_hashes(self):
+        # Same hashes as imagehash, for pictures of the dataset, random noise and gradients of several sizes
+        hash_functions = {configuration.ALGO_TYPE.A_HASH: imagehash.average_hash,
+                          configuration.ALGO_TYPE.P_HASH: imagehash.phash,
+                          configuration.ALGO_TYPE.P_HASH_SIMPLE: imagehash.phash_simple,
+                          configuration.ALGO_TYPE.D_HASH: imagehash.dhash,
+                          configuration.ALGO_TYPE.D_HASH_VERTICAL: imagehash.dhash_vertical,
+                          configuration.ALGO_TYPE.W_HASH: imagehash.whash}
+
+        image_list = [Image.open(picture_path) for picture_path in sorted((self.test_file_path / "MINI_DATASET").glob("*.png"))]
+        rng = np.random.default_rng(0)
+        for width, height in [(40, 30), (64, 64), (300, 17), (1000, 700)]:
+            image_list.append(Image.fromarray(rng.integers(0, 256, (height, width, 3), dtype=np.uint8)))
+            gradient = np.add.outer(np.arange(height), np.arange(width)) * 255 // (height + width)
+            image_list.append(Image.fromarray(gradient.astype(np.uint8)))
+        image_list.append(Image.new("RGB", (50, 50), (10, 20, 30)))
+
+        hashes = multi_hash.compute_batch_hashes([image.convert('L') for image in image_list], multi_hash.IMAGE_HASH_ALGOS)
+        for algo, hash_function in hash_functions.items():
+            self.assertEqual(hashes[algo].shape, (len(image_list), 8))
+            for image, packed_hash in zip(image_list, hashes[algo]):
+                self.assertEqual(str(multi_hash.to_image_hash(packed_hash)), str(hash_function(image)))
+
+    def test_packed_distances(self):
+        self.conf.SOURCE_DIR = self.test_file_path / "MINI_DATASET"
+        self.conf.OUTPUT_DIR = self.output_dir / "P_HASH"
+        self.conf.ALGO = configuration.ALGO_TYPE.P_HASH
+        eh = image_hash.Image_hash_execution_handler(conf=self.conf)
+        picture_list = eh.prepare_dataset(eh.load_pictures(self.conf.SOURCE_DIR, eh.Local_Picture_class_ref))
+
+        for target_picture in picture_list:
+            sorted_picture_list = eh.find_top_k_closest_pictures(picture_list, target_picture)
+            # Same distances and ordering as per pair
+            expected_list = execution_handler.Execution_handler.find_top_k_closest_pictures(eh, picture_list, target_picture)
+            self.assertEqual([(p.path, p.distance) for p in sorted_picture_list], [(p.path, p.distance) for p in expected_list])
+
+    def test_hash_store(self):
+        self.conf.SOURCE_DIR = self.test_file_path / "MINI_DATASET"
+        self.conf.GROUND_TRUTH_PATH = self.test_file_path / "MINI_DATASET.json"
+
+        for algo in multi_hash.IMAGE_HASH_ALGOS:
+            self.conf.ALGO = algo
+            self.conf.OUTPUT_DIR = self.output_dir / algo.name
+
+            self.conf.HASH_STORE_PATH = None
+            eh = image_hash.Image_hash_execution_handler(conf=self.conf)
+            hash_list = [str(p.hash) for p in eh.prepare_dataset(eh.load_pictures(self.conf.SOURCE_DIR, eh.Local_Picture_class_ref))]
+
+            self.conf.HASH_STORE_PATH = self.output_dir / multi_hash.HASH_STORE_FILE
+            eh = image_hash.Image_hash_execution_handler(conf=self.conf)
+            if algo != multi_hash.IMAGE_HASH_ALGOS[0]:
+                # Hashes of the first configuration are read
+                eh.hash_pictures = None
+                self.assertTrue(multi_hash.Hash_store.get_store(self.conf).open(eh.load_pictures(self.conf.SOURCE_DIR, eh.Local_Picture_class_ref)))
+            stored_hash_list = [str(p.hash) for p in eh.prepare_dataset(eh.load_pictures(self.conf.SOURCE_DIR, eh.Local_Picture_class_ref))]
+
+            self.assertEqual(stored_hash_list, hash_list)
+
+        # Hashes of another decoding are not read
+        self.conf.DECODE_CACHE_DIR = self.output_dir / "cache"
+        self.assertFalse(multi_hash.Hash_store.get_store(self.conf).open(eh.load_pictures(self.conf.SOURCE_DIR, eh.Local_Picture_class_ref)))
+
+    def test_parallel_hash_store(self):
+        # Built once by the launcher, before the parallel configurations : none of them hashes the dataset again
+        launcher = configuration_launcher.Configuration_launcher(source_pictures_dir=self.test_file_path / "MINI_DATASET",
+                                                                 output_folder=self.output_dir,
+                                                                 ground_truth_json=self.test_file_path / "MINI_DATASET.json",
+                                                                 img_type=configuration.SUPPORTED_IMAGE_TYPE.PNG,
+                                                                 overwrite_folder=True,
+                                                                 args=argparse.Namespace(save_pictures=False),
+                                                                 nb_processes=2)
+        store_path = self.output_dir / multi_hash.HASH_STORE_FILE
+        original_function = launcher.prepare_hash_store
+        store_mtime_list = []
+        def checked_function(curr_configuration, hash_store_path):
+            original_function(curr_configuration, hash_store_path)
+            store_mtime_list.append(store_path.stat().st_mtime_ns)
+        launcher.prepare_hash_store = checked_function
+
+        launcher.auto_launch_image_hash()
+        self.assertEqual(len(launcher.scheduler.pending_list), len(multi_hash.IMAGE_HASH_ALGOS))
+        launcher.scheduler.run(launcher.launch_exec_handler)
+
+        self.assertEqual(len(set(store_mtime_list)), 1)
+        self.assertEqual(store_path.stat().st_mtime_ns, store_mtime_list[0])
+        self.assertEqual(len(list(self.output_dir.glob("*/stats.txt"))), len(multi_hash.IMAGE_HASH_ALGOS))
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -3,6 +3,7 @@
 from .context import *
 
 import unittest
+import tempfile
 
 
 class test_template(unittest.TestCase):
@@ -12,13 +13,16 @@ class test_template(unittest.TestCase):
         self.logger = logging.getLogger()
         self.conf = configuration.Default_configuration()
         self.test_file_path = pathlib.Path.cwd() / pathlib.Path("tests/test_files")
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
 
         self.curr_configuration = configuration.ORB_default_configuration()
         self.curr_configuration.SOURCE_DIR = self.test_file_path / "MINI_DATASET"
         self.curr_configuration.GROUND_TRUTH_PATH = self.test_file_path / "MINI_DATASET.json"
         self.curr_configuration.IMG_TYPE = configuration.SUPPORTED_IMAGE_TYPE.PNG
         self.curr_configuration.SAVE_PICTURE = False
-        self.curr_configuration.OUTPUT_DIR = self.test_file_path / "OpenCV"
+        self.curr_configuration.OUTPUT_DIR = pathlib.Path(self.tmp_dir.name) / "OpenCV"
 
         # Create conf
         self.curr_configuration.ALGO = configuration.ALGO_TYPE.ORB
@@ -63,5 +67,138 @@ class test_template(unittest.TestCase):
             traceback.print_tb(e.__traceback__)
             self.assertTrue(False)
 
+    def test_bound_pruning(self):
+        self.curr_configuration.OUTPUT_DIR = self.curr_configuration.OUTPUT_DIR / "PRUNING"
+
+        self.curr_configuration.MATCH = configuration.MATCH_TYPE.STD
+        self.curr_configuration.DATASTRUCT = configuration.DATASTRUCT_TYPE.BRUTE_FORCE
+        self.curr_configuration.FILTER = configuration.FILTER_TYPE.NO_FILTER
+        self.curr_configuration.DISTANCE = configuration.DISTANCE_TYPE.LEN_MAX
+
+        for crosscheck in [configuration.CROSSCHECK.DISABLED, configuration.CROSSCHECK.ENABLED]:
+            self.curr_configuration.CROSSCHECK = crosscheck
+
+            eh = opencv.OpenCV_execution_handler(conf=self.curr_configuration)
+            picture_list = eh.prepare_dataset(eh.load_pictures(self.curr_configuration.SOURCE_DIR, eh.Local_Picture_class_ref))
+            self.assertTrue(eh.is_bound_pruning_possible())
+
+            for target_picture in picture_list:
+                eh.conf.BOUND_PRUNING = False
+                full_list = [(i.path, i.distance) for i in eh.find_top_k_closest_pictures(picture_list, target_picture)]
+                eh.conf.BOUND_PRUNING = True
+                pruned_list = [(i.path, i.distance) for i in eh.find_top_k_closest_pictures(picture_list, target_picture)]
+
+                # Same top-K, in the same order
+                top_k = eh.get_needed_top_k()
+                self.assertEqual(full_list[:top_k], pruned_list[:top_k])
+
+                # Pruned candidates are still returned, after the ranked ones
+                self.assertEqual(len(pruned_list), len(full_list))
+                self.assertEqual({i[0] for i in pruned_list}, {i[0] for i in full_list})
+                ranked_distances = [i[1] for i in pruned_list if i[1] is not None]
+                self.assertEqual(ranked_distances, sorted(ranked_distances))
+                self.assertTrue(all(i[1] is None for i in pruned_list[len(ranked_distances):]))
+
+        # LEN_MIN bound can't prune anything
+        self.curr_configuration.DISTANCE = configuration.DISTANCE_TYPE.LEN_MIN
+        self.assertFalse(opencv.OpenCV_execution_handler(conf=self.curr_configuration).is_bound_pruning_possible())
+
+    def test_bound_pruning_flann(self):
+        # FLANN never crosschecks : one target descriptor can be matched by many candidate descriptors
+        # (distances change at each match : bounds are checked on each computed distance, not on the top-K)
+        self.curr_configuration.OUTPUT_DIR = self.curr_configuration.OUTPUT_DIR / "PRUNING_FLANN"
+
+        self.curr_configuration.MATCH = configuration.MATCH_TYPE.STD
+        self.curr_configuration.DATASTRUCT = configuration.DATASTRUCT_TYPE.FLANN_LSH
+        self.curr_configuration.FILTER = configuration.FILTER_TYPE.NO_FILTER
+        self.curr_configuration.DISTANCE = configuration.DISTANCE_TYPE.LEN_MAX
+        self.curr_configuration.CROSSCHECK = configuration.CROSSCHECK.ENABLED
+
+        eh = opencv.OpenCV_execution_handler(conf=self.curr_configuration)
+        self.assertFalse(eh.MATCHER_CROSSCHECK)
+        picture_list = eh.prepare_dataset(eh.load_pictures(self.curr_configuration.SOURCE_DIR, eh.Local_Picture_class_ref))
+
+        for target_picture in picture_list:
+            for curr_picture in picture_list:
+                distance = eh.TO_OVERWRITE_compute_distance(curr_picture, target_picture)
+                if distance is not None:
+                    self.assertLessEqual(eh.get_distance_lower_bound(curr_picture, target_picture), distance)
+
+    def test_match_array_filters(self):
+        knn_matches = [(cv2.DMatch(0, 3, 10), cv2.DMatch(0, 4, 40)),
+                       (cv2.DMatch(1, 5, 30), cv2.DMatch(1, 6, 35)),
+                       (cv2.DMatch(2, 7, 70),),
+                       ()]
+        matches = opencv.Match_array.from_knn_matches(knn_matches)
+        self.assertEqual(len(matches), 3)
+
+        # Ratio test keeps clear best matches, and matches without second best
+        good = opencv.OpenCV_execution_handler.ratio_good(matches)
+        self.assertEqual(list(good.query_idx), [0, 2])
+
+        good = opencv.OpenCV_execution_handler.threeshold_distance_filter(good)
+        self.assertEqual(list(good.train_idx), [3])
+
+        self.assertAlmostEqual(opencv.OpenCV_execution_handler.mean_matches_dist(matches), 110 / 3)
+
+        dmatch_list = opencv.Match_array.from_matches([cv2.DMatch(0, 1, 20), cv2.DMatch(1, 0, 5)]).to_dmatch_list()
+        self.assertEqual([m.queryIdx for m in dmatch_list], [1, 0])
+
+    def test_knn_no_filter_distance(self):
+        self.curr_configuration.MATCH = configuration.MATCH_TYPE.KNN
+        self.curr_configuration.DATASTRUCT = configuration.DATASTRUCT_TYPE.BRUTE_FORCE
+        self.curr_configuration.CROSSCHECK = configuration.CROSSCHECK.DISABLED
+        self.curr_configuration.FILTER = configuration.FILTER_TYPE.NO_FILTER
+        self.curr_configuration.DISTANCE = configuration.DISTANCE_TYPE.LEN_MAX
+
+        eh = opencv.OpenCV_execution_handler(conf=self.curr_configuration)
+        picture_list = eh.prepare_dataset(eh.load_pictures(self.curr_configuration.SOURCE_DIR, eh.Local_Picture_class_ref))
+
+        # Same distance as the count of the raw knnMatch list
+        target_picture = picture_list[0]
+        for curr_picture in picture_list[1:]:
+            knn_matches = eh.matcher.knnMatch(curr_picture.description, target_picture.description, k=self.curr_configuration.MATCH_K_FOR_KNN)
+            expected = 1 - len(knn_matches) / max(len(curr_picture.description), len(target_picture.description))
+            self.assertAlmostEqual(eh.TO_OVERWRITE_compute_distance(curr_picture, target_picture), expected)
+
+    def test_save_pictures(self):
+        self.curr_configuration.OUTPUT_DIR = self.curr_configuration.OUTPUT_DIR / "SAVE"
+
+        self.curr_configuration.FILTER = configuration.FILTER_TYPE.RANSAC
+        self.curr_configuration.SAVE_PICTURE_INSTRUCTION_LIST = [configuration.PICTURE_SAVE_MODE.FEATURE_MATCHES_TOP3,
+                                                                 configuration.PICTURE_SAVE_MODE.RANSAC_MATRIX]
+
+        eh = opencv.OpenCV_execution_handler(conf=self.curr_configuration)
+        eh.do_full_test()
+
+        self.assertEqual(len(list((self.curr_configuration.OUTPUT_DIR / "MATCHES").iterdir())), 15)
+        self.assertEqual(len(list((self.curr_configuration.OUTPUT_DIR / "MATCHES_INOUTLINERS").iterdir())), 15)
+        self.assertTrue(len(list((self.curr_configuration.OUTPUT_DIR / "RANSAC").iterdir())) > 0)
+        # Details are released once pictures are saved
+        self.assertEqual(eh.match_details, {})
+
+    def test_match_details(self):
+        self.curr_configuration.FILTER = configuration.FILTER_TYPE.RANSAC
+
+        eh = opencv.OpenCV_execution_handler(conf=self.curr_configuration)
+        picture_list = eh.prepare_dataset(eh.load_pictures(self.curr_configuration.SOURCE_DIR, eh.Local_Picture_class_ref))
+        target_picture = picture_list[0]
+
+        # Nothing to draw : no details kept
+        self.assertFalse(eh.is_match_details_needed())
+        eh.find_top_k_closest_pictures(picture_list, target_picture)
+        self.assertEqual(eh.match_details, {})
+
+        # Details kept only for the drawn pictures, and identical to the ones of the search
+        eh.conf.SAVE_PICTURE_INSTRUCTION_LIST = [configuration.PICTURE_SAVE_MODE.RANSAC_MATRIX]
+        sorted_picture_list = eh.find_top_k_closest_pictures(picture_list, target_picture)
+        kept_details = eh.match_details[target_picture.path]
+        self.assertEqual(list(kept_details.keys()), [i.path for i in sorted_picture_list[:opencv.NB_BEST_PICTURES + 1]])
+
+        for curr_picture in sorted_picture_list[:opencv.NB_BEST_PICTURES + 1]:
+            dist, details = eh.compute_distance_and_details(curr_picture, target_picture)
+            self.assertEqual(dist, curr_picture.distance)
+            self.assertEqual(len(details.matches), len(kept_details[curr_picture.path].matches))
+
 if __name__ == '__main__':
     unittest.main()
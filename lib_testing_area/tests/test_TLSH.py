@@ -3,6 +3,13 @@
 from .context import *
 
 import unittest
+import tempfile
+import random
+import tlsh
+
+import TLSH.tlsh_test as tlsh_test
+from TLSH.tlsh_digest import Digest_array
+import utility_lib.execution_handler as execution_handler
 
 class test_template(unittest.TestCase):
     """Basic test cases."""
@@ -11,10 +18,47 @@ class test_template(unittest.TestCase):
         self.logger = logging.getLogger()
         self.conf = configuration.Default_configuration()
         self.test_file_path = pathlib.Path.cwd() / pathlib.Path("tests/test_files")
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
 
     def test_absolute_truth_and_meaning(self):
         self.assertTrue(True)
 
+    def test_digest_array(self):
+        # Digests of pictures, of random data and of its modified copies (close digests)
+        rng = random.Random(0)
+        data = bytes(rng.getrandbits(8) for _ in range(5000))
+        digest_list = [tlsh.hash(path.read_bytes()) for path in sorted((self.test_file_path / "MINI_DATASET").glob("*.png"))]
+        for i in range(50):
+            curr_data = bytearray(data)
+            for _ in range(rng.randint(0, 300)):
+                curr_data[rng.randrange(len(curr_data))] = rng.getrandbits(8)
+            digest_list.append(tlsh.hash(bytes(curr_data)))
+        # Replacement hash of the handler, without version prefix
+        digest_list.append("0" * 70)
+
+        digest_array = Digest_array(digest_list)
+        self.assertTrue(digest_array.decoded.all())
+        for target_digest in digest_list:
+            self.assertEqual(digest_array.diff(target_digest, len_diff=True).tolist(), [tlsh.diff(digest, target_digest) for digest in digest_list])
+            self.assertEqual(digest_array.diff(target_digest, len_diff=False).tolist(), [tlsh.diffxlen(digest, target_digest) for digest in digest_list])
+
+    def test_handler_distances(self):
+        self.conf.SOURCE_DIR = self.test_file_path / "MINI_DATASET"
+        self.conf.OUTPUT_DIR = pathlib.Path(self.tmp_dir.name) / "TLSH"
+
+        for algo in [configuration.ALGO_TYPE.TLSH, configuration.ALGO_TYPE.TLSH_NO_LENGTH]:
+            self.conf.ALGO = algo
+            eh = tlsh_test.TLSH_execution_handler(conf=self.conf)
+            picture_list = eh.prepare_dataset(eh.load_pictures(self.conf.SOURCE_DIR, eh.Local_Picture_class_ref))
+
+            for target_picture in picture_list:
+                sorted_picture_list = eh.find_top_k_closest_pictures(picture_list, target_picture)
+                # Same distances and ordering as per pair
+                expected_list = execution_handler.Execution_handler.find_top_k_closest_pictures(eh, picture_list, target_picture)
+                self.assertEqual([(p.path, p.distance) for p in sorted_picture_list], [(p.path, p.distance) for p in expected_list])
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+from .context import *
+
+import unittest
+import tempfile
+
+import configuration_launcher
+import ImageHash.imagehash_test as image_hash
+
+class test_template(unittest.TestCase):
+    """Basic test cases."""
+
+    def setUp(self):
+        self.logger = logging.getLogger()
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.test_file_path = pathlib.Path(self.tmp_dir.name)
+        self.source_pictures_dir = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET")
+        self.ground_truth_json = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET.json")
+
+    def get_conf(self, algo):
+        conf = configuration.Default_configuration()
+        conf.SOURCE_DIR = self.source_pictures_dir
+        conf.GROUND_TRUTH_PATH = self.ground_truth_json
+        conf.ALGO = algo
+        conf.OUTPUT_DIR = self.test_file_path / image_hash.Image_hash_execution_handler.conf_to_string(conf)
+        return conf
+
+    def test_absolute_truth_and_meaning(self):
+        self.assertTrue(True)
+
+    def test_target_subset(self):
+        conf = self.get_conf(configuration.ALGO_TYPE.A_HASH)
+        conf.TARGET_SUBSET = ["dmaz.top.png", "litexdrop.com.png", "not_in_dataset.png"]
+
+        eh = image_hash.Image_hash_execution_handler(conf=conf)
+        eh.do_full_test()
+
+        # Only edges from the targets, to any picture
+        self.assertEqual(eh.results_storage.NB_PICTURE, 2)
+        source_names = {node["image"] for node in eh.json_handler.graphe.nodes
+                        if node["id"] in {edge["from"] for edge in eh.json_handler.graphe.edges}}
+        self.assertEqual(source_names, {"dmaz.top.png", "litexdrop.com.png"})
+
+    def test_round(self):
+        launcher = configuration_launcher.Configuration_launcher(source_pictures_dir=self.source_pictures_dir,
+                                                                 output_folder=self.test_file_path,
+                                                                 ground_truth_json=self.ground_truth_json,
+                                                                 img_type=configuration.SUPPORTED_IMAGE_TYPE.PNG,
+                                                                 overwrite_folder=False,
+                                                                 args=None)
+
+        candidate_list = [[image_hash.Image_hash_execution_handler, self.get_conf(algo)]
+                          for algo in [configuration.ALGO_TYPE.A_HASH, configuration.ALGO_TYPE.P_HASH,
+                                       configuration.ALGO_TYPE.D_HASH, configuration.ALGO_TYPE.W_HASH]]
+        target_subset = sorted(p.name for p in self.source_pictures_dir.glob("*.png"))[:5]
+
+        kept_list = launcher.run_successive_halving_round(candidate_list, target_subset, 0)
+        self.assertEqual(len(kept_list), 2)
+        # Configurations to run on the whole dataset are returned untouched
+        self.assertIsNone(kept_list[0][1].TARGET_SUBSET)
+
+        round_scores = filesystem_lib.File_System.load_json(self.test_file_path / configuration_launcher.SUCCESSIVE_HALVING_FOLDER / "round_0.json")
+        self.assertEqual(round_scores["NB_TARGETS"], 5)
+        self.assertEqual(len(round_scores["CONFIGURATIONS"]), 4)
+
+        scores = [c["TRUE_POSITIVE_RATE"] for c in round_scores["CONFIGURATIONS"]]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertEqual({c["name"] for c in round_scores["CONFIGURATIONS"] if c["KEPT"]},
+                         {c[1].OUTPUT_DIR.name for c in kept_list})
+
+        # Partial runs are not listed among results
+        self.assertEqual(configuration_launcher.Configuration_launcher.get_stats_list(self.test_file_path), [])
+    def test_launcher_checkpoints(self):
+        # Only launched configurations save their progress
+        conf = self.get_conf(configuration.ALGO_TYPE.A_HASH)
+        self.assertIsNone(conf.CHECKPOINT_INTERVAL)
+
+        launcher = configuration_launcher.Configuration_launcher(source_pictures_dir=self.source_pictures_dir,
+                                                                 output_folder=self.test_file_path,
+                                                                 ground_truth_json=self.ground_truth_json,
+                                                                 img_type=configuration.SUPPORTED_IMAGE_TYPE.PNG,
+                                                                 overwrite_folder=False,
+                                                                 args=None)
+        launcher.set_launcher_options(conf)
+        self.assertEqual(conf.CHECKPOINT_INTERVAL, 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
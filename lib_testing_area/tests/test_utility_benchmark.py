@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+from .context import *
+
+import unittest
+import tempfile
+
+import utility_lib.benchmark_lib as benchmark_lib
+import benchmark
+
+class test_template(unittest.TestCase):
+    """Basic test cases."""
+
+    def setUp(self):
+        self.logger = logging.getLogger()
+        self.source_pictures_dir = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET")
+        self.ground_truth_json = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET.json")
+
+    def test_absolute_truth_and_meaning(self):
+        self.assertTrue(True)
+
+    def test_measure(self):
+        calls = []
+        duration_list = benchmark_lib.measure(lambda: calls.append(1), repetitions=5, warmup=2)
+
+        # Warm-up calls are not measured
+        self.assertEqual(len(calls), 7)
+        self.assertEqual(len(duration_list), 5)
+
+    def test_describe_durations(self):
+        stats = benchmark_lib.describe_durations([1, 2, 3, 4, 100], nb_operations=2)
+
+        self.assertEqual(stats["MEDIAN"], 3)
+        self.assertEqual(stats["Q1"], 2)
+        self.assertEqual(stats["Q3"], 4)
+        self.assertEqual(stats["IQR"], 2)
+        self.assertEqual(stats["MEDIAN_PER_OPERATION"], 1.5)
+
+    def test_suite(self):
+        with tempfile.TemporaryDirectory() as output_dir:
+            suite = benchmark.create_suite(pathlib.Path(output_dir), self.source_pictures_dir, self.ground_truth_json)
+            benchmark_results = suite.run(repetitions=2, warmup=1, name_filter=["tlsh", "evaluate_json"])
+
+            output_file = pathlib.Path(output_dir) / "benchmark.json"
+            benchmark_lib.Benchmark_suite.save_results(benchmark_results, output_file)
+            loaded_results = filesystem_lib.File_System.load_json(output_file)
+
+        # All hot paths have a case
+        for name in ["load_picture_PIL", "imagehash_W_HASH", "tlsh_diff", "orb_describe_picture", "orb_match", "orb_knnMatch",
+                     "orb_ransac_filter", "bow_compareHist_CORREL", "find_top_k_closest_pictures_ORB", "evaluate_json"]:
+            self.assertIn(name, suite.get_names())
+
+        self.assertEqual(sorted(loaded_results["RESULTS"].keys()), ["evaluate_json", "tlsh_diff", "tlsh_diffxlen", "tlsh_hash"])
+        self.assertEqual(loaded_results["RESULTS"]["tlsh_hash"]["NB_REPETITIONS"], 2)
+        self.assertIn("COMMIT", loaded_results["ENVIRONMENT"])
+
+        ratios = benchmark_lib.Benchmark_suite.compare_results(loaded_results, benchmark_results)
+        self.assertAlmostEqual(ratios["tlsh_hash"], 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+from .context import *
+
+import unittest
+import tempfile
+
+import utility_lib.checkpoint_lib as checkpoint_lib
+import ImageHash.imagehash_test as image_hash
+
+
+class Interruption(BaseException):
+    # Not caught by the handler, as a kill
+    pass
+
+
+class test_template(unittest.TestCase):
+    """Basic test cases."""
+
+    def setUp(self):
+        self.logger = logging.getLogger()
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.test_file_path = pathlib.Path(self.tmp_dir.name)
+
+    def test_absolute_truth_and_meaning(self):
+        self.assertTrue(True)
+
+    def get_conf(self, name: str):
+        conf = configuration.ORB_default_configuration()
+        conf.ALGO = configuration.ALGO_TYPE.ORB
+        conf.DATASTRUCT = configuration.DATASTRUCT_TYPE.BRUTE_FORCE
+        conf.SOURCE_DIR = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET")
+        conf.GROUND_TRUTH_PATH = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET.json")
+        conf.OUTPUT_DIR = self.test_file_path / name
+        conf.CHECKPOINT_INTERVAL = 0  # After each target
+        return conf
+
+    def test_resume(self):
+        reference = opencv.OpenCV_execution_handler(conf=self.get_conf("reference"))
+        reference.do_full_test()
+        self.assertTrue(checkpoint_lib.is_completed(reference.conf.OUTPUT_DIR))
+        self.assertFalse((reference.conf.OUTPUT_DIR / checkpoint_lib.CHECKPOINT_FOLDER).exists())
+
+        # Interrupted after 5 targets
+        conf = self.get_conf("interrupted")
+        interrupted = opencv.OpenCV_execution_handler(conf=conf)
+        nb_targets = [0]
+        original_function = interrupted.find_top_k_closest_pictures
+        def interrupted_function(picture_list, target_picture):
+            if nb_targets[0] == 5:
+                raise Interruption()
+            nb_targets[0] += 1
+            return original_function(picture_list, target_picture)
+        interrupted.find_top_k_closest_pictures = interrupted_function
+
+        with self.assertRaises(Interruption):
+            interrupted.do_full_test()
+        self.assertFalse(checkpoint_lib.is_completed(conf.OUTPUT_DIR))
+        # Latencies are checkpointed as a sketch, not rebuilt from the timings list
+        self.assertEqual(checkpoint_lib.Checkpoint_handler(conf=conf).load_progress()["latency_sketch"].count, 5)
+
+        # Resumed : features are not computed again, only remaining targets are
+        resumed = opencv.OpenCV_execution_handler(conf=conf)
+        resumed.describe_pictures = None
+        targets = []
+        original_function = resumed.find_top_k_closest_pictures
+        def counted_function(picture_list, target_picture):
+            targets.append(target_picture.path.name)
+            return original_function(picture_list, target_picture)
+        resumed.find_top_k_closest_pictures = counted_function
+        resumed.do_full_test()
+
+        self.assertEqual(len(targets), len(reference.picture_list) - 5)
+        self.assertEqual(len(resumed.list_time), len(reference.picture_list))
+        self.assertEqual([(e["from"], e["to"], e["title"]) for e in resumed.json_handler.graphe.edges],
+                         [(e["from"], e["to"], e["title"]) for e in reference.json_handler.graphe.edges])
+        self.assertEqual(resumed.results_storage.TRUE_POSITIVE_RATE, reference.results_storage.TRUE_POSITIVE_RATE)
+        self.assertTrue(checkpoint_lib.is_completed(conf.OUTPUT_DIR))
+
+    def test_without_checkpoints(self):
+        # Executions not launched are not resumable : nothing written for checkpoints nor completion
+        conf = self.get_conf("without_checkpoints")
+        conf.CHECKPOINT_INTERVAL = None
+        opencv.OpenCV_execution_handler(conf=conf).do_full_test()
+        self.assertFalse((conf.OUTPUT_DIR / checkpoint_lib.COMPLETED_FILE).exists())
+        self.assertFalse((conf.OUTPUT_DIR / checkpoint_lib.CHECKPOINT_FOLDER).exists())
+
+    def test_dataset_changed(self):
+        conf = self.get_conf("dataset_changed")
+        handler = image_hash.Image_hash_execution_handler(conf=conf)
+        handler.checkpoint_handler = checkpoint_lib.Checkpoint_handler(conf=conf)
+        picture_list = handler.load_pictures(conf.SOURCE_DIR, handler.Local_Picture_class_ref)
+        handler.prepare_dataset(picture_list)
+
+        self.assertIsNotNone(handler.checkpoint_handler.load_features(picture_list, handler.checkpoint_attributes))
+        self.assertIsNone(handler.checkpoint_handler.load_features(picture_list[1:], handler.checkpoint_attributes))
+
+if __name__ == '__main__':
+    unittest.main()
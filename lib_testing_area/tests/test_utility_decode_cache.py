@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+
+from .context import *
+
+import unittest
+import tempfile
+import numpy as np
+from PIL import Image
+
+import utility_lib.decode_cache_lib as decode_cache_lib
+import ImageHash.imagehash_test as image_hash
+import ImageHash.multi_hash as multi_hash
+
+class test_template(unittest.TestCase):
+    """Basic test cases."""
+
+    def setUp(self):
+        self.logger = logging.getLogger()
+        self.test_file_path = pathlib.Path.cwd() / pathlib.Path("tests/test_files")
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.output_dir = pathlib.Path(self.tmp_dir.name)
+        self.picture_path = sorted((self.test_file_path / "MINI_DATASET").glob("*.png"))[0]
+
+    def test_absolute_truth_and_meaning(self):
+        self.assertTrue(True)
+
+    def test_cache(self):
+        cache = decode_cache_lib.Decoded_picture_cache(self.output_dir / "cache")
+        image = cache.get(self.picture_path)
+        cached_image = cache.get(self.picture_path)
+
+        # Decoded once, then memory mapped
+        self.assertEqual(len(list((self.output_dir / "cache").glob("**/*.npy"))), 1)
+        self.assertIsInstance(cached_image, np.memmap)
+        self.assertFalse(cached_image.flags.writeable)
+        self.assertTrue(np.array_equal(cached_image, cv2.cvtColor(cv2.imread(str(self.picture_path)), cv2.COLOR_BGR2RGB)))
+        self.assertTrue(np.array_equal(image, cached_image))
+
+    def test_variants(self):
+        rgb_image = decode_cache_lib.Decoded_picture_cache(self.output_dir / "cache").get(self.picture_path)
+        gray_image = decode_cache_lib.Decoded_picture_cache(self.output_dir / "cache", grayscale=True).get(self.picture_path)
+        small_image = decode_cache_lib.Decoded_picture_cache(self.output_dir / "cache", max_size=100).get(self.picture_path)
+
+        self.assertEqual(gray_image.shape, rgb_image.shape[:2])
+        self.assertEqual(max(small_image.shape[:2]), 100)
+
+        # Same keypoints and descriptors as from the colored picture
+        orb = cv2.ORB_create(nfeatures=200)
+        key_points_rgb, description_rgb = orb.detectAndCompute(np.array(rgb_image), None)
+        key_points_gray, description_gray = orb.detectAndCompute(gray_image, None)
+        self.assertEqual([k.pt for k in key_points_rgb], [k.pt for k in key_points_gray])
+        self.assertTrue(np.array_equal(description_rgb, description_gray))
+
+    def test_handlers(self):
+        conf = configuration.ORB_default_configuration()
+        conf.SOURCE_DIR = self.test_file_path / "MINI_DATASET"
+        conf.GROUND_TRUTH_PATH = self.test_file_path / "MINI_DATASET.json"
+        conf.ALGO = configuration.ALGO_TYPE.ORB
+        conf.ORB_KEYPOINTS_NB = 100
+
+        # Same results with and without the cache, and from the cache filled by the first run
+        true_positive_rate_list = []
+        for decode_cache_dir in [None, self.output_dir / "cache", self.output_dir / "cache"]:
+            conf.DECODE_CACHE_DIR = decode_cache_dir
+            conf.OUTPUT_DIR = self.output_dir / f"ORB_{len(true_positive_rate_list)}"
+            eh = opencv.OpenCV_execution_handler(conf=conf)
+            eh.do_full_test()
+            true_positive_rate_list.append(eh.results_storage.TRUE_POSITIVE_RATE)
+
+        self.assertEqual(len(set(true_positive_rate_list)), 1)
+        self.assertEqual(len(list((self.output_dir / "cache").glob("**/*.npy"))), len(eh.picture_list))
+
+        # Hashes handlers share the same cache
+        conf = configuration.Default_configuration()
+        conf.SOURCE_DIR = self.test_file_path / "MINI_DATASET"
+        conf.GROUND_TRUTH_PATH = self.test_file_path / "MINI_DATASET.json"
+        conf.ALGO = configuration.ALGO_TYPE.P_HASH
+        conf.OUTPUT_DIR = self.output_dir / "P_HASH"
+        conf.DECODE_CACHE_DIR = self.output_dir / "cache"
+        eh = image_hash.Image_hash_execution_handler(conf=conf)
+        eh.do_full_test()
+        self.assertEqual(len(list((self.output_dir / "cache").glob("**/*.npy"))), len(eh.picture_list))
+
+    def test_grayscale_hashes(self):
+        # Gray levels of ORB and PIL differ : hashes are computed from PIL ones, as from the files
+        conf = configuration.Default_configuration()
+        conf.SOURCE_DIR = self.test_file_path / "MINI_DATASET"
+        conf.OUTPUT_DIR = self.output_dir / "hashes"
+        picture_list = filesystem_lib.File_System(conf=conf).get_Pictures_from_directory(conf.SOURCE_DIR)
+        hashes, valid = multi_hash.hash_pictures(picture_list, multi_hash.IMAGE_HASH_ALGOS, conf)
+
+        conf.DECODE_CACHE_DIR = self.output_dir / "cache"
+        conf.DECODE_CACHE_GRAYSCALE = True
+        for i in range(2):
+            # Decoded, then memory mapped
+            cached_hashes, cached_valid = multi_hash.hash_pictures(picture_list, multi_hash.IMAGE_HASH_ALGOS, conf)
+            self.assertTrue(np.array_equal(cached_valid, valid))
+            for algo in multi_hash.IMAGE_HASH_ALGOS:
+                self.assertTrue(np.array_equal(cached_hashes[algo], hashes[algo]), algo.name)
+
+        gray_image = decode_cache_lib.load_pil(self.picture_path, conf)
+        self.assertEqual(gray_image.mode, "L")
+        self.assertTrue(np.array_equal(np.asarray(gray_image), np.asarray(Image.open(self.picture_path).convert("L"))))
+
+if __name__ == '__main__':
+    unittest.main()
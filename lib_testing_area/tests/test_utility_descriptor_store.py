@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+from .context import *
+
+import unittest
+import tempfile
+import copy
+import numpy as np
+
+import utility_lib.descriptor_store_lib as descriptor_store_lib
+import configuration_launcher
+
+class test_template(unittest.TestCase):
+    """Basic test cases."""
+
+    def setUp(self):
+        self.logger = logging.getLogger()
+        self.test_file_path = pathlib.Path.cwd() / pathlib.Path("tests/test_files")
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.output_dir = pathlib.Path(self.tmp_dir.name)
+
+        self.conf = configuration.ORB_default_configuration()
+        self.conf.SOURCE_DIR = self.test_file_path / "MINI_DATASET"
+        self.conf.GROUND_TRUTH_PATH = self.test_file_path / "MINI_DATASET.json"
+        self.conf.ALGO = configuration.ALGO_TYPE.ORB
+        self.conf.ORB_KEYPOINTS_NB = 100
+        self.conf.OUTPUT_DIR = self.output_dir / "ORB"
+
+    def test_absolute_truth_and_meaning(self):
+        self.assertTrue(True)
+
+    def test_keypoints_table(self):
+        picture_path = sorted(self.conf.SOURCE_DIR.glob("*.png"))[0]
+        key_points, _ = cv2.ORB_create(nfeatures=100).detectAndCompute(cv2.imread(str(picture_path)), None)
+
+        table = descriptor_store_lib.keypoints_to_table(key_points)
+        self.assertEqual(table.shape, (len(key_points), descriptor_store_lib.KEYPOINT_FIELDS))
+        self.assertTrue(np.array_equal(table[:, :2], cv2.KeyPoint_convert(key_points)))
+
+        for k1, k2 in zip(key_points, descriptor_store_lib.table_to_keypoints(table)):
+            self.assertEqual((k1.pt, k1.size, k1.angle, k1.octave, k1.class_id), (k2.pt, k2.size, k2.angle, k2.octave, k2.class_id))
+            self.assertAlmostEqual(k1.response, k2.response, places=6)
+
+    def test_store(self):
+        eh = opencv.OpenCV_execution_handler(conf=self.conf)
+        picture_list = eh.load_pictures(self.conf.SOURCE_DIR, eh.Local_Picture_class_ref)
+        picture_list = eh.describe_pictures(picture_list)
+        description_list = [np.array(curr_picture.description) for curr_picture in picture_list]
+
+        store = descriptor_store_lib.Descriptor_store(self.output_dir / "store")
+        self.assertFalse(store.open(picture_list))
+        store.write(picture_list)
+
+        # Opened by another handler : slices of one memory mapped file
+        store = descriptor_store_lib.Descriptor_store(self.output_dir / "store")
+        self.assertTrue(store.open(picture_list))
+        for curr_picture, description in zip(picture_list, description_list):
+            store.attach(curr_picture)
+            self.assertTrue(np.array_equal(curr_picture.description, description))
+            self.assertTrue(np.shares_memory(curr_picture.description, store.descriptors))
+            self.assertFalse(curr_picture.description.flags.writeable)
+            self.assertEqual(len(curr_picture.key_points), len(description))
+
+        self.assertEqual(len(store.descriptors), sum(len(description) for description in description_list))
+
+    def test_handlers(self):
+        # Same results without store, when the store is written, and when it is read
+        true_positive_rate_list = []
+        for descriptor_store_dir in [None, self.output_dir / "store", self.output_dir / "store"]:
+            self.conf.DESCRIPTOR_STORE_DIR = descriptor_store_dir
+            self.conf.OUTPUT_DIR = self.output_dir / f"ORB_{len(true_positive_rate_list)}"
+            eh = opencv.OpenCV_execution_handler(conf=self.conf)
+            if len(true_positive_rate_list) == 2:
+                # Nothing described again
+                eh.describe_pictures = None
+            eh.do_full_test()
+            true_positive_rate_list.append(eh.results_storage.TRUE_POSITIVE_RATE)
+
+        self.assertEqual(len(set(true_positive_rate_list)), 1)
+        self.assertEqual(len(list((self.output_dir / "store").glob(f"*/*/{descriptor_store_lib.DESCRIPTORS_FILE}"))), 1)
+
+    def test_parallel_store(self):
+        # Built once by the launcher, before the parallel configurations : they only map it
+        launcher = configuration_launcher.Configuration_launcher(source_pictures_dir=self.conf.SOURCE_DIR,
+                                                                 output_folder=self.output_dir,
+                                                                 ground_truth_json=self.conf.GROUND_TRUTH_PATH,
+                                                                 img_type=configuration.SUPPORTED_IMAGE_TYPE.PNG,
+                                                                 overwrite_folder=True,
+                                                                 args=None,
+                                                                 nb_processes=2,
+                                                                 descriptor_store_dir=self.output_dir / "store")
+        for crosscheck in [configuration.CROSSCHECK.DISABLED, configuration.CROSSCHECK.ENABLED]:
+            conf = copy.deepcopy(self.conf)
+            conf.CROSSCHECK = crosscheck
+            conf.OUTPUT_DIR = self.output_dir / crosscheck.name
+            launcher.prepare_descriptor_store(conf)
+            launcher.schedule_exec_handler(opencv.OpenCV_execution_handler, conf)
+        self.assertEqual(len(launcher.prepared_descriptor_store_list), 1)
+
+        index_path = launcher.prepared_descriptor_store_list[0] / descriptor_store_lib.INDEX_FILE
+        index_mtime = index_path.stat().st_mtime_ns
+        launcher.scheduler.run(launcher.launch_exec_handler)
+
+        self.assertEqual(index_path.stat().st_mtime_ns, index_mtime)
+        self.assertEqual(len(list(self.output_dir.glob("*/stats.txt"))), 2)
+
+        # A read-only store is never written : pictures are described in memory if it misses
+        self.conf.DESCRIPTOR_STORE_DIR = self.output_dir / "missing_store"
+        self.conf.DESCRIPTOR_STORE_READ_ONLY = True
+        eh = opencv.OpenCV_execution_handler(conf=self.conf)
+        picture_list = eh.TO_OVERWRITE_prepare_dataset(eh.load_pictures(self.conf.SOURCE_DIR, eh.Local_Picture_class_ref))
+        self.assertEqual(len(picture_list), 15)
+        self.assertFalse(self.conf.DESCRIPTOR_STORE_DIR.exists())
+
+    def test_matcher_without_collection(self):
+        # Pairs are matched with their own train descriptors : same distances without descriptors added to the matcher
+        # (brute force only : FLANN LSH tables are drawn again at each match)
+        eh = opencv.OpenCV_execution_handler(conf=self.conf)
+        picture_list = eh.TO_OVERWRITE_prepare_dataset(eh.load_pictures(self.conf.SOURCE_DIR, eh.Local_Picture_class_ref))
+        distance = eh.TO_OVERWRITE_compute_distance(picture_list[0], picture_list[1])
+
+        for curr_picture in picture_list:
+            eh.matcher.add(curr_picture.description)
+        eh.matcher.train()
+        self.assertEqual(eh.TO_OVERWRITE_compute_distance(picture_list[0], picture_list[1]), distance)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,7 @@
 from .context import *
 
 import unittest
+import tempfile
 
 
 class test_template(unittest.TestCase):
@@ -18,7 +19,10 @@ class test_template(unittest.TestCase):
 
         ###
         self.source_pictures_dir = self.test_file_path / "image_folder"
-        self.output_folder = self.test_file_path / "output_folder"
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.output_folder = pathlib.Path(self.tmp_dir.name)
         self.ground_truth_json = self.test_file_path / "ground_truth.json"
 
         self.tmp_conf = configuration.Default_configuration()
@@ -3,6 +3,14 @@
 from .context import *
 
 import unittest
+import shutil
+import tempfile
+import numpy as np
+
+from PIL import Image
+
+import utility_lib.image_header_lib as image_header_lib
+import utility_lib.manifest_lib as manifest_lib
 
 class test_template(unittest.TestCase):
     """Basic test cases."""
@@ -11,10 +19,98 @@ class test_template(unittest.TestCase):
         self.logger = logging.getLogger()
         self.conf = configuration.Default_configuration()
         self.test_file_path = pathlib.Path.cwd() / pathlib.Path("tests/test_files")
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
 
     def test_absolute_truth_and_meaning(self):
         self.assertTrue(True)
 
+    def test_read_header(self):
+        folder = pathlib.Path(self.tmp_dir.name) / "filesystem_header"
+        folder.mkdir(parents=True)
+
+        source_picture = next((self.test_file_path / "MINI_DATASET").glob("*.png"))
+        width, height = Image.open(source_picture).size
+        Image.open(source_picture).convert("RGB").save(folder / "picture.bmp")
+
+        # Same dimensions as decoded pictures
+        self.assertEqual(image_header_lib.read_header(source_picture), ("PNG", width, height))
+        self.assertEqual(image_header_lib.read_header(folder / "picture.bmp"), ("BMP", width, height))
+        (folder / "text.png").write_text("Not a picture")
+        self.assertIsNone(image_header_lib.read_header(folder / "text.png"))
+
+    def test_clean_folder(self):
+        folder = pathlib.Path(self.tmp_dir.name) / "datasets" / "filesystem_clean"
+        folder.mkdir(parents=True)
+        for source_picture in sorted((self.test_file_path / "MINI_DATASET").glob("*.png"))[:5]:
+            shutil.copy(str(source_picture), str(folder / source_picture.name))
+        (folder / "empty.png").write_bytes(b"")
+        (folder / "void.png").write_text("Not a picture")
+
+        self.conf.IMG_TYPE = configuration.SUPPORTED_IMAGE_TYPE.PNG
+        file_system = filesystem_lib.File_System(conf=self.conf)
+        manifest_path = manifest_lib.get_default_manifest_path(folder, self.tmp_dir.name)
+
+        void_path_list = file_system.clean_folder(folder, manifest_path=manifest_path)
+        self.assertEqual(void_path_list, [folder.resolve() / "void.png"])
+        self.assertFalse((folder / "empty.png").exists())
+        self.assertEqual(len(filesystem_lib.File_System.load_json(manifest_path)["PICTURES"]), 6)
+
+        # Unchanged pictures are not read again : a changed header in the manifest is kept
+        manifest = filesystem_lib.File_System.load_json(manifest_path)
+        manifest["PICTURES"]["void.png"].update({"format": "PNG", "width": 10, "height": 10})
+        filesystem_lib.File_System.save_json(manifest, manifest_path)
+        self.assertEqual(file_system.clean_folder(folder, manifest_path=manifest_path), [])
+
+    def test_manifest(self):
+        folder = pathlib.Path(self.tmp_dir.name) / "datasets" / "filesystem_manifest"
+        (folder / "sub").mkdir(parents=True)
+        manifest_path = manifest_lib.get_default_manifest_path(folder, self.tmp_dir.name)
+        source_picture_list = sorted((self.test_file_path / "MINI_DATASET").glob("*.png"))[:4]
+        for source_picture in source_picture_list[:3]:
+            shutil.copy(str(source_picture), str(folder / "sub" / source_picture.name))
+
+        manifest = manifest_lib.Dataset_manifest.get_manifest(folder, manifest_path=manifest_path)
+        ids = {path.name: id for id, path, _ in manifest.get_pictures()}
+        self.assertEqual(sorted(ids.values()), [0, 1, 2])
+        entry = manifest.get_pictures()[0][2]
+        self.assertEqual(entry["size"], source_picture_list[0].stat().st_size)
+        self.assertEqual(len(entry["sha1"]), 40)
+        self.assertGreater(entry["width"], 0)
+
+        # Loaded without walk while the folder is unchanged
+        self.assertTrue(manifest_lib.Dataset_manifest(folder, manifest_path=manifest_path).is_up_to_date())
+        # Nothing written next to the dataset
+        self.assertEqual(list(folder.parent.glob("*" + manifest_lib.MANIFEST_SUFFIX)), [])
+
+        # Ids are kept when pictures are added or removed, and not reused
+        (folder / "sub" / source_picture_list[0].name).unlink()
+        shutil.copy(str(source_picture_list[3]), str(folder / source_picture_list[3].name))
+        self.assertFalse(manifest_lib.Dataset_manifest(folder, manifest_path=manifest_path).is_up_to_date())
+
+        self.conf.IMG_TYPE = configuration.SUPPORTED_IMAGE_TYPE.PNG
+        self.conf.SOURCE_DIR = folder
+        self.conf.MANIFEST_PATH = manifest_path
+        picture_list = filesystem_lib.File_System(conf=self.conf).get_Pictures_from_directory(folder)
+        self.assertEqual([(picture.path.name, picture.id) for picture in picture_list],
+                         [(source_picture_list[1].name, ids[source_picture_list[1].name]),
+                          (source_picture_list[2].name, ids[source_picture_list[2].name]),
+                          (source_picture_list[3].name, 3)])
+
+    def test_atomic_write(self):
+        file_path = pathlib.Path(self.tmp_dir.name) / "sub" / "data.npy"
+        filesystem_lib.atomic_write(file_path, lambda tmp_path: np.save(str(tmp_path), np.arange(3)))
+        self.assertTrue(np.array_equal(np.load(str(file_path)), np.arange(3)))
+
+        # A failed writing keeps the previous file, without temporary file left
+        def failed_write(tmp_path):
+            tmp_path.write_bytes(b"half written")
+            raise Exception("Interrupted")
+        with self.assertRaises(Exception):
+            filesystem_lib.atomic_write(file_path, failed_write)
+        self.assertTrue(np.array_equal(np.load(str(file_path)), np.arange(3)))
+        self.assertEqual(list(file_path.parent.iterdir()), [file_path])
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -3,6 +3,9 @@
 from .context import *
 
 import unittest
+import tempfile
+import shutil
+import numpy as np
 
 class test_template(unittest.TestCase):
     """Basic test cases."""
@@ -13,6 +16,10 @@ class test_template(unittest.TestCase):
         self.test_file_path = pathlib.Path.cwd() / pathlib.Path("tests/test_files/utility/graph/")
         self.result_folder_path = self.test_file_path / 'raw_results'
         self.baseline_path = self.test_file_path / 'baseline' / "graphe.py"
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.output_dir = pathlib.Path(self.tmp_dir.name)
 
     def test_absolute_truth_and_meaning(self):
         self.assertTrue(True)
@@ -20,7 +27,7 @@ class test_template(unittest.TestCase):
 
     def test_writing_similarity_json(self):
         global_result = graph_lib.Graph_handler.create_inclusion_matrix(folder=self.result_folder_path)
-        output_file = graph_lib.Graph_handler.save_matrix_to_json(global_result, self.test_file_path / "similarity_test.json")
+        output_file = graph_lib.Graph_handler.save_matrix_to_json(global_result, self.output_dir / "similarity_test.json")
 
         self.assertEqual(output_file.exists(), True)
 
@@ -87,7 +94,57 @@ class test_template(unittest.TestCase):
         graph = graph_lib.Graph_handler()
         graph.set_values(ordo, absi, values)
 
-        graph.save_matrix(self.test_file_path / "similarity_test" / "matrix.png")
+        (self.output_dir / "similarity_test").mkdir()
+        graph.save_matrix(self.output_dir / "similarity_test" / "matrix.png")
+
+    def test_inclusion_array(self):
+        # Results folders as written by the execution handler
+        folder = self.output_dir / "inclusion_array_test"
+        for curr_result in self.result_folder_path.iterdir():
+            (folder / curr_result.name).mkdir(parents=True, exist_ok=True)
+            shutil.copy(str(curr_result / "graphe.json"), str(folder / curr_result.name / "graphe.py"))
+
+        expected = np.array([[1, 0, 1 / 3], [0, 1, 0.5], [0.5, 0.5, 1]])
+        for nb_processes in [1, 2]:
+            names, values = graph_lib.Graph_handler.create_inclusion_array(folder=folder, nb_processes=nb_processes)
+
+            self.assertEqual(names, ["results_1", "results_2", "results_3"])
+            self.assertTrue(np.allclose(values, expected))
+
+        global_result = graph_lib.Graph_handler.create_inclusion_matrix(folder=folder)
+        ordo, absi, values = graph_lib.Graph_handler.inclusion_matrix_to_triple_array(global_result)
+        self.assertTrue(np.allclose(values, expected))
+
+    def test_pair_table(self):
+        # Results folders as written by the execution handler
+        folder = self.output_dir / "pair_table_test"
+        for i, curr_result in enumerate(sorted(self.result_folder_path.iterdir())):
+            (folder / curr_result.name).mkdir(parents=True, exist_ok=True)
+            shutil.copy(str(curr_result / "graphe.json"), str(folder / curr_result.name / "graphe.py"))
+            stats = {"TIME_PER_PICTURE_MATCHING": i, "TIME_PER_PICTURE_PRE_COMPUTING": 1, "TIME_TO_LOAD_PICTURES": 1, "NB_PICTURE": 6}
+            (folder / curr_result.name / "stats.txt").write_text(json.dumps(stats))
+            shutil.copy(str(curr_result / "conf.txt"), str(folder / curr_result.name / "conf.txt"))
+
+        ground_truth_json = self.test_file_path / "baseline" / "graphe.json"
+        table_file = self.output_dir / "pair_table_test.csv"
+        nb_pairs = graph_lib.Graph_handler.evaluate_pairs_to_table(folder, ground_truth_json, table_file)
+        self.assertEqual(nb_pairs, 9)
+
+        rows = {curr_row["name"]: curr_row for curr_row in graph_lib.Graph_handler.load_pair_table(table_file)}
+        self.assertEqual(rows["results_1_AND_results_3"]["TIME_PER_PICTURE_MATCHING"], 2)
+
+        # Same rate as the merged graphe
+        graphe_list = {curr_graphe["name"]: curr_graphe["graphe"] for curr_graphe in graph_lib.Graph_handler.get_graph_list(folder)}
+        ground_truth_graphe = graph_lib.Graph_handler.load_ground_truth(ground_truth_json)
+        for name_a in graphe_list:
+            for name_b in graphe_list:
+                merged_graphe = json_class.merge_graphes(graphe_list[name_a], graphe_list[name_b])
+                self.assertEqual(rows[name_a + "_AND_" + name_b]["TRUE_POSITIVE_RATE"], json_class.matching_graphe_percentage(merged_graphe, ground_truth_graphe))
+
+        # Only the shortlist is written as folders
+        pair_folder = self.output_dir / "pair_table_test_pairs"
+        graph_lib.Graph_handler.generate_merged_pairs(folder, pair_folder, shortlist=["results_2_AND_results_1"])
+        self.assertEqual([curr_pair.name for curr_pair in pair_folder.iterdir()], ["results_2_AND_results_1"])
 
     def test_get_graph_list(self):
         tmp_gl = graph_lib.Graph_handler.get_graph_list(self.result_folder_path)
@@ -4,6 +4,8 @@ from .context import *
 
 import unittest
 import logging
+import tempfile
+import numpy as np
 
 class test_template(unittest.TestCase):
     """Basic test cases."""
@@ -99,6 +101,35 @@ class test_template(unittest.TestCase):
         self.JSON_class.json_to_export = tmp_modified
         self.assertAlmostEqual(json_class.matching_graphe_percentage(self.JSON_class.json_to_export, json_imported), 0.66, delta=0.01)
 
+    def test_evaluation_with_graphes(self):
+        ground_truth = graph_lib.Graphe()
+        ground_truth.nodes = [{"id": 10, "image": "a.png"}, {"id": 11, "image": "b.png"}, {"id": 12, "image": "c.png"}]
+        ground_truth.edges = [{"from": 10, "to": 11}, {"from": 11, "to": 10}, {"from": 12, "to": 10}]
+
+        candidate = graph_lib.Graphe()
+        candidate.nodes = [{"id": 0, "image": "a.png"}, {"id": 1, "image": "b.png"}, {"id": 2, "image": "c.png"}, {"id": 3, "image": "d.png"}]
+        candidate.edges = [{"from": 0, "to": 1, "title": 0.1},
+                           {"from": 1, "to": 2, "title": 0.5},
+                           {"from": 2, "to": 0, "title": 0.2},
+                           {"from": 3, "to": 0, "title": 0.9}]
+
+        mapping_dict = json_class.create_node_mapping(candidate, ground_truth)
+        self.assertEqual(mapping_dict, {0: 10, 1: 11, 2: 12})
+
+        # Wrong edge, and edge with an unmapped node
+        wrong = json_class.is_graphe_included(candidate, mapping_dict, ground_truth)
+        self.assertEqual(wrong, [candidate.edges[1], candidate.edges[3]])
+        self.assertEqual(json_class.matching_graphe_percentage(candidate, ground_truth), 0.5)
+
+        # Thresholds of all modes, and true positive rate once the worst edges are removed
+        threshold_per_mode, curve = self.JSON_class.find_all_threesholds(candidate.edges, wrong)
+        self.assertEqual(threshold_per_mode[configuration.THRESHOLD_MODE.MIN_WRONG], 0.5)
+        self.assertEqual(threshold_per_mode[configuration.THRESHOLD_MODE.MEDIAN_WRONG], 0.9)
+        self.assertEqual(threshold_per_mode[configuration.THRESHOLD_MODE.MAX_WRONG], 0.9)
+        self.assertEqual(threshold_per_mode[configuration.THRESHOLD_MODE.MAXIMIZE_TRUE_POSITIVE], 0.5)
+        self.assertEqual(curve[:, 0].tolist(), [0.9, 0.5, 0.2, 0.1])
+        self.assertEqual(curve[:, 1].tolist(), [1 - 1 / 4, 1, 1, 1])
+
     def test_merge_graphe(self):
         with open(str((self.merge_folder / "graphe_1.json").resolve())) as json_file:
             json_file = str(json_file.read()).replace("'", '"')
@@ -111,6 +142,27 @@ class test_template(unittest.TestCase):
         self.assertEqual(len(graphe1["edges"]),3)
         self.assertEqual(len(graphe2["edges"]),2)
         self.assertEqual(len(merged_graphe["edges"]),5)
+    def test_export_threshold_curve(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            self.conf.OUTPUT_DIR = pathlib.Path(tmp_dir)
+            self.JSON_class.threshold_curve = np.array([[0.9, 0.75], [0.5, 1.0]])
+
+            # Nothing written out of export mode
+            self.conf.EXPORT_TO_FOLDER = False
+            self.JSON_class.json_export()
+            self.assertEqual(list(self.conf.OUTPUT_DIR.iterdir()), [])
+
+            # Curve is kept, but only drawn by the mode using it
+            self.conf.EXPORT_TO_FOLDER = True
+            self.conf.THREESHOLD_EVALUATION = configuration.THRESHOLD_MODE.MEDIAN_WRONG
+            self.JSON_class.json_export()
+            self.assertTrue((self.conf.OUTPUT_DIR / "threshold_curve.npy").exists())
+            self.assertFalse((self.conf.OUTPUT_DIR / "threshold.png").exists())
+
+            self.conf.THREESHOLD_EVALUATION = configuration.THRESHOLD_MODE.MAXIMIZE_TRUE_POSITIVE
+            self.JSON_class.json_export()
+            self.assertTrue((self.conf.OUTPUT_DIR / "threshold.png").exists())
+
 
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
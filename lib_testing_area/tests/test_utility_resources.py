@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+from .context import *
+
+import unittest
+import tempfile
+import tracemalloc
+import time
+import numpy as np
+
+import utility_lib.resources_lib as resources_lib
+import ImageHash.imagehash_test as image_hash
+import configuration_launcher
+
+class test_template(unittest.TestCase):
+    """Basic test cases."""
+
+    def setUp(self):
+        self.logger = logging.getLogger()
+        self.source_pictures_dir = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET")
+        self.ground_truth_json = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET.json")
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.output_folder = pathlib.Path(self.tmp_dir.name)
+
+    def test_absolute_truth_and_meaning(self):
+        self.assertTrue(True)
+
+    def test_monitor(self):
+        monitor = resources_lib.Resource_monitor(trace_memory=True)
+        monitor.start()
+        with monitor.measure("allocation"):
+            data = [bytearray(1024) for i in range(1000)]
+        monitor.stop()
+
+        usage = monitor.stages["allocation"]
+        self.assertGreaterEqual(usage["TRACED_MEMORY_PEAK"], 1000 * 1024)
+        self.assertGreaterEqual(usage["USER_CPU"], 0)
+        self.assertGreater(usage["MAX_RSS"], 0)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_stage_peaks(self):
+        # Peak of a stage is sampled during the stage : memory released before its end is counted, and not by the next stages
+        monitor = resources_lib.Resource_monitor()
+        with monitor.measure("heavy"):
+            data = np.ones(200 * 2 ** 20, dtype=np.uint8)
+            time.sleep(10 * resources_lib.RSS_SAMPLING_PERIOD)
+            del data
+        with monitor.measure("light"):
+            pass
+
+        heavy, light = monitor.stages["heavy"], monitor.stages["light"]
+        self.assertGreaterEqual(heavy["MAX_RSS_INCREASE"], 150 * 2 ** 20)
+        self.assertLess(heavy["RSS_AFTER"], heavy["MAX_RSS"] - 150 * 2 ** 20)
+        self.assertLess(light["MAX_RSS"], heavy["MAX_RSS"] - 150 * 2 ** 20)
+        self.assertEqual(monitor.get_max_rss(), heavy["MAX_RSS"])
+
+    def test_disabled_monitor(self):
+        monitor = resources_lib.Resource_monitor(enabled=False, trace_memory=True)
+        monitor.start()
+        with monitor.measure("allocation"):
+            pass
+
+        self.assertEqual(monitor.stages, {})
+        self.assertIsNone(monitor.get_max_rss())
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_handler_resources(self):
+        conf = configuration.Default_configuration()
+        conf.SOURCE_DIR = self.source_pictures_dir
+        conf.GROUND_TRUTH_PATH = self.ground_truth_json
+        conf.OUTPUT_DIR = self.output_folder / "a_hash"
+        conf.ALGO = configuration.ALGO_TYPE.A_HASH
+        conf.RESOURCE_ACCOUNTING = True
+
+        eh = image_hash.Image_hash_execution_handler(conf=conf)
+        eh.do_full_test()
+
+        stats = filesystem_lib.File_System.load_json(conf.OUTPUT_DIR / "stats.txt")
+        self.assertEqual(list(stats["RESOURCE_USAGE"].keys()), ["load_pictures", "prepare_dataset", "iterate_over_dataset", "evaluate_JSON", "export_final_JSON"])
+        self.assertGreater(stats["MAX_RSS"], 0)
+        # No tracemalloc by default
+        self.assertNotIn("TRACED_MEMORY_PEAK", stats["RESOURCE_USAGE"]["prepare_dataset"])
+
+        # Peak memory in the overview
+        output_file = self.output_folder / "tldr.txt"
+        configuration_launcher.Configuration_launcher.create_tldr(self.output_folder, output_file)
+        self.assertIn("MAX_RSS (MB) = ", output_file.read_text())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+
+from .context import *
+
+import unittest
+import tempfile
+import numpy as np
+
+import results
+import configuration_launcher
+import ImageHash.imagehash_test as image_hash
+
+class test_template(unittest.TestCase):
+    """Basic test cases."""
+
+    def setUp(self):
+        self.logger = logging.getLogger()
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.test_file_path = pathlib.Path(self.tmp_dir.name)
+        self.result_folder_path = pathlib.Path.cwd() / pathlib.Path("tests/test_files/utility/graph/raw_results")
+
+        self.db_path = self.test_file_path / (self.id().split(".")[-1] + ".db")
+
+    def test_absolute_truth_and_meaning(self):
+        self.assertTrue(True)
+
+    def fill_db(self):
+        # Same results as the results folders
+        db = results_db.Results_DB(self.db_path)
+        for i, curr_result in enumerate(sorted(self.result_folder_path.iterdir())):
+            conf = configuration.Default_configuration()
+            conf.ALGO = configuration.ALGO_TYPE.D_HASH
+            conf.OUTPUT_DIR = curr_result
+
+            stats = results.RESULTS()
+            stats.TRUE_POSITIVE_RATE = i / 10
+            stats.TIME_PER_PICTURE_PRE_COMPUTING = 1
+            stats.TIME_PER_PICTURE_MATCHING = i
+            stats.TIME_LIST_MATCHING = [i, i]
+
+            graphe = graph_lib.Graphe()
+            graphe.load_from_json(filesystem_lib.File_System.load_json(curr_result / "graphe.json"))
+
+            db.add_run(curr_result.name, conf)
+            db.save_results(curr_result.name, stats, graphe)
+
+        # Run without results
+        db.add_run("results_crashed", configuration.Default_configuration())
+        return db
+
+    def test_store_and_load(self):
+        db = self.fill_db()
+
+        self.assertEqual(db.get_run_names(), ["results_1", "results_2", "results_3", "results_crashed"])
+        self.assertEqual(db.get_conf("results_1")["ALGO"], str(configuration.ALGO_TYPE.D_HASH))
+        self.assertEqual(db.get_stats("results_3")["TIME_LIST_MATCHING"], [2, 2])
+        self.assertIsNone(db.get_stats("results_crashed"))
+
+        # Runs are replaced
+        db.add_run("results_3", configuration.Default_configuration())
+        self.assertIsNone(db.get_stats("results_3"))
+
+    def test_graph_list(self):
+        self.fill_db()
+
+        graphe_list = graph_lib.Graph_handler.get_graph_list(None, db_path=self.db_path)
+        self.assertEqual([curr_graphe["name"] for curr_graphe in graphe_list], ["results_1", "results_2", "results_3"])
+
+        for curr_graphe in graphe_list:
+            expected = filesystem_lib.File_System.load_json(self.result_folder_path / curr_graphe["name"] / "graphe.json")
+            self.assertEqual(curr_graphe["graphe"].nodes, expected["nodes"])
+            self.assertEqual([(e["from"], e["to"], e["label"]) for e in curr_graphe["graphe"].edges],
+                             [(e["from"], e["to"], e["label"]) for e in expected["edges"]])
+
+        # Same inclusion matrix as from the folders
+        names, values = graph_lib.Graph_handler.create_inclusion_array(None, db_path=self.db_path)
+        self.assertEqual(names, ["results_1", "results_2", "results_3"])
+        self.assertTrue(np.allclose(values, np.array([[1, 0, 1 / 3], [0, 1, 0.5], [0.5, 0.5, 1]])))
+
+    def test_tldr(self):
+        self.fill_db()
+
+        output_file = self.test_file_path / "tldr.overview"
+        configuration_launcher.Configuration_launcher.create_tldr(None, output_file, db_path=self.db_path)
+        lines = output_file.read_text().splitlines()
+        self.assertEqual([l.split()[0] for l in lines], ["results_3", "results_2", "results_1", "results_crashed"])
+        self.assertIn("NO RESULT / ERROR", lines[3])
+
+        output_file = self.test_file_path / "tldr.latex.overview"
+        configuration_launcher.Configuration_launcher.create_latex_tldr(None, output_file, db_path=self.db_path)
+        self.assertEqual(len(output_file.read_text().splitlines()), 4)
+
+    def test_execution_handler(self):
+        conf = configuration.Default_configuration()
+        conf.ALGO = configuration.ALGO_TYPE.A_HASH
+        conf.SOURCE_DIR = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET")
+        conf.GROUND_TRUTH_PATH = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET.json")
+        conf.OUTPUT_DIR = self.test_file_path / "output" / "MINI_DATASET_A_HASH"
+        conf.RESULTS_DB_PATH = self.db_path
+        conf.EXPORT_TO_FOLDER = False
+
+        image_hash.Image_hash_execution_handler(conf=conf).do_full_test()
+
+        self.assertFalse((conf.OUTPUT_DIR / "stats.txt").exists())
+        self.assertFalse((conf.OUTPUT_DIR / "graphe.py").exists())
+
+        db = results_db.Results_DB(self.db_path)
+        stats = db.get_stats("MINI_DATASET_A_HASH")
+        self.assertEqual(stats["NB_PICTURE"], 15)
+        graphe_list = db.get_graph_list()
+        self.assertEqual(len(graphe_list[0]["graphe"].nodes), 15)
+        self.assertEqual(json_class.matching_graphe_percentage(graphe_list[0]["graphe"], graph_lib.Graph_handler.load_ground_truth(conf.GROUND_TRUTH_PATH)), stats["TRUE_POSITIVE_RATE"])
+
+if __name__ == '__main__':
+    unittest.main()
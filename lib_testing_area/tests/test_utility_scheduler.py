@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+
+from .context import *
+
+import unittest
+import tempfile
+
+import utility_lib.scheduler_lib as scheduler_lib
+import Void_baseline.void_baseline as void_baseline
+
+class test_template(unittest.TestCase):
+    """Basic test cases."""
+
+    def setUp(self):
+        self.logger = logging.getLogger()
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.test_file_path = pathlib.Path(self.tmp_dir.name)
+        self.source_pictures_dir = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET")
+        self.ground_truth_json = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET.json")
+
+    def test_absolute_truth_and_meaning(self):
+        self.assertTrue(True)
+
+    def test_dataset_size(self):
+        nb_pictures, nb_pixels = scheduler_lib.get_dataset_size(self.source_pictures_dir, configuration.SUPPORTED_IMAGE_TYPE.PNG)
+        self.assertEqual(nb_pictures, 15)
+        self.assertGreater(nb_pixels, 0)
+
+    def test_estimates(self):
+        conf = configuration.ORB_default_configuration()
+        memory_orb, preparation_time_orb, pair_time_orb = opencv.OpenCV_execution_handler.estimate_resources(conf, 1000, 10 ** 6)
+        memory_hash, preparation_time_hash, pair_time_hash = ImageHash.imagehash_test.Image_hash_execution_handler.estimate_resources(configuration.Default_configuration(), 1000, 10 ** 6)
+
+        # ORB keeps decoded pictures, and compares descriptors
+        self.assertGreater(memory_orb, memory_hash + 1000 * 3 * 10 ** 6 - 1)
+        self.assertGreater(pair_time_orb, pair_time_hash)
+
+    def test_packing(self):
+        scheduler = scheduler_lib.Configuration_scheduler(nb_processes=2, memory_budget=10, nb_pictures=1, nb_pixels=1)
+        for name, memory, duration in [["short", 3, 5], ["huge", 20, 1], ["long", 6, 10], ["medium", 5, 8]]:
+            conf = configuration.Default_configuration()
+            conf.OUTPUT_DIR = pathlib.Path(name)
+            scheduler.pending_list.append(scheduler_lib.Scheduled_configuration(None, conf, memory, duration))
+
+        # Longest first, then the longest which fits in the remaining memory
+        self.assertEqual([c.name for c in scheduler.get_next_configurations(0, 0)], ["long", "short"])
+        # No free process
+        self.assertEqual(scheduler.get_next_configurations(9, 2), [])
+        # Not enough memory
+        self.assertEqual([c.name for c in scheduler.get_next_configurations(6, 1)], [])
+        self.assertEqual([c.name for c in scheduler.get_next_configurations(3, 1)], ["medium"])
+        # Above the budget : alone
+        self.assertEqual([c.name for c in scheduler.get_next_configurations(3, 1)], [])
+        self.assertEqual([c.name for c in scheduler.get_next_configurations(0, 0)], ["huge"])
+
+    def test_parallel_run(self):
+        scheduler = scheduler_lib.Configuration_scheduler(nb_processes=2, memory_budget=scheduler_lib.get_default_memory_budget(), nb_pictures=15, nb_pixels=1)
+
+        for name in ["void_1", "void_2", "void_3"]:
+            conf = configuration.Default_configuration()
+            conf.SOURCE_DIR = self.source_pictures_dir
+            conf.GROUND_TRUTH_PATH = self.ground_truth_json
+            conf.OUTPUT_DIR = self.test_file_path / name
+            scheduler.add(void_baseline.Void_baseline, conf)
+
+        def launch_function(exec_handler, curr_configuration):
+            if curr_configuration.OUTPUT_DIR.name == "void_3":
+                return False
+            exec_handler(conf=curr_configuration).do_full_test()
+            return True
+
+        exit_codes = dict(scheduler.run(launch_function))
+        self.assertEqual(exit_codes, {"void_1": 0, "void_2": 0, "void_3": 1})
+        self.assertTrue((self.test_file_path / "void_1" / "stats.txt").exists())
+        self.assertTrue((self.test_file_path / "void_2" / "stats.txt").exists())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,11 @@
 from .context import *
 
 import unittest
+import tempfile
+import random
+
+import ImageHash.imagehash_test as image_hash
+import configuration_launcher
 
 class test_template(unittest.TestCase):
     """Basic test cases."""
@@ -11,10 +16,81 @@ class test_template(unittest.TestCase):
         self.logger = logging.getLogger()
         self.conf = configuration.Default_configuration()
         self.test_file_path = pathlib.Path.cwd() / pathlib.Path("tests/test_files")
+        self.source_pictures_dir = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET")
+        self.ground_truth_json = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET.json")
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.output_folder = pathlib.Path(self.tmp_dir.name)
 
     def test_absolute_truth_and_meaning(self):
         self.assertTrue(True)
 
+    def test_latency_sketch(self):
+        generator = random.Random(0)
+        value_list = [generator.lognormvariate(-5, 1) for i in range(10000)]
+
+        sketch = stats_lib.Latency_sketch(relative_accuracy=0.01)
+        sketch.add_list(value_list)
+
+        # Within the relative accuracy of the exact quantiles
+        sorted_value_list = sorted(value_list)
+        for name, quantile in stats_lib.LATENCY_PERCENTILES.items():
+            exact = sorted_value_list[int(quantile * (len(value_list) - 1))]
+            self.assertAlmostEqual(sketch.get_quantile(quantile) / exact, 1, delta=0.011)
+
+        self.assertEqual(sketch.get_quantile(0), min(value_list))
+        self.assertEqual(sketch.get_quantile(1), max(value_list))
+        # Buckets, not samples, are kept
+        self.assertLess(len(sketch.buckets), 1000)
+
+    def test_empty_latency_sketch(self):
+        sketch = stats_lib.Latency_sketch()
+        self.assertIsNone(sketch.get_quantile(0.5))
+
+        sketch.add(0)
+        self.assertEqual(sketch.get_quantile(0.99), 0)
+
+    def test_handler_latency(self):
+        conf = configuration.Default_configuration()
+        conf.SOURCE_DIR = self.source_pictures_dir
+        conf.GROUND_TRUTH_PATH = self.ground_truth_json
+        conf.OUTPUT_DIR = self.output_folder / "a_hash"
+        conf.ALGO = configuration.ALGO_TYPE.A_HASH
+
+        eh = image_hash.Image_hash_execution_handler(conf=conf)
+        eh.do_full_test()
+
+        stats = filesystem_lib.File_System.load_json(conf.OUTPUT_DIR / "stats.txt")
+        self.assertEqual(list(stats["LATENCY_PERCENTILES"].keys()), ["P50", "P90", "P99", "P99_9"])
+        self.assertLessEqual(stats["LATENCY_PERCENTILES"]["P50"], stats["LATENCY_PERCENTILES"]["P99"])
+        self.assertLessEqual(stats["LATENCY_PERCENTILES"]["P99_9"], max(stats["TIME_LIST_MATCHING"]))
+        self.assertGreater(stats["PAIRS_PER_SECOND"], stats["PICTURES_PER_SECOND_MATCHING"])
+
+        output_file = self.output_folder / "tldr.txt"
+        configuration_launcher.Configuration_launcher.create_tldr(self.output_folder, output_file)
+        self.assertIn("P99 = ", output_file.read_text())
+
+        output_file = self.output_folder / "tldr_latex.txt"
+        configuration_launcher.Configuration_launcher.create_latex_tldr(self.output_folder, output_file)
+        self.assertEqual(output_file.read_text().splitlines()[1].count("&"), 7)
+
+    def test_handler_latency_without_time_list(self):
+        conf = configuration.Default_configuration()
+        conf.SOURCE_DIR = self.source_pictures_dir
+        conf.GROUND_TRUTH_PATH = self.ground_truth_json
+        conf.OUTPUT_DIR = self.output_folder / "a_hash_large"
+        conf.ALGO = configuration.ALGO_TYPE.A_HASH
+        conf.TIME_LIST_MAX_TARGETS = 1
+
+        eh = image_hash.Image_hash_execution_handler(conf=conf)
+        eh.do_full_test()
+
+        # Percentiles from the sketch only
+        stats = filesystem_lib.File_System.load_json(conf.OUTPUT_DIR / "stats.txt")
+        self.assertIsNone(stats["TIME_LIST_MATCHING"])
+        self.assertIsNone(eh.list_time)
+        self.assertLessEqual(stats["LATENCY_PERCENTILES"]["P50"], stats["LATENCY_PERCENTILES"]["P99"])
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+
+from .context import *
+
+import unittest
+import tempfile
+
+import utility_lib.synthetic_dataset_lib as synthetic_dataset_lib
+
+class test_template(unittest.TestCase):
+    """Basic test cases."""
+
+    def setUp(self):
+        self.logger = logging.getLogger()
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.test_file_path = pathlib.Path(self.tmp_dir.name) / "synthetic_dataset"
+
+    def test_absolute_truth_and_meaning(self):
+        self.assertTrue(True)
+
+    def test_family(self):
+        picture_list = synthetic_dataset_lib.generate_family(family_id=3, family_size=4, seed=0, width=320, height=180)
+        self.assertEqual(len(picture_list), 4)
+        self.assertEqual(picture_list[0].size, (320, 180))
+
+        # Same seed and family, same pictures
+        same_picture_list = synthetic_dataset_lib.generate_family(family_id=3, family_size=4, seed=0, width=320, height=180)
+        for picture, same_picture in zip(picture_list, same_picture_list):
+            self.assertEqual(picture.tobytes(), same_picture.tobytes())
+
+    def test_generate(self):
+        generator = synthetic_dataset_lib.Synthetic_dataset_generator(output_dir=self.test_file_path, nb_pictures=25, max_family_size=4,
+                                                                     width=320, height=180, nb_processes=2)
+        pictures_dir, ground_truth_path = generator.generate()
+
+        family_sizes = generator.get_family_sizes()
+        self.assertEqual(sum(family_sizes), 25)
+        self.assertEqual(len(list(pictures_dir.glob("**/*.png"))), 25)
+
+        ground_truth = filesystem_lib.File_System.load_json(ground_truth_path)
+        self.assertEqual(len(ground_truth["nodes"]), 25)
+        self.assertEqual(len(ground_truth["edges"]), sum(size * (size - 1) for size in family_sizes))
+
+        # Readable as a ground truth : a perfect output graphe is fully correct
+        ground_truth_graphe = json_class.Json_handler.import_json(ground_truth_path)
+        perfect_graphe = graph_lib.Graphe()
+        perfect_graphe.load_from_json(ground_truth_graphe)
+        self.assertEqual(json_class.matching_graphe_percentage(perfect_graphe, graph_lib.Graph_handler.load_ground_truth(ground_truth_path)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
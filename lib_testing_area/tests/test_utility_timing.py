@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+from .context import *
+
+import unittest
+import tempfile
+
+import utility_lib.timing_lib as timing_lib
+import ImageHash.imagehash_test as image_hash
+
+class test_template(unittest.TestCase):
+    """Basic test cases."""
+
+    def setUp(self):
+        self.logger = logging.getLogger()
+        self.source_pictures_dir = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET")
+        self.ground_truth_json = pathlib.Path.cwd() / pathlib.Path("tests/test_files/MINI_DATASET.json")
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.output_dir = pathlib.Path(self.tmp_dir.name) / "timing"
+
+    def test_absolute_truth_and_meaning(self):
+        self.assertTrue(True)
+
+    def test_timer(self):
+        timer = timing_lib.Stage_timer()
+        with timer.stage("match"):
+            pass
+        timer.stop("match", timer.start())
+        timer.add("decode", 3000, count=3)
+
+        # Children write in the same stages, with their prefix
+        timer.get_child("FIRST_STAGE.").add("hash", 1500)
+
+        stats = timer.to_dict()
+        self.assertEqual(list(stats.keys()), ["FIRST_STAGE.hash", "decode", "match"])
+        self.assertEqual(stats["match"]["COUNT"], 2)
+        self.assertEqual(stats["decode"]["COUNT"], 3)
+        self.assertEqual(stats["decode"]["TOTAL"], 3e-6)
+        # 3000 ns is in bucket ]2048, 4096] ns
+        self.assertEqual(stats["decode"]["HISTOGRAM"], [[4096 / 1e9, 1]])
+
+    def test_disabled_timer(self):
+        timer = timing_lib.Stage_timer(enabled=False)
+        with timer.stage("match"):
+            pass
+        timer.stop("distance", timer.start())
+
+        self.assertEqual(timer.to_dict(), {})
+
+    def test_handler_stages(self):
+        conf = configuration.Default_configuration()
+        conf.SOURCE_DIR = self.source_pictures_dir
+        conf.GROUND_TRUTH_PATH = self.ground_truth_json
+        conf.OUTPUT_DIR = self.output_dir
+        conf.ALGO = configuration.ALGO_TYPE.A_HASH
+        conf.STAGE_TIMING = True
+
+        eh = image_hash.Image_hash_execution_handler(conf=conf)
+        eh.do_full_test()
+
+        time_per_stage = eh.results_storage.TIME_PER_STAGE
+        for name in ["decode", "hash", "top_k", "distance", "json", "evaluation", "json_export"]:
+            self.assertIn(name, time_per_stage)
+
+        nb_pictures = time_per_stage["decode"]["COUNT"]
+        self.assertEqual(time_per_stage["top_k"]["COUNT"], nb_pictures)
+        self.assertEqual(time_per_stage["distance"]["COUNT"], nb_pictures * nb_pictures)
+
+        # Written with other results
+        stats = filesystem_lib.File_System.load_json(self.output_dir / "stats.txt")
+        self.assertEqual(stats["TIME_PER_STAGE"]["top_k"]["COUNT"], nb_pictures)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+
+from .context import *
+
+import unittest
+import tempfile
+
+import utility_lib.trace_lib as trace_lib
+
+class test_template(unittest.TestCase):
+    """Basic test cases."""
+
+    def setUp(self):
+        self.logger = logging.getLogger()
+        self.test_file_path = pathlib.Path.cwd() / pathlib.Path("tests/test_files")
+        # Outputs are written aside, never in the test files
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.output_dir = pathlib.Path(self.tmp_dir.name) / "trace"
+
+    def test_absolute_truth_and_meaning(self):
+        self.assertTrue(True)
+
+    def test_sampling(self):
+        tracer = trace_lib.Tracer(sampling_period=3, max_events=5)
+        with tracer.span("load_pictures", "load"):
+            for i in range(10):
+                with tracer.span("target", "matching", sampled=True, args={"index": i}):
+                    pass
+
+        # Targets 0, 3, 6 and 9 are recorded, and closed before the enclosing span
+        self.assertEqual([event["args"]["index"] for event in tracer.events if event["name"] == "target"], [0, 3, 6, 9])
+        self.assertEqual(tracer.events[-1]["name"], "load_pictures")
+        self.assertEqual(tracer.nb_dropped, 0)
+
+        # Full : next spans are dropped
+        with tracer.span("evaluate_json", "evaluation"):
+            pass
+        self.assertEqual(len(tracer.events), 5)
+        self.assertEqual(tracer.nb_dropped, 1)
+
+    def test_disabled_tracer(self):
+        tracer = trace_lib.Tracer(enabled=False)
+        with tracer.span("load_pictures", "load"):
+            pass
+        tracer.save(self.output_dir / trace_lib.TRACE_FILE)
+
+        self.assertEqual(tracer.events, [])
+        self.assertFalse((self.output_dir / trace_lib.TRACE_FILE).exists())
+
+    def test_handler_trace(self):
+        conf = configuration.ORB_default_configuration()
+        conf.SOURCE_DIR = self.test_file_path / "MINI_DATASET"
+        conf.GROUND_TRUTH_PATH = self.test_file_path / "MINI_DATASET.json"
+        conf.OUTPUT_DIR = self.output_dir
+        conf.ALGO = configuration.ALGO_TYPE.ORB
+        conf.ORB_KEYPOINTS_NB = 100
+        conf.TRACE_SAMPLING_PERIOD = 2
+
+        eh = opencv.OpenCV_execution_handler(conf=conf)
+        eh.do_full_test()
+
+        trace = filesystem_lib.File_System.load_json(self.output_dir / trace_lib.TRACE_FILE)
+        names = [event["name"] for event in trace["traceEvents"]]
+        for name in ["process_name", "load_pictures", "describe_picture", "target", "evaluate_json"]:
+            self.assertIn(name, names)
+
+        # One picture and one target out of 2
+        nb_pictures = len(eh.picture_list)
+        self.assertEqual(names.count("target"), (nb_pictures + 1) // 2)
+        self.assertEqual(trace["otherData"]["SAMPLING_PERIOD"], 2)
+        self.assertTrue(all(event["pid"] == os.getpid() for event in trace["traceEvents"]))
+
+if __name__ == '__main__':
+    unittest.main()
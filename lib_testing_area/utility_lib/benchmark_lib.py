@@ -0,0 +1,131 @@
+import sys
+import time
+import pathlib
+import logging
+import platform
+import subprocess
+
+import cv2
+import numpy as np
+
+import utility_lib.filesystem_lib as filesystem_lib
+
+DEFAULT_REPETITIONS = 20
+DEFAULT_WARMUP = 3
+
+
+def measure(function, repetitions: int = DEFAULT_REPETITIONS, warmup: int = DEFAULT_WARMUP):
+    '''
+    Durations of calls of a function without argument. Warm-up calls (caches, lazy initialisations ..) are not measured.
+    :return: list of durations, in seconds
+    '''
+    for _ in range(warmup):
+        function()
+
+    duration_list = []
+    for _ in range(repetitions):
+        start_time = time.perf_counter()
+        function()
+        duration_list.append(time.perf_counter() - start_time)
+
+    return duration_list
+
+
+def describe_durations(duration_list, nb_operations: int = 1):
+    '''
+    Robust statistics of measured durations, in seconds
+    :param nb_operations: number of operations done by one call (e.g. pictures hashed), to give the time of one operation
+    '''
+    durations = np.array(duration_list, dtype=np.float64)
+    q1, median, q3 = np.percentile(durations, [25, 50, 75])
+
+    return {"NB_REPETITIONS": len(durations),
+            "NB_OPERATIONS": nb_operations,
+            "MEDIAN": float(median),
+            "Q1": float(q1),
+            "Q3": float(q3),
+            "IQR": float(q3 - q1),
+            "MIN": float(durations.min()),
+            "MAX": float(durations.max()),
+            "MEAN": float(durations.mean()),
+            "MEDIAN_PER_OPERATION": float(median) / nb_operations}
+
+
+def get_environment():
+    '''
+    Machine and commit the benchmark was run on, to compare results
+    '''
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=str(pathlib.Path(__file__).parent)).stdout.strip() or None
+    except Exception:
+        commit = None
+
+    return {"DATE": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "COMMIT": commit,
+            "PYTHON": sys.version.split()[0],
+            "PLATFORM": platform.platform(),
+            "PROCESSOR": platform.processor() or platform.machine(),
+            "NB_CPU": cv2.getNumberOfCPUs(),
+            "OPENCV": cv2.__version__,
+            "NUMPY": np.__version__}
+
+
+class Benchmark_case():
+    def __init__(self, name: str, function, nb_operations: int = 1):
+        self.name = name
+        self.function = function # Called without argument, on inputs prepared beforehand
+        self.nb_operations = nb_operations
+
+
+class Benchmark_suite():
+    '''
+    Micro-benchmarks of isolated functions, run on fixed inputs.
+    Each case is measured with warm-up and repetitions, and described by its median and interquartile range.
+    '''
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.case_list = []
+
+    def add(self, name: str, function, nb_operations: int = 1):
+        self.case_list.append(Benchmark_case(name, function, nb_operations))
+
+    def get_names(self):
+        return [curr_case.name for curr_case in self.case_list]
+
+    def run(self, repetitions: int = DEFAULT_REPETITIONS, warmup: int = DEFAULT_WARMUP, name_filter=None):
+        '''
+        Measure all cases, or only the ones whose name contains one of the filters
+        :return: dict {"ENVIRONMENT", "REPETITIONS", "WARMUP", "RESULTS" : {case name : statistics}}
+        '''
+        results = {}
+        for curr_case in self.case_list:
+            if name_filter is not None and not any(f in curr_case.name for f in name_filter):
+                continue
+
+            try:
+                duration_list = measure(curr_case.function, repetitions, warmup)
+            except Exception as e:
+                self.logger.error(f"Benchmark {curr_case.name} failed : {e}")
+                continue
+
+            results[curr_case.name] = describe_durations(duration_list, curr_case.nb_operations)
+            self.logger.info(f"{curr_case.name} : median {results[curr_case.name]['MEDIAN'] * 1000:.4f}ms (IQR {results[curr_case.name]['IQR'] * 1000:.4f}ms)")
+
+        return {"ENVIRONMENT": get_environment(),
+                "REPETITIONS": repetitions,
+                "WARMUP": warmup,
+                "RESULTS": results}
+
+    @staticmethod
+    def save_results(results, file_path: pathlib.Path):
+        filesystem_lib.File_System.save_json(results, file_path)
+
+    @staticmethod
+    def compare_results(reference, current):
+        '''
+        Ratio of the median of each case common to two runs (current / reference), e.g. between two commits
+        '''
+        return {name: current["RESULTS"][name]["MEDIAN"] / reference["RESULTS"][name]["MEDIAN"]
+                for name in reference["RESULTS"] if name in current["RESULTS"] and reference["RESULTS"][name]["MEDIAN"] > 0}
@@ -0,0 +1,175 @@
+import time
+import shutil
+import pickle
+import pathlib
+import logging
+
+import cv2
+
+import configuration
+from utility_lib import filesystem_lib
+
+CHECKPOINT_FOLDER = "checkpoint"
+FEATURES_FILE = "features.pkl"
+PROGRESS_FILE = "progress.pkl"
+COMPLETED_FILE = "COMPLETED" # Marker written once a full test ended
+
+
+# =========================== -------------------------- ===========================
+#                               COMPLETION OF A FOLDER
+
+def is_completed(output_dir: pathlib.Path):
+    '''
+    True if the full test of this results folder ended. Folders of previous versions (without marker) are completed if they have stats.
+    '''
+    return (output_dir / COMPLETED_FILE).exists() or (output_dir / "stats.txt").exists()
+
+
+def mark_completed(output_dir: pathlib.Path):
+    output_dir.mkdir(parents=True, exist_ok=True)
+    (output_dir / COMPLETED_FILE).write_text(time.strftime("%Y-%m-%d %H:%M:%S"))
+
+    # Checkpoints are not needed anymore
+    shutil.rmtree(str(output_dir / CHECKPOINT_FOLDER), ignore_errors=True)
+
+
+def clear(output_dir: pathlib.Path):
+    '''
+    Forget checkpoints and completion of a results folder, e.g. to overwrite it
+    '''
+    shutil.rmtree(str(output_dir / CHECKPOINT_FOLDER), ignore_errors=True)
+    if (output_dir / COMPLETED_FILE).exists():
+        (output_dir / COMPLETED_FILE).unlink()
+
+
+# =========================== -------------------------- ===========================
+#                                    CHECKPOINTS
+
+class Checkpoint_handler():
+    '''
+    Periodic checkpoints of a full test, to resume it after a crash :
+    - the prepared features of the pictures (once the dataset is prepared)
+    - the results of all completed targets (edges of the graphe, timings, handler specific state)
+    '''
+
+    def __init__(self, conf: configuration.Default_configuration):
+        self.logger = logging.getLogger(__name__)
+
+        self.folder = conf.OUTPUT_DIR / CHECKPOINT_FOLDER
+        self.interval = conf.CHECKPOINT_INTERVAL # Seconds between two checkpoints of the progress
+        self.last_save_time = time.time()
+
+    @staticmethod
+    def save_pickle(obj, file_path: pathlib.Path):
+        # A crash during the writing keeps the previous checkpoint
+        filesystem_lib.atomic_write(file_path, lambda tmp_path: tmp_path.write_bytes(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL)))
+
+    @staticmethod
+    def load_pickle(file_path: pathlib.Path):
+        if not file_path.is_file():
+            return None
+        with file_path.open("rb") as f:
+            return pickle.load(f)
+
+    # ==== Features ====
+    @staticmethod
+    def keypoints_to_tuples(key_points):
+        # cv2.KeyPoint can't be pickled
+        return [(k.pt[0], k.pt[1], k.size, k.angle, k.response, k.octave, k.class_id) for k in key_points]
+
+    @staticmethod
+    def tuples_to_keypoints(key_points):
+        return tuple(cv2.KeyPoint(x, y, size, angle, response, octave, class_id) for x, y, size, angle, response, octave, class_id in key_points)
+
+    def save_features(self, input_picture_list, picture_list, attributes, results_storage):
+        '''
+        Store the prepared features of the pictures. Progress on targets of previous features is forgotten.
+        :param input_picture_list: pictures before preparation (to check the dataset did not change)
+        :param picture_list: prepared pictures (some may have been removed by the preparation)
+        :param attributes: attributes of the pictures holding the prepared features
+        :param results_storage: results, with timings of the preparation
+        '''
+        features_list = []
+        for curr_picture in picture_list:
+            curr_features = {}
+            for curr_attribute in attributes:
+                value = getattr(curr_picture, curr_attribute)
+                if curr_attribute == "key_points" and value is not None:
+                    value = Checkpoint_handler.keypoints_to_tuples(value)
+                curr_features[curr_attribute] = value
+            features_list.append(curr_features)
+
+        checkpoint = {"input_pictures": [curr_picture.path.name for curr_picture in input_picture_list],
+                      "pictures": [curr_picture.path.name for curr_picture in picture_list],
+                      "features": features_list,
+                      "results": results_storage}
+
+        progress_file = self.folder / PROGRESS_FILE
+        if progress_file.exists(): progress_file.unlink()
+        Checkpoint_handler.save_pickle(checkpoint, self.folder / FEATURES_FILE)
+
+        self.logger.info(f"Checkpoint of prepared features saved in {self.folder}")
+
+    def load_features(self, picture_list, attributes):
+        '''
+        Restore the prepared features of the pictures, if a checkpoint of the same dataset exists
+        :return: prepared pictures and results of the preparation, or None
+        '''
+        try:
+            checkpoint = Checkpoint_handler.load_pickle(self.folder / FEATURES_FILE)
+        except Exception as e:
+            self.logger.error(f"Impossible to load checkpoint of features : {e}")
+            return None
+
+        if checkpoint is None:
+            return None
+
+        picture_dict = {curr_picture.path.name: curr_picture for curr_picture in picture_list}
+        if sorted(checkpoint["input_pictures"]) != sorted(picture_dict.keys()):
+            self.logger.warning("Checkpoint of features ignored : the dataset changed")
+            return None
+
+        prepared_picture_list = []
+        for name, curr_features in zip(checkpoint["pictures"], checkpoint["features"]):
+            curr_picture = picture_dict[name]
+            for curr_attribute in attributes:
+                value = curr_features.get(curr_attribute)
+                if curr_attribute == "key_points" and value is not None:
+                    value = Checkpoint_handler.tuples_to_keypoints(value)
+                setattr(curr_picture, curr_attribute, value)
+            prepared_picture_list.append(curr_picture)
+
+        self.logger.info(f"Prepared features of {len(prepared_picture_list)} pictures restored from {self.folder}")
+        return prepared_picture_list, checkpoint["results"]
+
+    # ==== Progress ====
+    def is_due(self):
+        return time.time() - self.last_save_time >= self.interval
+
+    def save_progress(self, next_target: int, edges, list_time, latency_sketch, elapsed: float, handler_state: dict, timer_stages: dict = None):
+        '''
+        Store the results of targets [0, next_target[
+        :param list_time: matching time of each target, None if not kept (see TIME_LIST_MAX_TARGETS)
+        :param latency_sketch: matching times of these targets, as a stats_lib.Latency_sketch
+        :param elapsed: matching time spent on these targets
+        :param timer_stages: durations of stages measured so far (see timing_lib.Stage_timer)
+        '''
+        checkpoint = {"next_target": next_target,
+                      "edges": edges,
+                      "list_time": list_time,
+                      "latency_sketch": latency_sketch,
+                      "elapsed": elapsed,
+                      "handler_state": handler_state,
+                      "timer_stages": timer_stages}
+
+        Checkpoint_handler.save_pickle(checkpoint, self.folder / PROGRESS_FILE)
+        self.last_save_time = time.time()
+
+        self.logger.debug(f"Checkpoint of progress saved : {next_target} targets done")
+
+    def load_progress(self):
+        try:
+            return Checkpoint_handler.load_pickle(self.folder / PROGRESS_FILE)
+        except Exception as e:
+            self.logger.error(f"Impossible to load checkpoint of progress : {e}")
+            return None
@@ -0,0 +1,101 @@
+import hashlib
+import logging
+import pathlib
+
+import cv2
+import numpy as np
+from PIL import Image
+
+import configuration
+from utility_lib import filesystem_lib
+
+# Gray levels of the consumer of cached grayscale pictures : ORB (OpenCV BGR weights) and imagehash (PIL convert("L")) differ
+OPENCV_GRAY_LEVELS = "GRAY"
+PIL_GRAY_LEVELS = "GRAY_PIL"
+
+
+class Decoded_picture_cache():
+    '''
+    Decoded pictures, stored once as raw uint8 arrays in .npy files, and memory mapped (read-only, zero-copy) afterwards.
+    Shared by all handlers and configurations using the same folder : a picture is decoded by the first one only.
+    Arrays are RGB, or grayscale as their consumer computes it (ORB, see load_rgb, or PIL, see load_pil), optionally downscaled to a maximum side.
+    '''
+
+    def __init__(self, cache_dir: pathlib.Path, grayscale: bool = False, max_size: int = None, gray_levels: str = OPENCV_GRAY_LEVELS):
+        self.logger = logging.getLogger('__main__.' + __name__)
+        self.cache_dir = pathlib.Path(cache_dir)
+        self.grayscale = grayscale
+        self.max_size = max_size
+        self.gray_levels = gray_levels
+
+    def get_cache_path(self, path: pathlib.Path):
+        # Same picture file and same variant, same entry
+        key = f"{filesystem_lib.get_picture_key(path)}|{self.gray_levels if self.grayscale else 'RGB'}|{self.max_size}"
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return self.cache_dir / digest[:2] / (digest + ".npy")
+
+    def get(self, path: pathlib.Path):
+        path = pathlib.Path(path)
+        cache_path = self.get_cache_path(path)
+
+        try:
+            return np.load(str(cache_path), mmap_mode="r")
+        except (OSError, ValueError):
+            # Absent, or unreadable : decoded (again)
+            pass
+
+        image = self.decode(path)
+        filesystem_lib.atomic_write(cache_path, lambda tmp_path: np.save(str(tmp_path), image))
+
+        return np.load(str(cache_path), mmap_mode="r")
+
+    def decode(self, path: pathlib.Path):
+        image = cv2.imread(str(path))
+        if image is None:
+            raise Exception(f"Impossible to decode picture {path}")
+        image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)  # Convert from cv's BRG default color order to RGB
+
+        if self.max_size is not None and max(image.shape[:2]) > self.max_size:
+            scale = self.max_size / max(image.shape[:2])
+            image = cv2.resize(image, (max(1, round(image.shape[1] * scale)), max(1, round(image.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+
+        if self.grayscale and self.gray_levels == PIL_GRAY_LEVELS:
+            # Same gray levels as imagehash computes from the picture file
+            image = np.asarray(Image.fromarray(image).convert("L"))
+        elif self.grayscale:
+            # ORB reads 3 channels pictures as BGR : same gray levels as ORB computes from the RGB array
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        return np.ascontiguousarray(image, dtype=np.uint8)
+
+
+def get_cache(conf: configuration.Default_configuration, gray_levels: str = OPENCV_GRAY_LEVELS):
+    # Cache of the configuration, None if disabled
+    if conf.DECODE_CACHE_DIR is None:
+        return None
+    return Decoded_picture_cache(conf.DECODE_CACHE_DIR, grayscale=conf.DECODE_CACHE_GRAYSCALE, max_size=conf.DECODE_CACHE_MAX_SIZE, gray_levels=gray_levels)
+
+
+def load_rgb(path: pathlib.Path, conf: configuration.Default_configuration):
+    '''
+    Decoded picture as an array, for OpenCV handlers : from the cache if enabled (read-only), decoded otherwise
+    '''
+    cache = get_cache(conf)
+    if cache is not None:
+        return cache.get(path)
+
+    image = cv2.imread(str(path))
+    image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)  # Convert from cv's BRG default color order to RGB
+    return image
+
+
+def load_pil(path: pathlib.Path, conf: configuration.Default_configuration):
+    '''
+    Picture as a PIL image, for hashes : from the cache if enabled, opened from the file otherwise
+    Grayscale cached pictures are PIL gray levels, not the ORB ones : same hashes as from the file
+    '''
+    cache = get_cache(conf, gray_levels=PIL_GRAY_LEVELS)
+    if cache is not None:
+        return Image.fromarray(cache.get(path))
+
+    return Image.open(path)
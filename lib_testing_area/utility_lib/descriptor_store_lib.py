@@ -0,0 +1,143 @@
+import json
+import shutil
+import hashlib
+import logging
+import pathlib
+
+import cv2
+import numpy as np
+
+import configuration
+from utility_lib import filesystem_lib
+
+STORE_VERSION = 1
+INDEX_FILE = "index.json"
+DESCRIPTORS_FILE = "descriptors.npy" # uint8 (nb descriptors, descriptor size) : descriptors of all pictures, one after the other
+KEYPOINTS_FILE = "keypoints.npy" # float32 (nb descriptors, 7) : x, y, size, angle, response, octave, class_id of each descriptor
+OFFSETS_FILE = "offsets.npy" # int64 (nb pictures + 1) : rows of picture i are offsets[i]:offsets[i+1]
+KEYPOINT_FIELDS = 7
+DESCRIPTOR_SIZE = 32 # ORB descriptors are 256 bits
+
+
+def keypoints_to_table(key_points):
+    table = np.empty((len(key_points), KEYPOINT_FIELDS), dtype=np.float32)
+    for i, k in enumerate(key_points):
+        table[i] = (k.pt[0], k.pt[1], k.size, k.angle, k.response, k.octave, k.class_id)
+    return table
+
+
+def table_to_keypoints(table):
+    return tuple(cv2.KeyPoint(float(x), float(y), float(size), float(angle), float(response), int(octave), int(class_id))
+                 for x, y, size, angle, response, octave, class_id in table)
+
+
+def save_array(array, file_path: pathlib.Path):
+    filesystem_lib.atomic_write(file_path, lambda tmp_path: np.save(str(tmp_path), array))
+
+
+class Descriptor_store():
+    '''
+    ORB descriptors of a dataset, written once in one contiguous uint8 file, with an offsets table and a compact keypoints table.
+    Files are memory mapped read-only : pictures hold slices of them (no copy), shared by all processes and later runs.
+    Keypoints objects are only built for drawings (see Local_Picture.key_points), matching uses the coordinates slices.
+    '''
+
+    def __init__(self, store_dir: pathlib.Path):
+        self.logger = logging.getLogger('__main__.' + __name__)
+        self.store_dir = pathlib.Path(store_dir)
+
+        self.pictures = {} # picture key : row in the offsets table
+        self.descriptors = None
+        self.keypoints = None
+        self.offsets = None
+
+    @staticmethod
+    def get_store(conf: configuration.ORB_default_configuration):
+        '''
+        Store of the dataset and of the parameters changing the descriptors, None if disabled
+        '''
+        if conf.DESCRIPTOR_STORE_DIR is None:
+            return None
+        key = f"{pathlib.Path(conf.SOURCE_DIR).resolve()}|{conf.ORB_KEYPOINTS_NB}|{conf.DECODE_CACHE_MAX_SIZE}"
+        return Descriptor_store(pathlib.Path(conf.DESCRIPTOR_STORE_DIR) / hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def open(self, picture_list):
+        '''
+        Memory map the store, if it holds all these pictures
+        :return: True if opened
+        '''
+        try:
+            with (self.store_dir / INDEX_FILE).open("r", encoding="utf-8") as f:
+                index = json.load(f)
+            if index["VERSION"] != STORE_VERSION:
+                return False
+
+            pictures = index["PICTURES"]
+            if any(filesystem_lib.get_picture_key(curr_picture.path) not in pictures for curr_picture in picture_list):
+                return False
+
+            generation_dir = self.store_dir / index["GENERATION"]
+            self.descriptors = np.load(str(generation_dir / DESCRIPTORS_FILE), mmap_mode="r")
+            self.keypoints = np.load(str(generation_dir / KEYPOINTS_FILE), mmap_mode="r")
+            self.offsets = np.load(str(generation_dir / OFFSETS_FILE))
+        except (OSError, ValueError, KeyError) as e:
+            # Absent, outdated or replaced meanwhile : pictures are described (again)
+            self.logger.debug(f"Descriptor store {self.store_dir} not opened : {e}")
+            return False
+
+        self.pictures = pictures
+        return True
+
+    def write(self, picture_list):
+        '''
+        Write descriptors and keypoints of described pictures (no descriptors kept for the ones without), and open the store
+        '''
+        counts = [len(p.description) if p.description is not None else 0 for p in picture_list]
+        offsets = np.zeros(len(picture_list) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(counts)
+
+        descriptors = np.empty((offsets[-1], DESCRIPTOR_SIZE), dtype=np.uint8)
+        keypoints = np.empty((offsets[-1], KEYPOINT_FIELDS), dtype=np.float32)
+        for i, curr_picture in enumerate(picture_list):
+            if counts[i] > 0:
+                descriptors[offsets[i]:offsets[i + 1]] = curr_picture.description
+                keypoints[offsets[i]:offsets[i + 1]] = keypoints_to_table(curr_picture.key_points)
+
+        pictures = {filesystem_lib.get_picture_key(curr_picture.path): i for i, curr_picture in enumerate(picture_list)}
+        # Files of another dataset version are in another folder : processes mapping them keep them valid
+        generation = hashlib.sha1("\n".join(sorted(pictures)).encode("utf-8")).hexdigest()
+        generation_dir = self.store_dir / generation
+        generation_dir.mkdir(parents=True, exist_ok=True)
+        save_array(descriptors, generation_dir / DESCRIPTORS_FILE)
+        save_array(keypoints, generation_dir / KEYPOINTS_FILE)
+        save_array(offsets, generation_dir / OFFSETS_FILE)
+
+        # Index written last : a store is complete once indexed
+        index = {"VERSION": STORE_VERSION, "GENERATION": generation, "PICTURES": pictures}
+        filesystem_lib.atomic_write(self.store_dir / INDEX_FILE, lambda tmp_path: tmp_path.write_text(json.dumps(index, separators=(",", ":")), encoding="utf-8"))
+
+        for curr_dir in self.store_dir.iterdir():
+            if curr_dir.is_dir() and curr_dir.name != generation:
+                shutil.rmtree(str(curr_dir), ignore_errors=True)
+
+        self.logger.info(f"Descriptors of {len(picture_list)} pictures ({descriptors.nbytes / 2 ** 20:.1f} MB) written to {self.store_dir}")
+        if not self.open(picture_list):
+            raise Exception(f"Impossible to open the descriptor store just written : {self.store_dir}")
+
+    def attach(self, curr_picture):
+        '''
+        Give the picture read-only slices of the store : descriptors, keypoints table and coordinates
+        '''
+        i = self.pictures[filesystem_lib.get_picture_key(curr_picture.path)]
+        start, end = self.offsets[i], self.offsets[i + 1]
+
+        curr_picture.key_points = None
+        curr_picture.key_points_table = self.keypoints[start:end]
+        if start == end:
+            curr_picture.description = None
+            curr_picture.key_points_coordinates = None
+        else:
+            curr_picture.description = self.descriptors[start:end]
+            curr_picture.key_points_coordinates = self.keypoints[start:end, :2]
+
+        return curr_picture
@@ -6,6 +6,7 @@ import pprint
 import json
 import traceback
 
+# Memory of stages is measured with RESOURCE_ACCOUNTING (see utility_lib/resources_lib.py)
 # from memory_profiler import profile, LogFile
 import sys
 # sys.stdout = LogFile('memory_profile_log')
@@ -16,10 +17,20 @@ from utility_lib import printing_lib
 from utility_lib import stats_lib
 from utility_lib import picture_class
 from utility_lib import json_class
+from utility_lib import results_db
+from utility_lib import checkpoint_lib
+from utility_lib import timing_lib
+from utility_lib import resources_lib
+from utility_lib import trace_lib
 
 import configuration
 import results
 
+# Rough resources estimates, used by the configuration scheduler (see utility_lib/scheduler_lib.py)
+PROCESS_MEMORY = 300 * 1024 * 1024  # Interpreter, libraries, json of results ...
+PICTURE_MEMORY = 20 * 1024  # Picture object, opened (not decoded) image, node and edges
+DECODING_TIME_PER_PIXEL = 1e-8  # Seconds to load one pixel of a picture
+
 
 class Execution_handler():
     def __init__(self, conf: configuration.Default_configuration):
@@ -48,20 +59,36 @@ class Execution_handler():
         self.json_handler = json_class.Json_handler(conf=self.conf)
 
         self.create_folder(self.conf.OUTPUT_DIR)
-        self.write_configuration_to_folder(self.conf)
+        if self.conf.EXPORT_TO_FOLDER:
+            self.write_configuration_to_folder(self.conf)
+
+        # Results store, shared by all runs of a launch
+        self.results_db = None
+        if self.conf.RESULTS_DB_PATH is not None:
+            self.results_db = results_db.Results_DB(pathlib.Path(self.conf.RESULTS_DB_PATH))
+            self.results_db.add_run(self.get_run_name(), self.conf)
 
         # For statistics only
         self.list_time = []  # TODO : To replace
 
-        if self.conf.IMG_TYPE == configuration.SUPPORTED_IMAGE_TYPE.PNG:
-            self.pathlist = self.conf.SOURCE_DIR.glob('**/*.png')
-        elif self.conf.IMG_TYPE == configuration.SUPPORTED_IMAGE_TYPE.BMP:
-            self.pathlist = self.conf.SOURCE_DIR.glob('**/*.bmp')
-        else:
+        # Pictures are listed by the manifest of the source folder (see File_System.get_Pictures_from_directory)
+        if self.conf.IMG_TYPE not in [configuration.SUPPORTED_IMAGE_TYPE.PNG, configuration.SUPPORTED_IMAGE_TYPE.BMP]:
             raise Exception(f"IMG_TYPE not recognized as a valid type {self.conf.IMG_TYPE.value}")
 
         # Default Local_picture that has to be overwrite
         self.Local_Picture_class_ref = picture_class.Picture
+        # Attributes of pictures holding the prepared features, stored in checkpoints
+        self.checkpoint_attributes = ["hash"]
+        # Only for full tests
+        self.checkpoint_handler = None
+
+        # Durations of stages, measured by the handlers (no measure if disabled)
+        self.timer = timing_lib.Stage_timer(enabled=self.conf.STAGE_TIMING)
+        # CPU, memory and context switches of the steps of a full test (no measure if disabled)
+        self.resource_monitor = resources_lib.Resource_monitor(enabled=self.conf.RESOURCE_ACCOUNTING, trace_memory=self.conf.TRACE_MEMORY)
+        # Spans of the steps, pictures and targets of a full test, written to a trace file (nothing recorded if disabled)
+        self.tracer = trace_lib.Tracer(enabled=self.conf.TRACE_SAMPLING_PERIOD is not None,
+                                       sampling_period=self.conf.TRACE_SAMPLING_PERIOD if self.conf.TRACE_SAMPLING_PERIOD is not None else 1)
 
         # Used during process
         self.target_picture = None
@@ -80,13 +107,32 @@ class Execution_handler():
 
     def do_full_test(self):
         self.logger.info("==== FULL TEST SELECTED ====")
-        self.picture_list = self.load_pictures(self.conf.SOURCE_DIR, self.Local_Picture_class_ref)
-        self.json_handler = self.prepare_initial_JSON(self.picture_list, self.json_handler)
-        self.picture_list = self.prepare_dataset(self.picture_list)
-        self.json_handler, self.list_time = self.iterate_over_dataset(self.picture_list, self.json_handler)
-        self.json_handler = self.evaluate_JSON(self.json_handler, self.conf.GROUND_TRUTH_PATH)
-        self.export_final_JSON(self.json_handler)
-        self.describe_stats(self.list_time)
+        # Resume from checkpoints of a previous execution of this configuration, if any
+        if self.conf.CHECKPOINT_INTERVAL is not None:
+            self.checkpoint_handler = checkpoint_lib.Checkpoint_handler(conf=self.conf)
+
+        self.resource_monitor.start()
+        try:
+            with self.resource_monitor.measure("load_pictures"), self.tracer.span("load_pictures", "load"):
+                self.picture_list = self.load_pictures(self.conf.SOURCE_DIR, self.Local_Picture_class_ref)
+                self.json_handler = self.prepare_initial_JSON(self.picture_list, self.json_handler)
+            with self.resource_monitor.measure("prepare_dataset"), self.tracer.span("prepare_dataset", "prepare"):
+                self.picture_list = self.prepare_dataset(self.picture_list)
+            with self.resource_monitor.measure("iterate_over_dataset"), self.tracer.span("iterate_over_dataset", "matching"):
+                self.json_handler, self.list_time = self.iterate_over_dataset(self.picture_list, self.json_handler)
+            with self.resource_monitor.measure("evaluate_JSON"), self.tracer.span("evaluate_json", "evaluation"):
+                self.json_handler = self.evaluate_JSON(self.json_handler, self.conf.GROUND_TRUTH_PATH)
+            with self.resource_monitor.measure("export_final_JSON"), self.tracer.span("export_final_JSON", "export"):
+                self.export_final_JSON(self.json_handler)
+            self.describe_stats(self.list_time)
+        finally:
+            self.resource_monitor.stop()
+            # Written even if the run failed : the trace shows up to where it went
+            self.tracer.save(self.conf.OUTPUT_DIR / trace_lib.TRACE_FILE, process_name=self.get_run_name())
+
+        # Only resumable executions (launched ones) are marked : the launcher skips completed folders
+        if self.checkpoint_handler is not None:
+            checkpoint_lib.mark_completed(self.conf.OUTPUT_DIR)
 
     def do_pair_test(self, pic1: pathlib.Path, pic2: pathlib.Path):
         self.logger.info("==== PAIR TEST SELECTED ====")
@@ -120,7 +166,9 @@ class Execution_handler():
     def load_pictures(self, target_dir: pathlib.Path, Local_Picture_class_ref):
         self.logger.info("Load pictures ... ")
         start_time = time.time()
+        start_ns = self.timer.start()
         picture_list = self.file_system.get_Pictures_from_directory(target_dir, class_name=Local_Picture_class_ref)
+        self.timer.stop("decode", start_ns, count=len(picture_list))
 
         self.results_storage.TIME_TO_LOAD_PICTURES = time.time() - start_time
         self.print_elapsed_time(self.results_storage.TIME_TO_LOAD_PICTURES, 1)
@@ -128,14 +176,31 @@ class Execution_handler():
 
     #@profile(stream=fp)
     def prepare_dataset(self, picture_list):
+        if self.checkpoint_handler is not None:
+            restored = self.checkpoint_handler.load_features(picture_list, self.checkpoint_attributes)
+            if restored is not None:
+                # Timings of the preparation are the ones of the checkpointed execution
+                picture_list, self.results_storage = restored
+                return self.TO_OVERWRITE_restore_dataset(picture_list)
+
         self.logger.info("Prepare dataset pictures ... (Launch timer)")
+        input_picture_list = list(picture_list)
         start_time = time.time()
         picture_list = self.TO_OVERWRITE_prepare_dataset(picture_list)
 
         self.results_storage.TIME_TOTAL_PRE_COMPUTING = time.time() - start_time
         self.results_storage.TIME_PER_PICTURE_PRE_COMPUTING = self.results_storage.TIME_TOTAL_PRE_COMPUTING / len(picture_list)
+        self.results_storage.PICTURES_PER_SECOND_PRE_COMPUTING = self.get_rate(len(picture_list), self.results_storage.TIME_TOTAL_PRE_COMPUTING)
 
         self.print_elapsed_time(self.results_storage.TIME_TOTAL_PRE_COMPUTING, len(picture_list))
+
+        if self.checkpoint_handler is not None:
+            self.checkpoint_handler.save_features(input_picture_list, picture_list, self.checkpoint_attributes, self.results_storage)
+
+        return picture_list
+
+    def TO_OVERWRITE_restore_dataset(self, picture_list):
+        # Rebuild what the preparation stored outside of the pictures (matchers, ...), from their restored features
         return picture_list
 
     def TO_OVERWRITE_prepare_dataset(self, picture_list):
@@ -162,9 +227,32 @@ class Execution_handler():
         if len(picture_list) == 0 or picture_list == []:
             raise Exception("ITERATE OVER DATASET IN EXECUTION HANDLER : Picture list empty ! Abort.")
 
-        list_time = []
-        start_FULL_time = time.time()
-        for i, curr_target_picture in enumerate(picture_list):
+        target_list = self.get_target_list(picture_list)
+
+        # Timing of each target kept for small datasets only : memory and stats.txt would grow with the number of targets
+        keep_list_time = self.conf.TIME_LIST_MAX_TARGETS is None or len(target_list) <= self.conf.TIME_LIST_MAX_TARGETS
+        list_time = [] if keep_list_time else None
+        first_target = 0
+        elapsed_before = 0
+        # Tail latencies, without sorting all timings at the end
+        latency_sketch = stats_lib.Latency_sketch()
+
+        progress = self.checkpoint_handler.load_progress() if self.checkpoint_handler is not None else None
+        if progress is not None:
+            first_target = progress["next_target"]
+            list_time = progress["list_time"]
+            latency_sketch = progress["latency_sketch"]
+            elapsed_before = progress["elapsed"]
+            json_handler.graphe.edges = progress["edges"]
+            self.set_checkpoint_state(progress["handler_state"])
+            if progress.get("timer_stages") is not None:
+                # Shared with the timers of sub-handlers : updated in place
+                self.timer.stages.clear()
+                self.timer.stages.update(progress["timer_stages"])
+            self.logger.info(f"Resuming from checkpoint : {first_target} targets out of {len(target_list)} already done")
+
+        start_FULL_time = time.time() - elapsed_before
+        for i, curr_target_picture in enumerate(target_list[first_target:], start=first_target):
             self.logger.debug(f"PICTURE {i} picked as target ... (start current timer)")
             self.logger.debug(f"Target picture : {curr_target_picture.path}")
 
@@ -172,43 +260,79 @@ class Execution_handler():
                 self.logger.info(f"PICTURE {i} picked as target ... (start current timer)")
                 self.logger.info(f"Target picture : {curr_target_picture.path}")
 
-            start_time = time.time()
-
-            try:
-                # self.find_closest_picture(picture_list, curr_target_picture)
-                curr_sorted_picture_list = self.find_top_k_closest_pictures(picture_list, curr_target_picture)
-            except Exception as e:
-                self.logger.error(
-                    f"An Exception has occured during the tentative to find a (k-top) match to {curr_target_picture.path.name} : " + str(e))
-                self.logger.error(traceback.print_tb(e.__traceback__))
-            else:
-                try:
-                    self.save_pictures(curr_sorted_picture_list, curr_target_picture)
-                except Exception as e:
-                    self.logger.error(
-                        f"An Exception has occured during the tentative save the result picture of {curr_target_picture.path.name} : " + str(e))
-                    self.logger.error(traceback.print_tb(e.__traceback__))
+            # Sampled : one target out of TRACE_SAMPLING_PERIOD in the trace
+            with self.tracer.span("target", "matching", sampled=True, args={"index": i, "target": curr_target_picture.path.name}):
+                start_time = time.time()
 
                 try:
-                    # if curr_sorted_picture_list[0].distance < THREESHOLD :
-                    json_handler = self.add_top_matches_to_JSON(curr_sorted_picture_list, curr_target_picture, json_handler)
+                    # self.find_closest_picture(picture_list, curr_target_picture)
+                    with self.timer.stage("top_k"):
+                        curr_sorted_picture_list = self.find_top_k_closest_pictures(picture_list, curr_target_picture)
                 except Exception as e:
                     self.logger.error(
-                        f"An Exception has occured during the tentative to add result to json for {curr_target_picture.path.name} : " + str(e))
+                        f"An Exception has occured during the tentative to find a (k-top) match to {curr_target_picture.path.name} : " + str(e))
                     self.logger.error(traceback.print_tb(e.__traceback__))
+                else:
+                    try:
+                        with self.timer.stage("save_pictures"), self.tracer.span("save_pictures", "matching", sampled=True):
+                            self.save_pictures(curr_sorted_picture_list, curr_target_picture)
+                    except Exception as e:
+                        self.logger.error(
+                            f"An Exception has occured during the tentative save the result picture of {curr_target_picture.path.name} : " + str(e))
+                        self.logger.error(traceback.print_tb(e.__traceback__))
+
+                    try:
+                        # if curr_sorted_picture_list[0].distance < THREESHOLD :
+                        with self.timer.stage("json"):
+                            json_handler = self.add_top_matches_to_JSON(curr_sorted_picture_list, curr_target_picture, json_handler)
+                    except Exception as e:
+                        self.logger.error(
+                            f"An Exception has occured during the tentative to add result to json for {curr_target_picture.path.name} : " + str(e))
+                        self.logger.error(traceback.print_tb(e.__traceback__))
 
             elapsed = time.time() - start_time
             self.print_elapsed_time(elapsed, 1, to_add="current ")
-            list_time.append(elapsed)
+            if list_time is not None:
+                list_time.append(elapsed)
+            latency_sketch.add(elapsed)
+
+            if self.checkpoint_handler is not None and self.checkpoint_handler.is_due():
+                self.checkpoint_handler.save_progress(i + 1, json_handler.graphe.edges, list_time, latency_sketch, time.time() - start_FULL_time, self.get_checkpoint_state(),
+                                                     timer_stages=self.timer.stages if self.timer.enabled else None)
 
         self.results_storage.TIME_TOTAL_MATCHING = time.time() - start_FULL_time
         self.results_storage.TIME_LIST_MATCHING = list_time
-        self.results_storage.NB_PICTURE = len(picture_list)
-        self.results_storage.TIME_PER_PICTURE_MATCHING = self.results_storage.TIME_TOTAL_MATCHING / len(picture_list)
+        self.results_storage.NB_PICTURE = len(target_list)
+        self.results_storage.TIME_PER_PICTURE_MATCHING = self.results_storage.TIME_TOTAL_MATCHING / len(target_list)
+        self.results_storage.LATENCY_PERCENTILES = latency_sketch.get_percentiles()
+        self.results_storage.PICTURES_PER_SECOND_MATCHING = self.get_rate(len(target_list), self.results_storage.TIME_TOTAL_MATCHING)
+        self.results_storage.PAIRS_PER_SECOND = self.get_rate(len(target_list) * len(picture_list), self.results_storage.TIME_TOTAL_MATCHING)
 
-        self.print_elapsed_time(self.results_storage.TIME_TOTAL_MATCHING, len(picture_list), to_add="global ")
+        self.print_elapsed_time(self.results_storage.TIME_TOTAL_MATCHING, len(target_list), to_add="global ")
         return json_handler, list_time
 
+    def get_target_list(self, picture_list):
+        '''
+        Pictures picked as targets : all pictures, or only the ones of the configured subset (see TARGET_SUBSET)
+        '''
+        if self.conf.TARGET_SUBSET is None:
+            return picture_list
+
+        subset = set(self.conf.TARGET_SUBSET)
+        target_list = [curr_picture for curr_picture in picture_list if curr_picture.path.name in subset]
+        if len(target_list) == 0:
+            raise Exception("ITERATE OVER DATASET IN EXECUTION HANDLER : No picture of the target subset in the dataset ! Abort.")
+
+        self.logger.info(f"{len(target_list)} targets picked out of {len(picture_list)} pictures")
+        return target_list
+
+    def get_checkpoint_state(self):
+        # State of the handler built target by target, besides edges and timings, to store in checkpoints
+        return {}
+
+    def set_checkpoint_state(self, state: dict):
+        pass
+
     def find_closest_picture(self, picture_list, target_picture):
         # TODO : To remove ? Not useful ?
         self.logger.info("Find closest picture from target picture ... ")
@@ -237,9 +361,15 @@ class Execution_handler():
 
     # PROFILER # @profile(stream=fp)
     def find_top_k_closest_pictures(self, picture_list, target_picture):
-        # Compute distances
-        for curr_pic in picture_list:
-            curr_pic.distance = self.TO_OVERWRITE_compute_distance(curr_pic, target_picture)
+        # Compute distances. Measured per pair only if enabled : distances of hashes are as fast as a measure
+        if self.timer.enabled:
+            for curr_pic in picture_list:
+                start_ns = self.timer.start()
+                curr_pic.distance = self.TO_OVERWRITE_compute_distance(curr_pic, target_picture)
+                self.timer.stop("distance", start_ns)
+        else:
+            for curr_pic in picture_list:
+                curr_pic.distance = self.TO_OVERWRITE_compute_distance(curr_pic, target_picture)
 
         self.logger.debug("Extract top K images ... ") # TODO DEBUG OR INFO ?
         picture_list = [i for i in picture_list if i.distance is not None]
@@ -288,18 +418,51 @@ class Execution_handler():
 
     def export_final_JSON(self, json_handler):
         self.logger.info("Export json ... ")
-        json_handler.json_export()
+        with self.timer.stage("json_export"):
+            json_handler.json_export()
 
     # ====================== STATISTICS AND PRINTING ======================
     def evaluate_JSON(self, json_handler, baseline_path):
-        json_handler, self.results_storage = json_handler.evaluate_json(pathlib.Path(baseline_path), self.results_storage)
+        with self.timer.stage("evaluation"):
+            json_handler, self.results_storage = json_handler.evaluate_json(pathlib.Path(baseline_path), self.results_storage)
         self.logger.info(f"Quality of guess : {str(round(self.results_storage.TRUE_POSITIVE_RATE, stats_lib.ROUND_DECIMAL))}")
         return json_handler
 
     def describe_stats(self, list_time):
         self.logger.info("Describing timer statistics... ")
+        if self.timer.enabled:
+            self.results_storage.TIME_PER_STAGE = self.timer.to_dict()
+        if self.resource_monitor.enabled:
+            self.results_storage.RESOURCE_USAGE = self.resource_monitor.stages
+            self.results_storage.MAX_RSS = self.resource_monitor.get_max_rss()
         self.stats_handler.print_stats(self.conf, self.results_storage)
-        self.stats_handler.write_stats_to_folder(self.conf, self.results_storage)
+        if self.conf.EXPORT_TO_FOLDER:
+            self.stats_handler.write_stats_to_folder(self.conf, self.results_storage)
+        if self.results_db is not None:
+            self.results_db.save_results(self.get_run_name(), self.results_storage, self.json_handler.graphe)
+
+    def get_run_name(self):
+        # Name of the run in the results store, as the name of its output folder
+        return self.conf.OUTPUT_DIR.name
+
+    # ====================== RESOURCES ESTIMATION ======================
+    @staticmethod
+    def estimate_resources(conf: configuration.Default_configuration, nb_pictures: int, nb_pixels: float):
+        '''
+        Rough peak memory and durations of a full test, to order and pack configurations run in parallel.
+        To overwrite by handlers which keep more than hashes in memory, or with a costlier distance.
+        :param nb_pixels: mean number of pixels of a picture of the dataset
+        :return: memory in bytes, preparation time of the dataset and time of one distance computation, in seconds
+        '''
+        memory = PROCESS_MEMORY + nb_pictures * PICTURE_MEMORY
+        preparation_time = nb_pictures * nb_pixels * DECODING_TIME_PER_PIXEL
+        pair_time = 1e-6
+        return memory, preparation_time, pair_time
+
+    @staticmethod
+    def get_rate(nb_item, elapsed_time):
+        # Items per second, None if too fast to be measured
+        return nb_item / elapsed_time if elapsed_time > 0 else None
 
     @staticmethod
     def print_elapsed_time(elapsed_time, nb_item, to_add=""):
@@ -320,7 +483,20 @@ class Execution_handler():
 
         answer += conf.SOURCE_DIR.name
         answer += final_char + conf.IMG_TYPE.name
-        answer += final_char + conf.ALGO.name
+        answer += final_char + Execution_handler.algo_conf_to_string(conf)
+
+        logger = logging.getLogger(__name__)
+        logger.debug(f"GENERATED configuration name : {answer}")
+
+        return answer
+
+    @staticmethod
+    def algo_conf_to_string(conf: configuration.Default_configuration):
+        # Dataset independant part of the configuration name
+        answer = ""
+        final_char = "_"
+
+        answer += conf.ALGO.name
 
         if conf.SELECTION_THREESHOLD is not None:
             answer += final_char + "THREE_" + str(conf.SELECTION_THREESHOLD)
@@ -343,8 +519,10 @@ class Execution_handler():
             answer += final_char + str(conf.BOW_SIZE)
             answer += final_char + str(conf.BOW_CMP_HIST.name)
 
-        logger = logging.getLogger(__name__)
-        logger.debug(f"GENERATED configuration name : {answer}")
+        if type(conf) == configuration.Cascade_default_configuration:
+            answer += final_char + Execution_handler.algo_conf_to_string(conf.FIRST_STAGE_CONFIGURATION)
+            answer += final_char + "SHORTLIST_" + str(conf.CASCADE_SHORTLIST_SIZE)
+            answer += final_char + Execution_handler.algo_conf_to_string(conf.SECOND_STAGE_CONFIGURATION)
 
         return answer
 
@@ -1,6 +1,8 @@
 # STD LIBRARIES
+import os
 import json
 import pathlib
+import threading
 import random
 from PIL import Image, ImageDraw
 from .picture_class import Picture
@@ -10,10 +12,35 @@ import logging
 import pickle
 import pprint
 import ast
+from . import image_header_lib
+from . import manifest_lib
 
 # PERSONAL LIBRARIES
 TOP_K_EDGE = 1
 
+
+def get_picture_key(path: pathlib.Path):
+    # Same picture file (path, size, modification time), same features : key of pictures in the stores of features
+    path = pathlib.Path(path)
+    stat = path.stat()
+    return f"{path.resolve()}|{stat.st_size}|{stat.st_mtime_ns}"
+
+
+def atomic_write(file_path: pathlib.Path, write_function):
+    '''
+    Write a file aside, then rename it : parallel configurations never read a half written file, and a crash keeps the previous one.
+    :param write_function: writes the content to the path it is given (same suffix as file_path, e.g. for np.save)
+    '''
+    file_path = pathlib.Path(file_path)
+    file_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = file_path.with_name(f"{file_path.stem}.{os.getpid()}.{threading.get_ident()}.tmp{file_path.suffix}")
+    try:
+        write_function(tmp_path)
+        os.replace(tmp_path, file_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+
 class Custom_JSON_Encoder(json.JSONEncoder):
     '''
     Custom JSON Encoder to store Enum and custom configuration objects (for example) of the framework
@@ -62,44 +89,58 @@ class File_System():
     def random_choice(self, target_dir):
         target_dir = self.safe_path(target_dir)
 
-        pathlist = target_dir.glob('**/*' + self.type)
-        target_picture_path = random.choice(list(pathlist))
+        picture_list = self.get_manifest(target_dir).get_pictures(self.conf.IMG_TYPE)
+        target_picture_path = random.choice(picture_list)[1]
 
         return target_picture_path
 
     def get_Pictures_from_directory(self, directory_path, class_name=Picture):
         directory_path = self.safe_path(directory_path)
 
-        pathlist = directory_path.glob('**/*' + self.type)
+        # Ids of the manifest : the same from one run to the other
         picture_list = []
-
-        for i, path in enumerate(pathlist):
-            tmp_Picture = class_name(id=i, conf=self.conf, path=path)
+        for id, path, _ in self.get_manifest(directory_path).get_pictures(self.conf.IMG_TYPE):
+            tmp_Picture = class_name(id=id, conf=self.conf, path=path)
 
             # Store hash
             picture_list.append(tmp_Picture)
 
         return picture_list
 
+    def get_manifest(self, directory_path, refresh: bool = False):
+        # Manifest of the source folder at the configured path, or in the output folder. Other folders : in memory only
+        is_source_dir = self.conf.SOURCE_DIR is not None and pathlib.Path(directory_path).resolve() == pathlib.Path(self.conf.SOURCE_DIR).resolve()
+        manifest_path = None
+        if is_source_dir and self.conf.MANIFEST_PATH is not None:
+            manifest_path = self.conf.MANIFEST_PATH
+        elif is_source_dir and self.conf.OUTPUT_DIR is not None:
+            manifest_path = manifest_lib.get_default_manifest_path(directory_path, self.conf.OUTPUT_DIR)
+        return manifest_lib.Dataset_manifest.get_manifest(directory_path, manifest_path=manifest_path, refresh=refresh)
+
     # ==== Disk write ====
 
-    def clean_folder(self, target_dir):
+    def clean_folder(self, target_dir, manifest_path: pathlib.Path = None):
         '''
-        Remove 0-bytes size files
-        :param target_dir:
-        :return:
+        Refresh the manifest of the folder, remove 0-bytes size files, and log pictures without readable header or pixels (not removed).
+        Only new or modified files are read (see manifest_lib), and pixels are not decoded.
+        :param manifest_path: where the manifest is kept between runs, None for no manifest file
+        :return: list of void pictures paths
         '''
+        manifest = manifest_lib.Dataset_manifest(target_dir, manifest_path=manifest_path)
+        manifest.refresh()
 
-        pathlist = pathlib.Path(target_dir).glob('**/*' + self.type)
-        for i, path in enumerate(pathlist):
-
-            if path.stat().st_size == 0:
+        void_path_list = []
+        for id, path, entry in manifest.get_pictures(self.conf.IMG_TYPE):
+            if entry["size"] == 0:
                 path.unlink()
-            curr_pic = cv2.imread(str(path))
-
-            if curr_pic is None or curr_pic.shape == [] or curr_pic.shape[0] == 0 or curr_pic.shape[1] == 0:
+                manifest.remove(path)
+                logging.error(f"Void picture deleted : {path}")
+            elif image_header_lib.is_void((entry["format"], entry["width"], entry["height"]) if entry["format"] is not None else None):
                 logging.error(f"Void picture (to delete ?) : {path}")
-                # path.unlink()
+                void_path_list.append(path)
+
+        manifest.save()
+        return void_path_list
 
 
     @staticmethod
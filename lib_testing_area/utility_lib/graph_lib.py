@@ -4,14 +4,22 @@ import matplotlib
 import pathlib
 import logging
 import json
+import csv
+import multiprocessing
+from typing import List
 from shutil import copyfile
 
 import utility_lib.json_class as json_class
 import utility_lib.stats_lib as stats_lib
 import utility_lib.filesystem_lib as filesystem_lib
+import utility_lib.results_db as results_db
 import configuration
 import results
 
+# Columns of the table of pairs of results
+PAIR_TABLE_FIELDS = ["name", "source", "compared_to", "TRUE_POSITIVE_RATE",
+                     "TIME_PER_PICTURE_PRE_COMPUTING", "TIME_PER_PICTURE_MATCHING", "TIME_TO_LOAD_PICTURES", "NB_PICTURE"]
+
 ''' Example of values : 
 vegetables = ["cucumber", "tomato", "lettuce", "asparagus",
               "potato", "wheat", "barley"]
@@ -218,12 +226,16 @@ class Graph_handler():
     #                                   Graphe operation
 
     @staticmethod
-    def get_graph_list(folder: pathlib.Path):
+    def get_graph_list(folder: pathlib.Path, db_path: pathlib.Path = None):
         '''
         Store in an array all the output graphes of the algorithms
         :param folder:
+        :param db_path: results store to read the graphes from instead of the folder (see results_db.Results_DB)
         :return:
         '''
+        if db_path is not None:
+            return results_db.Results_DB(db_path).get_graph_list()
+
         graphe_list = []
 
         # For all graphe
@@ -265,46 +277,93 @@ class Graph_handler():
         return graphe_list
 
     @staticmethod
-    def create_inclusion_matrix(folder: pathlib.Path):
+    def create_inclusion_matrix(folder: pathlib.Path, nb_processes: int = 1, db_path: pathlib.Path = None):
         '''
         Create a inclusion (or kind of "similarity") matrix out of a folder with results from algorithms.
         :param folder:
+        :param nb_processes: number of processes to compute the inclusions with (1 = no parallelism)
         :return:
         '''
-        # TODO : safe path in case it's not a Pathlib : is it necessary ?
-        # folder = filesystem_lib.File_System.safe_path(folder)
-        # output_folder = filesystem_lib.File_System.safe_path(output_folder)
+        names, values = Graph_handler.create_inclusion_array(folder, nb_processes=nb_processes, db_path=db_path)
+        return Graph_handler.array_to_inclusion_matrix(names, values)
+
+    @staticmethod
+    def create_inclusion_array(folder: pathlib.Path, nb_processes: int = 1, db_path: pathlib.Path = None):
+        '''
+        Create the inclusion matrix of a folder with results from algorithms, as a NumPy array.
+        values[a][b] is the share of edges of graphe a that are edges of graphe b (card(inclusion)/card(source))
+        :param folder:
+        :param nb_processes: number of processes to compute the inclusions with (1 = no parallelism)
+        :param db_path: results store to read the graphes from instead of the folder
+        :return: names of the graphes (alphabetical order, then by length), values as a (nb_graphes, nb_graphes) array
+        '''
         logger = logging.getLogger(__name__)
         logger.info(f"Creating inclusion matrix for {folder}")
 
-        graphe_list = Graph_handler.get_graph_list(folder)
+        graphe_list = Graph_handler.get_graph_list(folder, db_path=db_path)
 
-        # For all graphe A
-        global_result = []
-        for curr_graphe_a in graphe_list:
-            logger.debug(f"Checking graphe {curr_graphe_a['name']} ...")
+        # Alphabetical order
+        graphe_list = sorted(graphe_list, key=lambda l: l["name"])  # Sort by alphabetical order
+        graphe_list = sorted(graphe_list, key=lambda l: len(l["name"]))  # And then by length
+
+        # Each graphe is encoded once, with a node numbering shared by all graphes
+        edge_keys_list = Graph_handler.encode_graphe_edges([curr_graphe['graphe'] for curr_graphe in graphe_list])
+        # Edges with a missing node (-1) are never included
+        unique_keys_list = [np.unique(curr_keys[curr_keys >= 0]) for curr_keys in edge_keys_list]
+
+        # For all graphe A, inclusion in each other graphe B
+        if nb_processes > 1:
+            # Compared graphes are sent once to each process, not once per row
+            with multiprocessing.Pool(processes=nb_processes, initializer=init_inclusion_worker, initargs=(unique_keys_list,)) as pool:
+                values = pool.map(compute_inclusion_row, edge_keys_list)
+        else:
+            values = [compute_inclusion_row(curr_keys, unique_keys_list) for curr_keys in edge_keys_list]
 
-            tmp_result_graph_a = {}
-            tmp_result_graph_a["source"] = curr_graphe_a['name']
+        return [curr_graphe['name'] for curr_graphe in graphe_list], np.array(values, dtype=np.float64).reshape(len(graphe_list), len(graphe_list))
 
-            tmp_result_graph_b = []
-            # For all graphe B
-            for curr_graphe_b in graphe_list:
-                logger.debug(f"Checking graphe {curr_graphe_a['name']} with {curr_graphe_b['name']}")
+    @staticmethod
+    def encode_graphe_edges(graphe_list):
+        '''
+        Encode the edges of each graphe as an array of integer keys, one per edge (from * nb_nodes + to).
+        Nodes are numbered by picture name, the same way for all graphes : equal keys are equal edges.
+        Edges with a node missing from their graphe get a -1 key, which is never included.
+        :param graphe_list: list of Graphe
+        :return: list of int64 arrays, one per graphe, in the order of the graphe edges
+        '''
+        shared_ids = {}
+        for curr_graphe in graphe_list:
+            for curr_node in curr_graphe.nodes:
+                shared_ids.setdefault(curr_node["image"], len(shared_ids))
+        nb_nodes = max(len(shared_ids), 1)
+
+        edge_keys_list = []
+        for curr_graphe in graphe_list:
+            # Node id in this graphe to shared node number
+            local_ids = {curr_node["id"]: shared_ids[curr_node["image"]] for curr_node in curr_graphe.nodes}
+
+            from_ids = np.array([local_ids.get(curr_edge["from"], -1) for curr_edge in curr_graphe.edges], dtype=np.int64)
+            to_ids = np.array([local_ids.get(curr_edge["to"], -1) for curr_edge in curr_graphe.edges], dtype=np.int64)
 
-                # Evaluate each graphe A inclusion to each other graphe B
-                tmp_mapping_dict = json_class.create_node_mapping(curr_graphe_a['graphe'], curr_graphe_b['graphe'])
-                wrong_edge_list = json_class.is_graphe_included(curr_graphe_a['graphe'], tmp_mapping_dict, curr_graphe_b['graphe'])
+            edge_keys = from_ids * nb_nodes + to_ids
+            edge_keys[(from_ids < 0) | (to_ids < 0)] = -1
+            edge_keys_list.append(edge_keys)
 
-                # Compute similarity based on inclusion (card(inclusion)/card(source))
-                nb_edges = len(curr_graphe_a['graphe'].edges)
-                curr_similarity = 1 - (len(wrong_edge_list) / nb_edges)
+        return edge_keys_list
+
+    @staticmethod
+    def array_to_inclusion_matrix(names, values):
+        '''
+        Convert an inclusion array to the standard format (source/similar_to/compared_to/similarity)
+        :param names: names of the graphes, in the order of the array
+        :param values: inclusion array
+        :return:
+        '''
+        global_result = []
+        for i, curr_name in enumerate(names):
+            tmp_result_graph_a = {}
+            tmp_result_graph_a["source"] = curr_name
 
-                # Store the similarity in an array
-                tmp_dict = {}
-                tmp_dict["compared_to"] = curr_graphe_b["name"]
-                tmp_dict["similarity"] = curr_similarity
-                tmp_result_graph_b.append(tmp_dict)
+            tmp_result_graph_b = [{"compared_to": names[j], "similarity": float(values[i][j])} for j in range(len(names))]
 
             # Store the similarity array as json
             # TODO : worth to sort it ? Would impact next computation
@@ -312,14 +371,10 @@ class Graph_handler():
             tmp_result_graph_a["similar_to"] = tmp_result_graph_b
             global_result.append(tmp_result_graph_a)
 
-        # Alphabetical order
-        global_result = sorted(global_result, key=lambda l: l["source"])  # Sort by alphabetical order
-        global_result = sorted(global_result, key=lambda l: len(l["source"]))  # And then by length
-
         return global_result
 
     @staticmethod
-    def create_pair_matrix(folder: pathlib.Path, ground_truth_json: pathlib.Path):
+    def create_pair_matrix(folder: pathlib.Path, ground_truth_json: pathlib.Path, db_path: pathlib.Path = None):
         '''
         Create a quality matrix out of a folder with results from algorithms, by pairing result one-to-one.
         :param folder:
@@ -331,53 +386,161 @@ class Graph_handler():
         logger = logging.getLogger(__name__)
         logger.info(f"Creating pair matrix for {folder}")
 
-        graphe_list = Graph_handler.get_graph_list(folder)
+        graphe_list = Graph_handler.get_graph_list(folder, db_path=db_path)
+        ground_truth_graphe = Graph_handler.load_ground_truth(ground_truth_json)
+
+        # Pairs are given graphe A by graphe A
+        global_result = []
+        tmp_result_graph_a = None
+        for curr_pair in Graph_handler.iterate_pair_results(graphe_list, ground_truth_graphe):
+            if tmp_result_graph_a is None or tmp_result_graph_a["source"] != curr_pair["source"]:
+                tmp_result_graph_a = {"source": curr_pair["source"], "similar_to": []}
+                global_result.append(tmp_result_graph_a)
+
+            # Store the similarity in an array
+            tmp_result_graph_a["similar_to"].append({"compared_to": curr_pair["compared_to"], "similarity": curr_pair["TRUE_POSITIVE_RATE"]})
+
+        # Store the similarity array as json
+        # TODO : worth to sort it ? Would impact next computation
+        for tmp_result_graph_a in global_result:
+            tmp_result_graph_a["similar_to"] = sorted(tmp_result_graph_a["similar_to"], key=lambda l: l["similarity"], reverse=True)
+
+        # Alphabetical order
+        global_result = sorted(global_result, key=lambda l: l["source"])  # Sort by alphabetical order
+        global_result = sorted(global_result, key=lambda l: len(l["source"]))  # And then by length
+
+        return global_result
+
+    # ============================== --------------------------------  ==============================
+    #                                       Pairs of results
 
+    @staticmethod
+    def load_ground_truth(ground_truth_json: pathlib.Path):
         # Get grund_truth graphe
         ground_truth_graphe = Graphe()
         ground_truth_json_values = json_class.Json_handler.import_json(ground_truth_json.resolve())
         ground_truth_graphe.load_from_json(ground_truth_json_values)
+        return ground_truth_graphe
 
-        # For all graphe A
-        global_result = []
-        for curr_graphe_a in graphe_list:
-            logger.debug(f"Loading graphe {curr_graphe_a['name']} ...")
+    @staticmethod
+    def get_pair_name(graphe_a_name: str, graphe_b_name: str):
+        return graphe_a_name + "_AND_" + graphe_b_name
 
-            tmp_result_graph_a = {}
-            tmp_result_graph_a["source"] = curr_graphe_a['name']
+    @staticmethod
+    def count_correct_edges(graphe_list, ground_truth_graphe):
+        '''
+        Count the edges of each graphe that are edges of the ground truth graphe
+        :param graphe_list: list of Graphe
+        :param ground_truth_graphe:
+        :return: list of (number of correct edges, number of edges), one per graphe
+        '''
+        edge_keys_list = Graph_handler.encode_graphe_edges([ground_truth_graphe] + graphe_list)
+        ground_truth_keys = np.unique(edge_keys_list[0][edge_keys_list[0] >= 0])
 
-            tmp_result_graph_b = []
-            # For all graphe B
-            for curr_graphe_b in graphe_list:
-                logger.debug(f"Merging graphe {curr_graphe_a['name']} with {curr_graphe_b['name']}")
+        return [(int(np.count_nonzero(np.isin(curr_keys, ground_truth_keys))), len(curr_keys)) for curr_keys in edge_keys_list[1:]]
+
+    @staticmethod
+    def merge_pair_stats(stats_a, stats_b):
+        '''
+        Stats of a pair of results : times of both algorithms are summed
+        :return: RESULTS, or None if stats of a result are missing
+        '''
+        if stats_a is None or stats_b is None:
+            return None
 
-                # Merging
-                merged_graphe = json_class.merge_graphes(curr_graphe_a['graphe'], curr_graphe_b['graphe'])
+        # Generate merged stats
+        tmp_results = results.RESULTS()
+        tmp_results.TIME_PER_PICTURE_MATCHING = stats_a["TIME_PER_PICTURE_MATCHING"] + stats_b["TIME_PER_PICTURE_MATCHING"]
+        tmp_results.TIME_PER_PICTURE_PRE_COMPUTING = stats_a["TIME_PER_PICTURE_PRE_COMPUTING"] + stats_b["TIME_PER_PICTURE_PRE_COMPUTING"]
+        tmp_results.TIME_TO_LOAD_PICTURES = stats_a["TIME_TO_LOAD_PICTURES"] + stats_b["TIME_TO_LOAD_PICTURES"]
+        tmp_results.NB_PICTURE = max(stats_a["NB_PICTURE"], stats_b["NB_PICTURE"])
 
-                # Evaluating
-                true_positive_rate = json_class.matching_graphe_percentage(merged_graphe, ground_truth_graphe)
+        return tmp_results
 
-                # Store the similarity in an array
-                tmp_dict = {}
-                tmp_dict["compared_to"] = curr_graphe_b['name']
-                tmp_dict["similarity"] = true_positive_rate
-                tmp_result_graph_b.append(tmp_dict)
+    @staticmethod
+    def iterate_pair_results(graphe_list, ground_truth_graphe):
+        '''
+        Evaluate all ordered pairs of results in memory, without building merged graphes.
+        A merged graphe holds the edges of both graphes : its true positive rate only depends on the correct edges count of each graphe.
+        :param graphe_list: output of get_graph_list
+        :param ground_truth_graphe:
+        :return: generator of dict (see PAIR_TABLE_FIELDS), graphe A by graphe A
+        '''
+        logger = logging.getLogger(__name__)
 
-            # Store the similarity array as json
-            # TODO : worth to sort it ? Would impact next computation
-            tmp_result_graph_b = sorted(tmp_result_graph_b, key=lambda l: l["similarity"], reverse=True)
-            tmp_result_graph_a["similar_to"] = tmp_result_graph_b
-            global_result.append(tmp_result_graph_a)
+        # Each graphe is evaluated once
+        edges_count_list = Graph_handler.count_correct_edges([curr_graphe['graphe'] for curr_graphe in graphe_list], ground_truth_graphe)
 
-        # Alphabetical order
-        global_result = sorted(global_result, key=lambda l: l["source"])  # Sort by alphabetical order
-        global_result = sorted(global_result, key=lambda l: len(l["source"]))  # And then by length
+        # For all pair of graphes
+        for curr_graphe_a, (nb_correct_a, nb_edges_a) in zip(graphe_list, edges_count_list):
+            logger.debug(f"Evaluating pairs of graphe {curr_graphe_a['name']} ...")
 
-        return global_result
+            for curr_graphe_b, (nb_correct_b, nb_edges_b) in zip(graphe_list, edges_count_list):
+                nb_edges = nb_edges_a + nb_edges_b
+                nb_wrong = nb_edges - nb_correct_a - nb_correct_b
+
+                # Prevent 0-division
+                true_positive_rate = 1 if nb_edges == 0 else 1 - nb_wrong / nb_edges
+
+                tmp_row = dict.fromkeys(PAIR_TABLE_FIELDS)
+                tmp_row["name"] = Graph_handler.get_pair_name(curr_graphe_a['name'], curr_graphe_b['name'])
+                tmp_row["source"] = curr_graphe_a['name']
+                tmp_row["compared_to"] = curr_graphe_b['name']
+                tmp_row["TRUE_POSITIVE_RATE"] = true_positive_rate
+
+                tmp_results = Graph_handler.merge_pair_stats(curr_graphe_a['stats'], curr_graphe_b['stats'])
+                if tmp_results is not None:
+                    for curr_field in PAIR_TABLE_FIELDS[4:]:
+                        tmp_row[curr_field] = getattr(tmp_results, curr_field)
+
+                yield tmp_row
+
+    @staticmethod
+    def evaluate_pairs_to_table(input_folder: pathlib.Path, ground_truth_json: pathlib.Path, output_table: pathlib.Path, db_path: pathlib.Path = None):
+        '''
+        Evaluate all pairs of results of a folder, and stream them as rows of one csv table
+        :return: number of pairs written
+        '''
+        logger = logging.getLogger(__name__)
+        logger.info(f"Evaluating pairs of results of {input_folder} into {output_table}")
+
+        graphe_list = Graph_handler.get_graph_list(input_folder, db_path=db_path)
+        ground_truth_graphe = Graph_handler.load_ground_truth(ground_truth_json)
+
+        nb_pairs = 0
+        with open(str(output_table.resolve()), "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=PAIR_TABLE_FIELDS)
+            writer.writeheader()
+
+            for curr_pair in Graph_handler.iterate_pair_results(graphe_list, ground_truth_graphe):
+                writer.writerow(curr_pair)
+                nb_pairs += 1
+
+        logger.info(f"{nb_pairs} pairs evaluated")
+        return nb_pairs
 
     @staticmethod
-    def generate_merged_pairs(input_folder: pathlib.Path, target_pair_folder: pathlib.Path):
-        graphe_list = Graph_handler.get_graph_list(input_folder)
+    def load_pair_table(table_file: pathlib.Path):
+        '''
+        Load the rows of a pair table. Empty values are None, numbers are converted back.
+        '''
+        rows = []
+        with open(str(table_file.resolve()), newline="") as f:
+            for curr_row in csv.DictReader(f):
+                for curr_field in PAIR_TABLE_FIELDS[3:]:
+                    curr_row[curr_field] = float(curr_row[curr_field]) if curr_row[curr_field] != "" else None
+                rows.append(curr_row)
+
+        return rows
+
+    @staticmethod
+    def generate_merged_pairs(input_folder: pathlib.Path, target_pair_folder: pathlib.Path, shortlist: List[str], db_path: pathlib.Path = None):
+        '''
+        Write merged graphes, stats and configurations of a shortlist of pairs, as results folders
+        :param shortlist: names of the pairs to write (see get_pair_name)
+        :param db_path: results store to read the results from instead of the input folder
+        '''
+        graphe_list = Graph_handler.get_graph_list(input_folder, db_path=db_path)
 
         logger = logging.getLogger(__name__)
         logger.info(f"Creating merged graphs for {input_folder} in {target_pair_folder}")
@@ -385,10 +548,17 @@ class Graph_handler():
         tmp_conf = configuration.Default_configuration()
         tmp_stats = stats_lib.Stats_handler(conf=tmp_conf)
 
+        shortlist = set(shortlist)
+
         # For all pair of graphes
         for curr_graphe_a in graphe_list:
             for curr_graphe_b in graphe_list:
 
+                # Generate name
+                new_name = Graph_handler.get_pair_name(curr_graphe_a["name"], curr_graphe_b['name'])
+                if new_name not in shortlist:
+                    continue
+
                 # Merge
                 tmp_graphe_1 = Graphe()
                 tmp_graphe_1.load_from_json(curr_graphe_a['graphe'])
@@ -397,9 +567,6 @@ class Graph_handler():
 
                 merged_graphe = json_class.merge_graphes(tmp_graphe_1, tmp_graphe_2)
 
-                # Generate name
-                new_name = curr_graphe_a["name"] + "_AND_" + curr_graphe_b['name']
-
                 # Create folder
                 future_folder_path = target_pair_folder / new_name
                 future_folder_path.mkdir(parents=True, exist_ok=True)
@@ -407,13 +574,7 @@ class Graph_handler():
                 tmp_file_path = future_folder_path / "graphe.py"
 
                 # Generate merged stats
-                tmp_results = results.RESULTS()
-                tmp_results.TIME_PER_PICTURE_MATCHING = curr_graphe_a['stats']["TIME_PER_PICTURE_MATCHING"] + curr_graphe_b['stats']["TIME_PER_PICTURE_MATCHING"]
-
-                tmp_results.TIME_PER_PICTURE_PRE_COMPUTING = curr_graphe_a['stats']["TIME_PER_PICTURE_PRE_COMPUTING"] + curr_graphe_b['stats']["TIME_PER_PICTURE_PRE_COMPUTING"]
-
-                tmp_results.TIME_TO_LOAD_PICTURES = curr_graphe_a['stats']["TIME_TO_LOAD_PICTURES"] + curr_graphe_b['stats']["TIME_TO_LOAD_PICTURES"]
-                tmp_results.NB_PICTURE = max(curr_graphe_a['stats']["NB_PICTURE"], curr_graphe_b['stats']["NB_PICTURE"])
+                tmp_results = Graph_handler.merge_pair_stats(curr_graphe_a['stats'], curr_graphe_b['stats'])
 
                 # define where to write the stats
                 tmp_conf.OUTPUT_DIR = future_folder_path
@@ -429,8 +590,12 @@ class Graph_handler():
                 '''
 
                 # Copy the conf file
-                copyfile(input_folder / curr_graphe_a['name'] / "conf.txt", future_folder_path / "conf_1.txt")
-                copyfile(input_folder / curr_graphe_b['name'] / "conf.txt", future_folder_path / "conf_2.txt")
+                if db_path is None:
+                    copyfile(input_folder / curr_graphe_a['name'] / "conf.txt", future_folder_path / "conf_1.txt")
+                    copyfile(input_folder / curr_graphe_b['name'] / "conf.txt", future_folder_path / "conf_2.txt")
+                else:
+                    filesystem_lib.File_System.save_json(curr_graphe_a['conf'], file_path=future_folder_path / "conf_1.txt")
+                    filesystem_lib.File_System.save_json(curr_graphe_b['conf'], file_path=future_folder_path / "conf_2.txt")
 
     @staticmethod
     def evaluate_graphs(target_pair_folder: pathlib.Path, ground_truth_json: pathlib.Path):
@@ -453,7 +618,7 @@ class Graph_handler():
             true_positive_rate = json_class.matching_graphe_percentage(curr_graphe_a['graphe'], ground_truth_graphe)
 
             # define the results
-            tmp_results = curr_graphe_a['stats']
+            tmp_results = curr_graphe_a['stats'] if curr_graphe_a['stats'] is not None else {}
             tmp_results["TRUE_POSITIVE_RATE"] = true_positive_rate
 
             # define where to write the stats
@@ -510,3 +675,37 @@ class Graph_handler():
                 return x
         else:
             return None
+
+
+# Compared graphes of the inclusion matrix, in each process of the pool
+worker_unique_keys_list = None
+
+
+def init_inclusion_worker(unique_keys_list):
+    global worker_unique_keys_list
+    worker_unique_keys_list = unique_keys_list
+
+
+def compute_inclusion_row(edge_keys, unique_keys_list=None):
+    '''
+    Inclusion of one graphe in each graphe (module level, to be usable by a multiprocessing pool)
+    :param edge_keys: edge keys of the source graphe (see Graph_handler.encode_graphe_edges)
+    :param unique_keys_list: sorted unique edge keys of each compared graphe. Those given to the process if None.
+    :return: list of similarities, one per compared graphe
+    '''
+    if unique_keys_list is None:
+        unique_keys_list = worker_unique_keys_list
+
+    nb_edges = len(edge_keys)
+
+    row = []
+    for curr_unique_keys in unique_keys_list:
+        # Prevent 0-division
+        if nb_edges == 0:
+            row.append(1)
+            continue
+
+        nb_wrong = nb_edges - int(np.count_nonzero(np.isin(edge_keys, curr_unique_keys)))
+        row.append(1 - (nb_wrong / nb_edges))
+
+    return row
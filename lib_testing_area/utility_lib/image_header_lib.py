@@ -0,0 +1,39 @@
+import struct
+import pathlib
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+BMP_SIGNATURE = b"BM"
+HEADER_SIZE = 26 # Enough for the PNG IHDR chunk and the BMP info header dimensions
+
+
+def read_header(path: pathlib.Path):
+    '''
+    Format and dimensions of a picture, from its first bytes only (PNG IHDR chunk, BMP file and info headers).
+    The content is recognized whatever the extension, as cv2.imread does. Pixels are not decoded : a truncated body is not detected.
+    :return: (format, width, height), None if the file is not a readable PNG or BMP
+    '''
+    try:
+        with open(path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+    except OSError:
+        return None
+
+    if header.startswith(PNG_SIGNATURE) and len(header) >= 24 and header[12:16] == b"IHDR":
+        width, height = struct.unpack(">II", header[16:24])
+        return "PNG", width, height
+
+    if header.startswith(BMP_SIGNATURE) and len(header) >= 26:
+        info_header_size = struct.unpack("<I", header[14:18])[0]
+        if info_header_size == 12: # OS/2 BITMAPCOREHEADER
+            width, height = struct.unpack("<HH", header[18:22])
+        else:
+            width, height = struct.unpack("<ii", header[18:26])
+        # Negative height : rows stored top-down
+        return "BMP", width, abs(height)
+
+    return None
+
+
+def is_void(header):
+    # Unreadable header, or no pixel
+    return header is None or header[1] == 0 or header[2] == 0
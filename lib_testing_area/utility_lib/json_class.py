@@ -9,6 +9,7 @@ import results
 import utility_lib.filesystem_lib as filesystem_lib
 import utility_lib.graph_lib as graph_lib
 import matplotlib.pyplot as plt
+import numpy as np
 
 TOP_K_EDGE = 1
 MULT_FACTOR_VALUE = 10  # See : http://visjs.org/docs/network/edges.html (Min 1, MAX 15 so min 0, max 10)
@@ -20,6 +21,9 @@ class Json_handler():
         self.graphe = graph_lib.Graphe()
         self.quality = None
 
+        # Filled during evaluation : true positive rate after pruning edges, for each threshold (threshold, rate)
+        self.threshold_curve = None
+
     # =========================== -------------------------- ===========================
     #                                   IMPORT / EXPORT
     @staticmethod
@@ -34,8 +38,15 @@ class Json_handler():
         return json_imported
 
     def json_export(self):
-        file_out = self.conf.OUTPUT_DIR / "graphe.py"
-        filesystem_lib.File_System.save_json(self.graphe, file_path=file_out)
+        if self.conf.EXPORT_TO_FOLDER:
+            file_out = self.conf.OUTPUT_DIR / "graphe.py"
+            filesystem_lib.File_System.save_json(self.graphe, file_path=file_out)
+
+            if self.threshold_curve is not None and len(self.threshold_curve) > 0:
+                np.save(str((self.conf.OUTPUT_DIR / "threshold_curve.npy").resolve()), self.threshold_curve)
+                # Only the mode searching the best threshold along the curve draws it
+                if self.conf.THREESHOLD_EVALUATION == configuration.THRESHOLD_MODE.MAXIMIZE_TRUE_POSITIVE:
+                    self.save_threshold_curve(self.threshold_curve, self.conf.OUTPUT_DIR / "threshold.png")
         '''
         with open(pathlib.Path(file_out), 'w') as outfile:
         json.dump(self.json_to_export, outfile)
@@ -92,7 +103,7 @@ class Json_handler():
 
         # Evaluated
         results.TRUE_POSITIVE_RATE = matching_graphe_percentage(self.graphe, imported_graphe)
-        results.COMPUTED_THREESHOLD = self.find_threeshold(self.graphe, mapping_dict, imported_graphe)
+        results.COMPUTED_THREESHOLD = self.find_threeshold(self.graphe, mapping_dict, imported_graphe, results)
 
         # TODO : Review following function. Does not operate as they should ?
         threesholded_graphe = self.get_thresholded_graphe(self.graphe,results.COMPUTED_THREESHOLD)
@@ -100,53 +111,74 @@ class Json_handler():
 
         return self, results
 
-    def find_threeshold(self, candidate_graphe, mapping_dict, ground_truth_graphe):
+    def find_threeshold(self, candidate_graphe, mapping_dict, ground_truth_graphe, results: results.RESULTS = None):
 
         wrong_edges = is_graphe_included(candidate_graphe, mapping_dict, ground_truth_graphe)
-        wrong_edges = sorted(wrong_edges, key=lambda x: x["title"])
+        threshold_per_mode, self.threshold_curve = self.find_all_threesholds(candidate_graphe.edges, wrong_edges)
+
+        if results is not None:
+            results.COMPUTED_THREESHOLD_PER_MODE = {mode.name: threshold for mode, threshold in threshold_per_mode.items()}
 
         mode = self.conf.THREESHOLD_EVALUATION
 
-        if mode == configuration.THRESHOLD_MODE.MIN_WRONG :
-            # MIN :
-            threshold = wrong_edges[0]["title"]
-        elif mode == configuration.THRESHOLD_MODE.MAX_WRONG :
-            # MAX :
-            threshold = wrong_edges[len(wrong_edges)-1]["title"]
-        elif mode == configuration.THRESHOLD_MODE.MEDIAN_WRONG :
-            # Median :
-            threshold = wrong_edges[len(wrong_edges)//2]["title"]
-        elif mode == configuration.THRESHOLD_MODE.MAXIMIZE_TRUE_POSITIVE :
-            threshold = self.find_best_threeshold(candidate_graphe.edges, mapping_dict, wrong_edges, self.conf.OUTPUT_DIR / "threshold.png")
-        else :
+        if mode not in threshold_per_mode :
             raise Exception("Incorrect mode for threshold finder.")
+        if threshold_per_mode[mode] is None :
+            raise Exception(f"No threshold can be computed for mode {mode.name} : not enough edges in the candidate graphe.")
 
-        return threshold
+        return threshold_per_mode[mode]
 
+    @staticmethod
+    def find_all_threesholds(edge_list, wrong_edge_list):
+        '''
+        Compute the threshold of each THRESHOLD_MODE, in one pass over the edges sorted by distance.
+        :return: {THRESHOLD_MODE : threshold (None if no edge to choose from)}, curve as a (nb_edges, 2) array of (threshold, true positive rate)
+        '''
+        threshold_per_mode = {}
+
+        # Wrong edges modes
+        wrong_titles = sorted(curr_edge["title"] for curr_edge in wrong_edge_list)
+        has_wrong = len(wrong_titles) > 0
+        threshold_per_mode[configuration.THRESHOLD_MODE.MIN_WRONG] = wrong_titles[0] if has_wrong else None
+        threshold_per_mode[configuration.THRESHOLD_MODE.MAX_WRONG] = wrong_titles[-1] if has_wrong else None
+        threshold_per_mode[configuration.THRESHOLD_MODE.MEDIAN_WRONG] = wrong_titles[len(wrong_titles)//2] if has_wrong else None
+
+        # True positive curve
+        threshold_list, score_list = Json_handler.compute_threshold_curve(edge_list, wrong_edge_list)
+        if len(score_list) > 0 :
+            threshold_per_mode[configuration.THRESHOLD_MODE.MAXIMIZE_TRUE_POSITIVE] = float(threshold_list[np.argmax(score_list)])
+        else :
+            threshold_per_mode[configuration.THRESHOLD_MODE.MAXIMIZE_TRUE_POSITIVE] = None
 
-    def find_best_threeshold(self, edge_list, mapping_dict, wrong_edge_list, output_graphe: pathlib.Path):
-        total_edge_list = edge_list.copy()
-        sorted_edge_list = sorted(edge_list, key=lambda x: x["title"], reverse=True)
+        return threshold_per_mode, np.stack([threshold_list, score_list], axis=1)
 
-        wrong_length = len(wrong_edge_list)
-        edges_length = len(sorted_edge_list)  +1
+    @staticmethod
+    def compute_threshold_curve(edge_list, wrong_edge_list):
+        '''
+        Simulate the removal of each edge, sorted by "bad to good", and give the true positive rate of the remaining edges.
+        Score at index i is computed with the threshold at the distance of edge i : wrong edges left once edges 0..i are removed,
+        over the len - i edges with a distance lower or equal to it.
+        :param wrong_edge_list: edges of edge_list not found in the ground truth (see is_graphe_included)
+        :return: thresholds array, true positive rates array
+        '''
+        # Wrong edges are the edges objects of edge_list themselves
+        wrong_edge_ids = {id(curr_bad_edge) for curr_bad_edge in wrong_edge_list}
+        wrong_flags = np.array([id(curr_edge) in wrong_edge_ids for curr_edge in edge_list], dtype=np.int64)
+        titles = np.array([curr_edge["title"] for curr_edge in edge_list], dtype=np.float64)
 
-        threshold_list = []
-        score_list = []
-        # We simulate the removal of each edge, sorted by "bad to good"
-        for curr_edge in sorted_edge_list :
-            # Check if it's a bad edge
-            for curr_bad_edge in wrong_edge_list :
-                if are_same_edge(curr_edge, mapping_dict, curr_bad_edge):
-                    total_edge_list.append([curr_edge, "bad"])
-                    wrong_length -= 1
+        # Sorted by decreasing distance. Stable, as sorted(..., reverse=True) : equal distances keep their order.
+        order = np.argsort(-titles, kind="stable")
+        threshold_list = titles[order]
+        wrong_length = len(wrong_edge_list) - np.cumsum(wrong_flags[order])
+        edges_length = len(edge_list) - np.arange(len(edge_list))
+        score_list = 1 - (wrong_length / edges_length)
 
-            edges_length -= 1
-            score_list.append(1 - (wrong_length/edges_length))
-            threshold_list.append(curr_edge["title"])
+        return threshold_list, score_list
 
+    @staticmethod
+    def save_threshold_curve(threshold_curve, output_graphe: pathlib.Path):
         # order :  X followed by Y
-        plt.plot(threshold_list, score_list)
+        plt.plot(threshold_curve[:, 0], threshold_curve[:, 1])
         plt.legend(('True-positive'), loc='upper right')
         plt.xlabel("Distance threshold applied to prune edges (arbitrary distance unit)")
         plt.ylabel("True-Positive score with the given threshold \n(% true positive within original edges)")
@@ -157,9 +189,6 @@ class Json_handler():
         plt.cla()
         plt.close()
 
-        return sorted_edge_list[score_list.index(max(score_list))]["title"]
-
-
     def get_thresholded_graphe(self, candidate_graphe, threshold):
         modified_graphe = graph_lib.Graphe()
         modified_graphe.nodes = candidate_graphe.nodes
@@ -236,16 +265,13 @@ def create_node_mapping(candidate_graphe, ground_truth_graphe):
     '''
     mapping_dict = {}
 
-    candidate_nodes = candidate_graphe.nodes
-    ground_truth_nodes = ground_truth_graphe.nodes
+    # Picture name to node id in the ground truth. If a name is present twice, the last node is kept.
+    ground_truth_ids = {candidate_picture["image"]: candidate_picture["id"] for candidate_picture in ground_truth_graphe.nodes}
 
     # For all pictures of the output, give the matching picture in the ground truth dictionnary
-    for curr_picture in candidate_nodes:
-        for candidate_picture in ground_truth_nodes:
-
-            if curr_picture["image"] == candidate_picture["image"]:
-                mapping_dict[curr_picture['id']] = candidate_picture["id"]  # .append(curr_picture.to_node_json_object())
-                continue
+    for curr_picture in candidate_graphe.nodes:
+        if curr_picture["image"] in ground_truth_ids:
+            mapping_dict[curr_picture['id']] = ground_truth_ids[curr_picture["image"]]
 
     return mapping_dict
 
@@ -259,27 +285,42 @@ def is_graphe_included(candidate_graphe , mapping_dict, ground_truth_graphe):
     :return:
     '''
 
-    candidate_edges = candidate_graphe.edges
-    ground_truth_edges = ground_truth_graphe.edges
     logger = logging.getLogger(__name__)
 
+    # All target edges, to check each candidate edge in O(1)
+    ground_truth_edges = {get_edge_key(truth_edge) for truth_edge in ground_truth_graphe.edges}
+
     wrong = []
 
     # For all candidate edge
-    for curr_candidate_edge in candidate_edges:
-        found = False
-        # Check if we find the corresponding edge in the target edges list, given the node mapping
-        for truth_edge in ground_truth_edges:
-            if are_same_edge(curr_candidate_edge, mapping_dict, truth_edge):
-                found = True
-                continue
-        if not found:
+    for curr_candidate_edge in candidate_graphe.edges:
+        # Check if we find the corresponding edge in the target edges set, given the node mapping
+        mapped_key = get_mapped_edge_key(curr_candidate_edge, mapping_dict)
+
+        if mapped_key is None:
+            logger.error(f"JSON_CLASS : MATCHING AND EDGES ARE NOT CONSISTENT : a source edge index is not part of the matching {str(curr_candidate_edge)}")
+
+        if mapped_key is None or mapped_key not in ground_truth_edges:
             logger.debug(f"Edge : {str(curr_candidate_edge)} not found in target graph.")
             wrong.append(curr_candidate_edge)
 
     return wrong
 
 
+def get_edge_key(edge):
+    return (edge["from"], edge["to"])
+
+
+def get_mapped_edge_key(edge, matching):
+    '''
+    Give the (from, to) key of an edge, translated with the node mapping. None if a node is not part of the mapping.
+    '''
+    if edge["from"] not in matching or edge["to"] not in matching:
+        return None
+
+    return (matching[edge["from"]], matching[edge["to"]])
+
+
 def are_same_edge(edge1, matching, edge2):
     logger = logging.getLogger(__name__)
 
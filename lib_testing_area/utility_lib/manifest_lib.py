@@ -0,0 +1,154 @@
+import json
+import hashlib
+import logging
+import pathlib
+import concurrent.futures
+
+import configuration
+from utility_lib import image_header_lib, filesystem_lib
+
+MANIFEST_SUFFIX = ".manifest.json" # In an output folder, never next to the dataset (read-only or shared) : <dataset>.manifest.json
+MANIFEST_VERSION = 1
+MANIFEST_THREADS = 16 # Headers and hashes reads are I/O bound : more threads than cores
+HASH_BLOCK_SIZE = 1024 * 1024
+
+PICTURE_SUFFIXES = {"." + img_type.name.lower(): img_type.name for img_type in configuration.SUPPORTED_IMAGE_TYPE}
+
+
+def get_default_manifest_path(source_dir: pathlib.Path, output_dir: pathlib.Path):
+    return pathlib.Path(output_dir) / (pathlib.Path(source_dir).resolve().name + MANIFEST_SUFFIX)
+
+
+def get_file_hash(path: pathlib.Path):
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            sha1.update(block)
+    return sha1.hexdigest()
+
+
+def describe_file(path: pathlib.Path, stat):
+    # Manifest entry of a new or modified file (id given by the manifest)
+    header = image_header_lib.read_header(path) if stat.st_size > 0 else None
+    return {"size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha1": get_file_hash(path),
+            "format": header[0] if header is not None else None,
+            "width": header[1] if header is not None else 0,
+            "height": header[2] if header is not None else 0}
+
+
+class Dataset_manifest():
+    '''
+    Pictures of a dataset folder, listed once : relative path, stable id, size, modification time, content hash and dimensions.
+    Ids are kept from one refresh to the other : new pictures get new ids, ids of removed pictures are not reused.
+    Loaders list pictures from the manifest, in id order, instead of walking the folder each time.
+    Modification times of the folders are kept : an added or removed picture is detected from a few stats, without walk.
+    Without manifest path, the manifest is kept in memory only : the folder is walked by each manifest.
+    '''
+
+    def __init__(self, source_dir: pathlib.Path, manifest_path: pathlib.Path = None):
+        self.logger = logging.getLogger('__main__.' + __name__)
+        self.source_dir = pathlib.Path(source_dir).resolve()
+        self.manifest_path = pathlib.Path(manifest_path) if manifest_path is not None else None
+
+        self.next_id = 0
+        self.entries = {} # relative path (posix) : entry
+        self.directories = {} # relative path (posix) of the folder and its sub folders : modification time
+
+        if self.manifest_path is not None and self.manifest_path.exists():
+            try:
+                data = Dataset_manifest.load_json(self.manifest_path)
+                if data["VERSION"] == MANIFEST_VERSION:
+                    self.next_id = data["NEXT_ID"]
+                    self.entries = data["PICTURES"]
+                    self.directories = data["DIRECTORIES"]
+            except Exception as e:
+                self.logger.warning(f"Manifest {self.manifest_path} ignored, rebuilt : {e}")
+
+    @staticmethod
+    def get_manifest(source_dir: pathlib.Path, manifest_path: pathlib.Path = None, refresh: bool = False):
+        '''
+        Manifest of a dataset, refreshed only if asked, absent or outdated (no walk of the folder otherwise)
+        '''
+        manifest = Dataset_manifest(source_dir, manifest_path)
+        if refresh or not manifest.is_up_to_date():
+            manifest.refresh()
+        return manifest
+
+    def is_up_to_date(self):
+        # Pictures added or removed change the modification time of their folder. Modified pictures are seen by refresh only.
+        if len(self.directories) == 0:
+            return False
+        try:
+            return all((self.source_dir / name).stat().st_mtime_ns == mtime_ns for name, mtime_ns in self.directories.items())
+        except OSError:
+            return False
+
+    def refresh(self, nb_threads: int = MANIFEST_THREADS):
+        '''
+        Walk the folder once. Only new or modified files (other size or modification time) are read.
+        '''
+        path_list = []
+        self.directories = {".": self.source_dir.stat().st_mtime_ns}
+        for path in sorted(self.source_dir.glob('**/*')):
+            if path.is_dir():
+                self.directories[path.relative_to(self.source_dir).as_posix()] = path.stat().st_mtime_ns
+            elif path.suffix.lower() in PICTURE_SUFFIXES:
+                path_list.append(path)
+
+        def update(path):
+            name = path.relative_to(self.source_dir).as_posix()
+            stat = path.stat()
+            entry = self.entries.get(name)
+            if entry is not None and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+                return name, entry, False
+            return name, describe_file(path, stat), True
+
+        new_entries = {}
+        nb_read = 0
+        with concurrent.futures.ThreadPoolExecutor(max_workers=nb_threads) as executor:
+            # Sorted paths : new pictures get ids in the same order from one machine to the other
+            for name, entry, is_read in executor.map(update, path_list):
+                if "id" not in entry:
+                    entry["id"] = self.entries[name]["id"] if name in self.entries else self.get_new_id()
+                new_entries[name] = entry
+                nb_read += is_read
+
+        self.logger.info(f"Manifest of {len(new_entries)} pictures refreshed, {nb_read} read, {len(set(self.entries) - set(new_entries))} removed")
+        self.entries = new_entries
+        self.save()
+
+    def get_new_id(self):
+        self.next_id += 1
+        return self.next_id - 1
+
+    def remove(self, path: pathlib.Path):
+        # Of a deleted picture : its folder changed with it
+        path = pathlib.Path(path).resolve()
+        self.entries.pop(path.relative_to(self.source_dir).as_posix(), None)
+        folder_name = path.parent.relative_to(self.source_dir).as_posix()
+        if folder_name in self.directories:
+            self.directories[folder_name] = path.parent.stat().st_mtime_ns
+
+    def get_pictures(self, img_type: configuration.SUPPORTED_IMAGE_TYPE = None):
+        '''
+        :return: list of (id, absolute path, entry) in id order, of one image type (all if None)
+        '''
+        picture_list = [(entry["id"], self.source_dir / name, entry) for name, entry in self.entries.items()
+                        if img_type is None or PICTURE_SUFFIXES[pathlib.PurePosixPath(name).suffix.lower()] == img_type.name]
+        return sorted(picture_list, key=lambda x: x[0])
+
+    def save(self):
+        if self.manifest_path is None:
+            return
+        try:
+            data = {"VERSION": MANIFEST_VERSION, "NEXT_ID": self.next_id, "DIRECTORIES": self.directories, "PICTURES": self.entries}
+            filesystem_lib.atomic_write(self.manifest_path, lambda tmp_path: tmp_path.write_text(json.dumps(data, separators=(",", ":")), encoding="utf-8"))
+        except OSError as e:
+            self.logger.warning(f"Manifest kept in memory only, impossible to write {self.manifest_path} : {e}")
+
+    @staticmethod
+    def load_json(file_path: pathlib.Path):
+        with file_path.open("r", encoding="utf-8") as f:
+            return json.load(f)
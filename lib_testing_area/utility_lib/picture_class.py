@@ -18,16 +18,12 @@ class Picture():
 
         # Descriptors related attributes
         self.key_points = None
+        self.key_points_coordinates = None # Keypoints positions as a (N, 2) array
         self.description = None
         self.image = self.load_image(self.path)
 
-        self.matchesMask = None # Only for RANSAC filtering : mask of matches indicating if a match is an in or outlier
-        self.transformation_matrix = None # Only for RANSAC filtering : transformation matrix between source and dest
-        self.transformation_rigid_matrix = None # Only for RANSAC filtering : transformation matrix between source and dest
-
         # Multipurpose storage, e.g. store some useful class for processing.
         # self.storage = None
-        self.matches = None
 
     def load_image(self, path: pathlib.PosixPath):
         if path is None or path == "":
@@ -0,0 +1,159 @@
+import os
+import resource
+import tracemalloc
+import threading
+import time
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE')
+RSS_SAMPLING_PERIOD = 0.01 # Seconds between two reads of the resident memory during a stage
+
+
+def get_rss():
+    '''
+    Current resident memory of the process, in bytes (None if /proc is not available)
+    '''
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+class Rss_sampler():
+    '''
+    Peak resident memory of the process during a stage, read by a background thread every sampling period.
+    ru_maxrss is the peak since the process started : configurations run after a heavier one in the same process would all get its peak.
+    '''
+
+    def __init__(self, sampling_period: float = RSS_SAMPLING_PERIOD):
+        self.sampling_period = sampling_period
+        self.peak = None
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def sample(self):
+        rss = get_rss()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def run(self):
+        while not self.stop_event.wait(self.sampling_period):
+            self.sample()
+
+    def start(self):
+        self.sample()
+        self.thread = threading.Thread(target=self.run, name="rss_sampler", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        '''
+        :return: peak resident memory since start, in bytes (None if /proc is not available)
+        '''
+        self.stop_event.set()
+        self.thread.join()
+        self.sample()
+        return self.peak
+
+
+class Resource_usage():
+    '''
+    Usage of resources by the process at one point in time
+    '''
+
+    def __init__(self):
+        usage = resource.getrusage(resource.RUSAGE_SELF)
+        self.wall_time = time.time()
+        self.user_cpu = usage.ru_utime
+        self.system_cpu = usage.ru_stime
+        self.voluntary_switches = usage.ru_nvcsw
+        self.involuntary_switches = usage.ru_nivcsw
+        self.rss = get_rss()
+
+
+class Measured_stage():
+    # Context manager of one stage of a Resource_monitor
+    def __init__(self, monitor, name: str):
+        self.monitor = monitor
+        self.name = name
+        self.start_usage = None
+        self.start_traced = None
+        self.rss_sampler = Rss_sampler(monitor.sampling_period)
+
+    def __enter__(self):
+        if self.monitor.trace_memory:
+            if hasattr(tracemalloc, "reset_peak"):
+                # Python 3.9+ : peak of this stage only. Before, the peak since the start of tracing is not reported
+                tracemalloc.reset_peak()
+            self.start_traced = tracemalloc.get_traced_memory()[0]
+        self.start_usage = Resource_usage()
+        self.rss_sampler.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        max_rss = self.rss_sampler.stop()
+        end_usage = Resource_usage()
+        stage_usage = {"WALL_TIME": end_usage.wall_time - self.start_usage.wall_time,
+                       "USER_CPU": end_usage.user_cpu - self.start_usage.user_cpu,
+                       "SYSTEM_CPU": end_usage.system_cpu - self.start_usage.system_cpu,
+                       "RSS_BEFORE": self.start_usage.rss,
+                       "RSS_AFTER": end_usage.rss,
+                       "MAX_RSS": max_rss,
+                       "MAX_RSS_INCREASE": max_rss - self.start_usage.rss if max_rss is not None and self.start_usage.rss is not None else None,
+                       "VOLUNTARY_CONTEXT_SWITCHES": end_usage.voluntary_switches - self.start_usage.voluntary_switches,
+                       "INVOLUNTARY_CONTEXT_SWITCHES": end_usage.involuntary_switches - self.start_usage.involuntary_switches}
+        if self.monitor.trace_memory:
+            # Python allocations only : numpy buffers are traced, OpenCV native memory is not (see RSS)
+            traced, traced_peak = tracemalloc.get_traced_memory()
+            stage_usage["TRACED_MEMORY_INCREASE"] = traced - self.start_traced
+            if hasattr(tracemalloc, "reset_peak"):
+                stage_usage["TRACED_MEMORY_PEAK"] = traced_peak
+
+        self.monitor.stages[self.name] = stage_usage
+        return False
+
+
+class Disabled_measure():
+    # Context manager of a disabled monitor : measures nothing
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        return False
+
+
+DISABLED_MEASURE = Disabled_measure()
+
+
+class Resource_monitor():
+    '''
+    CPU time, memory and context switches used by each stage of a run (load_pictures, prepare_dataset, ...).
+    Usage :                 with monitor.measure("prepare_dataset"): ...
+    getrusage is read at stage boundaries. RSS is sampled during each stage (see Rss_sampler) : peaks are of this stage, and of this run.
+    tracemalloc slows down every allocation : optional.
+    '''
+
+    def __init__(self, enabled: bool = True, trace_memory: bool = False, sampling_period: float = RSS_SAMPLING_PERIOD):
+        self.enabled = enabled
+        self.trace_memory = enabled and trace_memory
+        self.sampling_period = sampling_period
+        self.stages = {}  # name : usage of this stage
+
+    def measure(self, name: str):
+        if not self.enabled:
+            return DISABLED_MEASURE
+        return Measured_stage(self, name)
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def stop(self):
+        if self.trace_memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def get_max_rss(self):
+        # Peak resident memory over the stages of this run, in bytes
+        peak_list = [usage["MAX_RSS"] for usage in self.stages.values() if usage["MAX_RSS"] is not None]
+        if not self.enabled or peak_list == []:
+            return None
+        return max(peak_list)
@@ -0,0 +1,216 @@
+import sqlite3
+import pathlib
+import logging
+import json
+import time
+import contextlib
+
+import utility_lib.filesystem_lib as filesystem_lib
+
+# One row per run (= one configuration executed on one dataset, named as its output folder)
+# Parameters and stats are stored as JSON values, one row per attribute. Numeric stats are duplicated in "value" to be sorted/filtered in SQL.
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    algo TEXT,
+    created REAL
+);
+CREATE TABLE IF NOT EXISTS parameters (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value_json TEXT,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS stats (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    name TEXT NOT NULL,
+    value REAL,
+    value_json TEXT,
+    PRIMARY KEY (run_id, name)
+);
+CREATE TABLE IF NOT EXISTS nodes (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    node_id INTEGER NOT NULL,
+    image TEXT,
+    shape TEXT,
+    PRIMARY KEY (run_id, node_id)
+);
+CREATE TABLE IF NOT EXISTS edges (
+    run_id INTEGER NOT NULL REFERENCES runs(id) ON DELETE CASCADE,
+    from_id INTEGER NOT NULL,
+    to_id INTEGER NOT NULL,
+    distance REAL,
+    label TEXT,
+    value TEXT
+);
+CREATE INDEX IF NOT EXISTS edges_run_index ON edges (run_id, from_id, to_id);
+CREATE INDEX IF NOT EXISTS stats_name_index ON stats (name, value);
+CREATE INDEX IF NOT EXISTS parameters_name_index ON parameters (name, value_json);
+'''
+
+
+class Results_DB():
+    '''
+    Embedded SQLite store of the results of runs : configuration, stats and output graphe of each run.
+    Replaces the walk over conf.txt/stats.txt/graphe.py of each results folder for the reporting functions.
+    A connection is opened per operation, so that each process of a parallel launch can write to the same file.
+    '''
+
+    def __init__(self, db_path: pathlib.Path):
+        self.db_path = pathlib.Path(db_path)
+        self.logger = logging.getLogger(__name__)
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.connect() as connection:
+            connection.executescript(SCHEMA)
+
+    @contextlib.contextmanager
+    def connect(self):
+        '''
+        Connection as a transaction : committed if no exception, rolled back otherwise, then closed
+        '''
+        connection = sqlite3.connect(str(self.db_path), timeout=60)
+        connection.execute("PRAGMA foreign_keys = ON")
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    @staticmethod
+    def to_json_dict(obj):
+        '''
+        Configuration, results, .. as a dict of JSON compatible values (as written in conf.txt and stats.txt)
+        '''
+        return json.loads(json.dumps(obj, cls=filesystem_lib.Custom_JSON_Encoder))
+
+    # =========================== -------------------------- ===========================
+    #                                     WRITING
+
+    def add_run(self, name: str, conf):
+        '''
+        Register a run and its configuration. An existing run with the same name is replaced (with its stats and graphe)
+        :return: id of the run
+        '''
+        conf_dict = Results_DB.to_json_dict(conf)
+
+        with self.connect() as connection:
+            connection.execute("DELETE FROM runs WHERE name = ?", (name,))
+            cursor = connection.execute("INSERT INTO runs (name, algo, created) VALUES (?, ?, ?)",
+                                        (name, conf_dict.get("ALGO"), time.time()))
+            run_id = cursor.lastrowid
+
+            connection.executemany("INSERT INTO parameters (run_id, name, value_json) VALUES (?, ?, ?)",
+                                   [(run_id, key, json.dumps(value)) for key, value in conf_dict.items()])
+
+        self.logger.debug(f"Run {name} added to {self.db_path}")
+        return run_id
+
+    def save_results(self, name: str, results, graphe=None):
+        '''
+        Store the stats and the output graphe of a registered run, replacing previous ones
+        '''
+        stats_dict = Results_DB.to_json_dict(results)
+
+        with self.connect() as connection:
+            run_id = self.get_run_id(connection, name)
+
+            connection.execute("DELETE FROM stats WHERE run_id = ?", (run_id,))
+            connection.executemany("INSERT INTO stats (run_id, name, value, value_json) VALUES (?, ?, ?, ?)",
+                                   [(run_id, key, Results_DB.to_number(value), json.dumps(value)) for key, value in stats_dict.items()])
+
+            if graphe is not None:
+                connection.execute("DELETE FROM nodes WHERE run_id = ?", (run_id,))
+                connection.execute("DELETE FROM edges WHERE run_id = ?", (run_id,))
+                connection.executemany("INSERT INTO nodes (run_id, node_id, image, shape) VALUES (?, ?, ?, ?)",
+                                       [(run_id, n["id"], n.get("image"), n.get("shape")) for n in graphe.nodes])
+                connection.executemany("INSERT INTO edges (run_id, from_id, to_id, distance, label, value) VALUES (?, ?, ?, ?, ?, ?)",
+                                       [(run_id, e["from"], e["to"], e.get("title"), e.get("label"), e.get("value")) for e in graphe.edges])
+
+        self.logger.debug(f"Results of run {name} saved to {self.db_path}")
+
+    @staticmethod
+    def to_number(value):
+        # Booleans are JSON values only
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+        return None
+
+    @staticmethod
+    def get_run_id(connection, name: str):
+        row = connection.execute("SELECT id FROM runs WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise Exception(f"Run {name} is not registered in the results database")
+        return row[0]
+
+    # =========================== -------------------------- ===========================
+    #                                     READING
+
+    def get_run_names(self):
+        with self.connect() as connection:
+            return [row[0] for row in connection.execute("SELECT name FROM runs ORDER BY name")]
+
+    def get_conf(self, name: str):
+        with self.connect() as connection:
+            run_id = self.get_run_id(connection, name)
+            return {key: json.loads(value) for key, value in
+                    connection.execute("SELECT name, value_json FROM parameters WHERE run_id = ?", (run_id,))}
+
+    def get_stats(self, name: str):
+        '''
+        Stats of a run as a dict (as in stats.txt), None if the run has no stats yet
+        '''
+        with self.connect() as connection:
+            run_id = self.get_run_id(connection, name)
+            stats = {key: json.loads(value) for key, value in
+                     connection.execute("SELECT name, value_json FROM stats WHERE run_id = ?", (run_id,))}
+        return stats if len(stats) > 0 else None
+
+    def get_stats_overview(self):
+        '''
+        Stats of all runs, with one query
+        :return: list of [name, stats dict or None if the run has no stats], by run name
+        '''
+        with self.connect() as connection:
+            stats_per_run = {name: {} for (name,) in connection.execute("SELECT name FROM runs ORDER BY name")}
+            for run_name, key, value in connection.execute("SELECT runs.name, stats.name, stats.value_json FROM stats JOIN runs ON runs.id = stats.run_id"):
+                stats_per_run[run_name][key] = json.loads(value)
+
+        return [[name, stats if len(stats) > 0 else None] for name, stats in stats_per_run.items()]
+
+    def get_graph_list(self):
+        '''
+        Output graphes of all runs, with their configuration and stats, as Graph_handler.get_graph_list
+        Runs without graphe are not returned.
+        :return: list of dict {"name", "graphe", "conf", "stats"}, by run name
+        '''
+        # Avoid a circular import : graph_lib loads the store
+        import utility_lib.graph_lib as graph_lib
+
+        with self.connect() as connection:
+            runs = {run_id: {"name": name, "graphe": graph_lib.Graphe(), "conf": {}, "stats": {}}
+                    for run_id, name in connection.execute("SELECT id, name FROM runs ORDER BY name")}
+
+            for run_id, node_id, image, shape in connection.execute("SELECT run_id, node_id, image, shape FROM nodes ORDER BY run_id, rowid"):
+                runs[run_id]["graphe"].nodes.append({"id": node_id, "shape": shape, "image": image})
+
+            for run_id, from_id, to_id, distance, label, value in connection.execute("SELECT run_id, from_id, to_id, distance, label, value FROM edges ORDER BY run_id, rowid"):
+                runs[run_id]["graphe"].edges.append({"from": from_id, "to": to_id, "label": label, "value": value, "title": distance})
+
+            for run_id, key, value in connection.execute("SELECT run_id, name, value_json FROM parameters"):
+                runs[run_id]["conf"][key] = json.loads(value)
+
+            for run_id, key, value in connection.execute("SELECT run_id, name, value_json FROM stats"):
+                runs[run_id]["stats"][key] = json.loads(value)
+
+        graphe_list = []
+        for curr_run in runs.values():
+            # We do not store something without graphe
+            if len(curr_run["graphe"].nodes) == 0:
+                continue
+            if len(curr_run["stats"]) == 0:
+                curr_run["stats"] = None
+            graphe_list.append(curr_run)
+
+        return graphe_list
@@ -0,0 +1,144 @@
+import os
+import sys
+import time
+import pathlib
+import logging
+import multiprocessing
+import multiprocessing.connection
+
+import configuration
+from utility_lib import manifest_lib
+
+DEFAULT_MEMORY_SHARE = 0.8 # Share of the physical memory used when no budget is provided
+
+
+def get_dataset_size(source_dir: pathlib.Path, img_type: configuration.SUPPORTED_IMAGE_TYPE, manifest_path: pathlib.Path = None):
+    '''
+    Number of pictures of a dataset, and mean number of pixels of a picture (from the dimensions in its manifest)
+    '''
+    picture_list = manifest_lib.Dataset_manifest.get_manifest(source_dir, manifest_path=manifest_path).get_pictures(img_type)
+
+    nb_pixels_list = [entry["width"] * entry["height"] for _, _, entry in picture_list if entry["format"] is not None]
+
+    nb_pixels = sum(nb_pixels_list) / len(nb_pixels_list) if len(nb_pixels_list) > 0 else 0
+    return len(picture_list), nb_pixels
+
+
+def get_default_memory_budget():
+    # Physical memory of the machine, in bytes
+    return int(os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES') * DEFAULT_MEMORY_SHARE)
+
+
+def run_scheduled_configuration(launch_function, exec_handler, curr_configuration):
+    '''
+    Body of a worker process : one configuration, exit code 0 if it succeeded
+    '''
+    succeeded = launch_function(exec_handler, curr_configuration)
+    sys.exit(0 if succeeded else 1)
+
+
+class Scheduled_configuration():
+    def __init__(self, exec_handler, conf: configuration.Default_configuration, memory: float, duration: float):
+        self.exec_handler = exec_handler
+        self.conf = conf
+        self.memory = memory # Estimated peak memory, in bytes
+        self.duration = duration # Estimated duration, in seconds
+
+        self.name = conf.OUTPUT_DIR.name
+
+
+class Configuration_scheduler():
+    '''
+    Run independent configurations in parallel worker processes, one process per configuration.
+    Longest expected configurations are started first. A configuration is started only if the
+    estimated memory of running configurations stays within the budget (see Execution_handler.estimate_resources)
+    '''
+
+    def __init__(self, nb_processes: int, memory_budget: float, nb_pictures: int, nb_pixels: float):
+        self.logger = logging.getLogger(__name__)
+
+        self.nb_processes = nb_processes
+        self.memory_budget = memory_budget
+
+        # Size of the dataset all configurations are run on
+        self.nb_pictures = nb_pictures
+        self.nb_pixels = nb_pixels
+
+        self.pending_list = []
+
+    def add(self, exec_handler, curr_configuration: configuration.Default_configuration):
+        '''
+        Queue a configuration. The configuration should not be modified afterward (give a copy)
+        '''
+        memory, preparation_time, pair_time = exec_handler.estimate_resources(curr_configuration, self.nb_pictures, self.nb_pixels)
+        duration = preparation_time + self.nb_pictures * self.nb_pictures * pair_time
+
+        self.pending_list.append(Scheduled_configuration(exec_handler, curr_configuration, memory, duration))
+        self.logger.debug(f"Configuration {curr_configuration.OUTPUT_DIR.name} scheduled : ~{round(memory / 2 ** 20)}MB, ~{round(duration)}s")
+
+    def get_next_configurations(self, running_memory: float, nb_running: int):
+        '''
+        Pick the pending configurations to start now, longest first, within the free processes and memory.
+        A configuration above the whole budget is started alone.
+        '''
+        self.pending_list = sorted(self.pending_list, key=lambda c: c.duration, reverse=True)
+
+        to_start = []
+        for curr_configuration in self.pending_list:
+            if nb_running + len(to_start) >= self.nb_processes:
+                break
+
+            nothing_running = nb_running + len(to_start) == 0
+            if nothing_running or running_memory + curr_configuration.memory <= self.memory_budget:
+                if curr_configuration.memory > self.memory_budget:
+                    self.logger.warning(f"Configuration {curr_configuration.name} is expected to use more than the memory budget : started alone")
+                to_start.append(curr_configuration)
+                running_memory += curr_configuration.memory
+
+        for curr_configuration in to_start:
+            self.pending_list.remove(curr_configuration)
+
+        return to_start
+
+    def run(self, launch_function):
+        '''
+        Run all queued configurations
+        :param launch_function: function(exec_handler, configuration) running one configuration in the worker, returns True if succeeded
+        :return: list of [configuration name, exit code] (0 = succeeded, negative = killed by this signal, e.g. out of memory)
+        '''
+        context = multiprocessing.get_context("fork")
+
+        self.logger.info(f"Running {len(self.pending_list)} configurations on {self.nb_processes} processes, within {round(self.memory_budget / 2 ** 30, 2)}GB")
+
+        running = {}  # sentinel : (scheduled configuration, process)
+        running_memory = 0
+        exit_codes = []
+        start_time = time.time()
+
+        while len(self.pending_list) > 0 or len(running) > 0:
+            for curr_configuration in self.get_next_configurations(running_memory, len(running)):
+                process = context.Process(target=run_scheduled_configuration,
+                                          args=(launch_function, curr_configuration.exec_handler, curr_configuration.conf),
+                                          name=curr_configuration.name)
+                process.start()
+
+                running[process.sentinel] = (curr_configuration, process)
+                running_memory += curr_configuration.memory
+                self.logger.info(f"Started {curr_configuration.name} ({len(running)} running, {len(self.pending_list)} pending)")
+
+            # Wait for any configuration to end
+            for sentinel in multiprocessing.connection.wait(list(running.keys())):
+                curr_configuration, process = running.pop(sentinel)
+                process.join()
+                running_memory -= curr_configuration.memory
+
+                exit_codes.append([curr_configuration.name, process.exitcode])
+                if process.exitcode == 0:
+                    self.logger.info(f"Ended {curr_configuration.name}")
+                elif process.exitcode < 0:
+                    self.logger.error(f"Configuration {curr_configuration.name} killed by signal {-process.exitcode}")
+                else:
+                    self.logger.error(f"Configuration {curr_configuration.name} failed")
+
+        self.logger.info(f"All configurations ended in {round(time.time() - start_time, 2)}s")
+        return exit_codes
@@ -1,4 +1,5 @@
 import logging
+import math
 from scipy import stats
 
 import configuration
@@ -8,12 +9,83 @@ import utility_lib.filesystem_lib as filesystem_lib
 ROUND_DECIMAL = 5
 END_LINE = ", "
 
+LATENCY_PERCENTILES = {"P50": 0.5, "P90": 0.9, "P99": 0.99, "P99_9": 0.999}
+
+
+class Latency_sketch():
+    '''
+    Streaming quantiles of latencies, with a bounded relative error and without keeping samples.
+    Values are counted in logarithmic buckets [gamma^(i-1), gamma^i[ : a quantile is given within relative_accuracy of a true sample.
+    Memory grows with log(max / min) / log(gamma) only (about 1000 buckets for 1 us to 1 h at 1%).
+    '''
+
+    def __init__(self, relative_accuracy: float = 0.01, min_value: float = 1e-9):
+        if not 0 < relative_accuracy < 1:
+            raise Exception(f"Relative accuracy of a latency sketch should be in ]0,1[ : {relative_accuracy}")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.min_value = min_value  # Smaller values are counted as 0
+
+        self.buckets = {}  # index : number of values
+        self.nb_zero = 0
+        self.count = 0
+        self.min = None
+        self.max = None
+
+    def add(self, value: float):
+        self.count += 1
+        if self.min is None or value < self.min: self.min = value
+        if self.max is None or value > self.max: self.max = value
+
+        if value <= self.min_value:
+            self.nb_zero += 1
+        else:
+            index = math.ceil(math.log(value) / self.log_gamma)
+            self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def add_list(self, value_list):
+        for value in value_list:
+            self.add(value)
+
+    def get_quantile(self, quantile: float):
+        if self.count == 0:
+            return None
+        # Exact extremes are known
+        if quantile <= 0:
+            return self.min
+        if quantile >= 1:
+            return self.max
+
+        # Same rank as the lowest of the nearest samples
+        rank = quantile * (self.count - 1)
+        if rank < self.nb_zero:
+            return 0.0
+
+        nb_seen = self.nb_zero
+        for index in sorted(self.buckets.keys()):
+            nb_seen += self.buckets[index]
+            if nb_seen > rank:
+                # Middle of the bucket, in relative terms
+                value = 2 * self.gamma ** index / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+
+        return self.max
+
+    def get_percentiles(self):
+        return {name: self.get_quantile(quantile) for name, quantile in LATENCY_PERCENTILES.items()}
+
+
 class Stats_handler():
     def __init__(self, conf: configuration.Default_configuration):
         self.conf = conf
         self.logger =  logging.getLogger('__main__.' + __name__)
 
     def print_stats_human(self, conf: configuration.Default_configuration, results: results.RESULTS, round_decimal=ROUND_DECIMAL):
+        if results.TIME_LIST_MATCHING is None:
+            self.logger.info("Matching time of each target not kept (see TIME_LIST_MAX_TARGETS)")
+            return
+
         stats_result = stats.describe(results.TIME_LIST_MATCHING)
 
         tmp_str = ""
@@ -27,19 +99,29 @@ class Stats_handler():
         self.logger.info(tmp_str)
 
     def print_stats(self, conf: configuration.Default_configuration, results: results.RESULTS, round_decimal=ROUND_DECIMAL):
-        stats_result = stats.describe(results.TIME_LIST_MATCHING)
+        if results.TIME_LIST_MATCHING is None:
+            self.logger.info("Matching time of each target not kept (see TIME_LIST_MAX_TARGETS)")
+        else:
+            stats_result = stats.describe(results.TIME_LIST_MATCHING)
 
-        tmp_str = ""
-        tmp_str += "Nobs & Min time & Max time & Mean & Variance & Skewness & Kurtosis & Quality\\ \hline \n"
-        tmp_str += str(getattr(stats_result, "nobs")) + " & "
-        tmp_str += str(round(getattr(stats_result, "minmax")[0], round_decimal)) + " & "
-        tmp_str += str(round(getattr(stats_result, "minmax")[1], round_decimal)) + " & "
-        tmp_str += str(round(getattr(stats_result, "mean"), round_decimal)) + " & "
-        tmp_str += str(round(getattr(stats_result, "variance"), round_decimal)) + " & "
-        tmp_str += str(round(getattr(stats_result, "skewness"), round_decimal)) + " & "
-        tmp_str += str(round(getattr(stats_result, "kurtosis"), round_decimal))
-        tmp_str += str("\\\ \hline \n")
-        self.logger.info(tmp_str)
+            tmp_str = ""
+            tmp_str += "Nobs & Min time & Max time & Mean & Variance & Skewness & Kurtosis & Quality\\ \hline \n"
+            tmp_str += str(getattr(stats_result, "nobs")) + " & "
+            tmp_str += str(round(getattr(stats_result, "minmax")[0], round_decimal)) + " & "
+            tmp_str += str(round(getattr(stats_result, "minmax")[1], round_decimal)) + " & "
+            tmp_str += str(round(getattr(stats_result, "mean"), round_decimal)) + " & "
+            tmp_str += str(round(getattr(stats_result, "variance"), round_decimal)) + " & "
+            tmp_str += str(round(getattr(stats_result, "skewness"), round_decimal)) + " & "
+            tmp_str += str(round(getattr(stats_result, "kurtosis"), round_decimal))
+            tmp_str += str("\\\ \hline \n")
+            self.logger.info(tmp_str)
+
+        if results.LATENCY_PERCENTILES is not None:
+            tmp_str = "Latency per target : "
+            tmp_str += END_LINE.join(f"{name} = {round(value, round_decimal)}s" for name, value in results.LATENCY_PERCENTILES.items() if value is not None)
+            self.logger.info(tmp_str)
+            self.logger.info(f"Throughput : {results.PICTURES_PER_SECOND_PRE_COMPUTING} pictures/s pre-computed, "
+                             f"{results.PICTURES_PER_SECOND_MATCHING} targets/s matched, {results.PAIRS_PER_SECOND} pairs/s compared")
 
 
 
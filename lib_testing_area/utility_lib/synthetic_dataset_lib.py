@@ -0,0 +1,305 @@
+import copy
+import json
+import random
+import pathlib
+import logging
+import multiprocessing
+from enum import Enum, auto
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+import configuration
+
+FONT_DIR = pathlib.Path(__file__).parent / "fonts"
+PICTURES_FOLDER = "pictures"
+GROUND_TRUTH_FILE = "ground_truth.json"
+PICTURES_PER_FOLDER = 10000 # Pictures are spread in subfolders, to keep folders listable at 1M pictures
+FAMILIES_PER_TASK = 200 # Families generated by a worker process at once
+
+WORDS = ["account", "login", "password", "verify", "secure", "bank", "update", "payment", "email", "sign", "in",
+         "your", "continue", "support", "help", "welcome", "confirm", "identity", "card", "number", "submit", "click",
+         "here", "online", "service", "customer", "offer", "limited", "today", "news", "contact", "home", "shop", "cart"]
+
+
+class VARIATION_TYPE(configuration.JSON_parsable_Enum, Enum):
+    TEXT_CHANGE = auto() # Some words of the page are replaced
+    CROP = auto() # Margins of the screenshot are cut
+    RESCALE = auto() # Screenshot taken at another resolution
+    COLOR_SHIFT = auto() # Colours of the whole page are shifted
+
+
+# =========================== -------------------------- ===========================
+#                                    PAGE RENDERING
+
+_font_cache = {}
+
+
+def get_font(size: int, bold: bool = False):
+    # Loading a font is costly compared to drawing a page
+    if (size, bold) not in _font_cache:
+        font_file = FONT_DIR / ("OpenSans-Bold.ttf" if bold else "OpenSans-Regular.ttf")
+        try:
+            _font_cache[(size, bold)] = ImageFont.truetype(str(font_file), size)
+        except Exception:
+            _font_cache[(size, bold)] = ImageFont.load_default()
+    return _font_cache[(size, bold)]
+
+
+def random_color(rng: random.Random, low: int = 0, high: int = 255):
+    return tuple(rng.randint(low, high) for _ in range(3))
+
+
+def random_text(rng: random.Random, nb_words: int):
+    return " ".join(rng.choice(WORDS) for _ in range(nb_words))
+
+
+def create_page(rng: random.Random, width: int, height: int):
+    '''
+    Random layout of a web page : a header with a logo, then columns of text blocks, forms and pictures
+    :return: description of the page, drawn by render_page
+    '''
+    header_height = int(height * rng.uniform(0.08, 0.16))
+    page = {"background": random_color(rng, 200, 255),
+            "header": {"height": header_height,
+                       "color": random_color(rng),
+                       "logo_color": random_color(rng),
+                       "logo_shape": rng.choice(["ellipse", "rectangle"]),
+                       "title": random_text(rng, rng.randint(1, 3)).upper()},
+            "blocks": []}
+
+    nb_columns = rng.randint(1, 2)
+    column_width = width // nb_columns
+    margin = max(width // 50, 2)
+    for column in range(nb_columns):
+        y = header_height + margin
+        while y < height - 4 * margin:
+            block_height = min(int(height * rng.uniform(0.12, 0.35)), height - y - margin)
+            box = (column * column_width + margin, y, (column + 1) * column_width - margin, y + block_height)
+            block_type = rng.choice(["text", "text", "form", "image"])
+
+            if block_type == "text":
+                line_size = max(int(height * rng.uniform(0.025, 0.04)), 6)
+                nb_lines = max((box[3] - box[1]) // (line_size * 2), 1)
+                page["blocks"].append({"type": "text", "box": box, "size": line_size, "color": random_color(rng, 0, 90),
+                                       "lines": [random_text(rng, rng.randint(2, 8)) for _ in range(nb_lines)]})
+            elif block_type == "form":
+                page["blocks"].append({"type": "form", "box": box, "color": random_color(rng),
+                                       "fields": [random_text(rng, 1) for _ in range(rng.randint(1, 3))],
+                                       "button": random_text(rng, 1).upper()})
+            else:
+                page["blocks"].append({"type": "image", "box": box, "color": random_color(rng),
+                                       "shapes": [[rng.random() for _ in range(4)] + [random_color(rng)] for _ in range(rng.randint(1, 4))]})
+            y += block_height + margin
+
+    return page
+
+
+def render_page(page, width: int, height: int):
+    image = Image.new("RGB", (width, height), page["background"])
+    draw = ImageDraw.Draw(image)
+
+    # Header and logo
+    header = page["header"]
+    draw.rectangle((0, 0, width, header["height"]), fill=header["color"])
+    logo_size = int(header["height"] * 0.7)
+    logo_box = (header["height"] // 6, header["height"] // 6, header["height"] // 6 + logo_size, header["height"] // 6 + logo_size)
+    getattr(draw, header["logo_shape"])(logo_box, fill=header["logo_color"])
+    draw.text((logo_box[2] + logo_size // 2, logo_box[1]), header["title"], fill=header["logo_color"], font=get_font(max(logo_size // 2, 6), bold=True))
+
+    for block in page["blocks"]:
+        x0, y0, x1, y1 = block["box"]
+        if block["type"] == "text":
+            font = get_font(block["size"])
+            for i, line in enumerate(block["lines"]):
+                draw.text((x0, y0 + i * block["size"] * 2), line, fill=block["color"], font=font)
+        elif block["type"] == "form":
+            field_height = max((y1 - y0) // (2 * len(block["fields"]) + 2), 4)
+            font = get_font(max(field_height // 2, 6))
+            for i, label in enumerate(block["fields"]):
+                y = y0 + 2 * i * field_height
+                draw.text((x0, y), label, fill=(60, 60, 60), font=font)
+                draw.rectangle((x0, y + field_height, x1, y + 2 * field_height - 2), outline=(120, 120, 120), fill=(255, 255, 255))
+            y = y0 + 2 * len(block["fields"]) * field_height
+            draw.rectangle((x0, y, x0 + (x1 - x0) // 3, y + field_height), fill=block["color"])
+            draw.text((x0 + 4, y), block["button"], fill=(255, 255, 255), font=font)
+        else:
+            draw.rectangle(block["box"], fill=block["color"])
+            for left, top, right, bottom, color in block["shapes"]:
+                left, right = sorted([x0 + left * (x1 - x0), x0 + right * (x1 - x0)])
+                top, bottom = sorted([y0 + top * (y1 - y0), y0 + bottom * (y1 - y0)])
+                draw.ellipse((left, top, right, bottom), fill=color)
+
+    return image
+
+
+# =========================== -------------------------- ===========================
+#                                   NEAR DUPLICATES
+
+def change_text(page, rng: random.Random):
+    # Some words of some lines, labels and buttons are replaced
+    page = copy.deepcopy(page)
+    for block in page["blocks"]:
+        if block["type"] == "text":
+            for i in range(len(block["lines"])):
+                if rng.random() < 0.3:
+                    words = block["lines"][i].split(" ")
+                    words[rng.randrange(len(words))] = rng.choice(WORDS)
+                    block["lines"][i] = " ".join(words)
+        elif block["type"] == "form" and rng.random() < 0.5:
+            block["button"] = random_text(rng, 1).upper()
+    return page
+
+
+def apply_variation(image: Image.Image, variation: VARIATION_TYPE, rng: random.Random):
+    width, height = image.size
+    if variation == VARIATION_TYPE.CROP:
+        left, top = int(width * rng.uniform(0, 0.15)), int(height * rng.uniform(0, 0.15))
+        right, bottom = width - int(width * rng.uniform(0, 0.15)), height - int(height * rng.uniform(0, 0.15))
+        return image.crop((left, top, right, bottom))
+    elif variation == VARIATION_TYPE.RESCALE:
+        factor = rng.uniform(0.6, 0.95)
+        return image.resize((max(int(width * factor), 1), max(int(height * factor), 1)), Image.BILINEAR)
+    elif variation == VARIATION_TYPE.COLOR_SHIFT:
+        shift = np.array([rng.randint(-40, 40) for _ in range(3)], dtype=np.int16)
+        return Image.fromarray(np.clip(np.asarray(image, dtype=np.int16) + shift, 0, 255).astype(np.uint8))
+    else:
+        raise Exception(f"Variation not applicable on a rendered picture : {variation}")
+
+
+def generate_family(family_id: int, family_size: int, seed: int, width: int, height: int):
+    '''
+    Pictures of one family : an original page, then near duplicates with 1 or 2 variations each.
+    Deterministic given the seed and the family id, whatever the process generating it.
+    :return: list of PIL images, original first
+    '''
+    rng = random.Random(seed * 1000003 + family_id)
+    page = create_page(rng, width, height)
+    picture_list = [render_page(page, width, height)]
+
+    for _ in range(family_size - 1):
+        variation_list = rng.sample(list(VARIATION_TYPE), rng.randint(1, 2))
+        if VARIATION_TYPE.TEXT_CHANGE in variation_list:
+            image = render_page(change_text(page, rng), width, height)
+        else:
+            image = picture_list[0]
+        for variation in variation_list:
+            if variation != VARIATION_TYPE.TEXT_CHANGE:
+                image = apply_variation(image, variation, rng)
+        picture_list.append(image)
+
+    return picture_list
+
+
+def generate_families(task):
+    '''
+    Body of a worker : generate and write families
+    :param task: (pictures folder, extension, seed, width, height, [(family id, index of its first picture, family size)])
+    :return: list of relative path of the pictures, per family
+    '''
+    pictures_dir, extension, seed, width, height, family_list = task
+    relative_paths_per_family = []
+
+    for family_id, first_index, family_size in family_list:
+        relative_paths = []
+        for i, image in enumerate(generate_family(family_id, family_size, seed, width, height)):
+            index = first_index + i
+            relative_path = pathlib.Path(f"{index // PICTURES_PER_FOLDER:04d}") / f"{index:07d}_family{family_id:07d}.{extension}"
+            (pictures_dir / relative_path).parent.mkdir(parents=True, exist_ok=True)
+            image.save(str(pictures_dir / relative_path))
+            relative_paths.append(str(relative_path))
+        relative_paths_per_family.append(relative_paths)
+
+    return relative_paths_per_family
+
+
+# =========================== -------------------------- ===========================
+#                                     DATASET
+
+class Synthetic_dataset_generator():
+    '''
+    Synthetic dataset of web page like screenshots, in families of near duplicates (crops, rescales, colour shifts, text changes).
+    Pictures are written in a pictures folder, and the ground truth graphe (all pairs of each family, both ways) as JSON,
+    in the format read by Json_handler.evaluate_json
+    '''
+
+    def __init__(self, output_dir: pathlib.Path, nb_pictures: int, max_family_size: int = 5,
+                 width: int = 640, height: int = 360,
+                 img_type: configuration.SUPPORTED_IMAGE_TYPE = configuration.SUPPORTED_IMAGE_TYPE.PNG,
+                 seed: int = 0, nb_processes: int = 1):
+        self.logger = logging.getLogger(__name__)
+
+        if nb_pictures < 1 or max_family_size < 1:
+            raise Exception(f"Invalid size of synthetic dataset : {nb_pictures} pictures, families up to {max_family_size}")
+
+        self.output_dir = pathlib.Path(output_dir)
+        self.pictures_dir = self.output_dir / PICTURES_FOLDER
+        self.ground_truth_path = self.output_dir / GROUND_TRUTH_FILE
+
+        self.nb_pictures = nb_pictures
+        self.max_family_size = max_family_size
+        self.width = width
+        self.height = height
+        self.img_type = img_type
+        self.seed = seed
+        self.nb_processes = nb_processes
+
+    def get_family_sizes(self):
+        # Singletons are distractors without duplicate. The last family is cut to the number of pictures
+        rng = random.Random(self.seed)
+        family_sizes = []
+        remaining = self.nb_pictures
+        while remaining > 0:
+            family_sizes.append(min(rng.randint(1, self.max_family_size), remaining))
+            remaining -= family_sizes[-1]
+        return family_sizes
+
+    def get_tasks(self, family_sizes):
+        family_list = []
+        first_index = 0
+        for family_id, family_size in enumerate(family_sizes):
+            family_list.append((family_id, first_index, family_size))
+            first_index += family_size
+
+        extension = self.img_type.name.lower()
+        return [(self.pictures_dir, extension, self.seed, self.width, self.height, family_list[i:i + FAMILIES_PER_TASK])
+                for i in range(0, len(family_list), FAMILIES_PER_TASK)]
+
+    def generate(self):
+        '''
+        Write pictures and ground truth
+        :return: pictures folder, ground truth file
+        '''
+        family_sizes = self.get_family_sizes()
+        tasks = self.get_tasks(family_sizes)
+        self.logger.info(f"Generation of {self.nb_pictures} pictures in {len(family_sizes)} families, in {self.pictures_dir}")
+
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+
+        nodes = []
+        edges = []
+        done = 0
+        pool = multiprocessing.get_context("fork").Pool(self.nb_processes) if self.nb_processes > 1 else None
+        try:
+            # Results in order of the tasks : node ids are the indexes of the pictures
+            results_iterator = pool.imap(generate_families, tasks) if pool is not None else map(generate_families, tasks)
+            for relative_paths_per_family in results_iterator:
+                for relative_paths in relative_paths_per_family:
+                    first_id = len(nodes)
+                    nodes.extend({"id": first_id + i, "shape": "image", "image": pathlib.Path(p).name} for i, p in enumerate(relative_paths))
+                    edges.extend({"from": first_id + i, "to": first_id + j}
+                                 for i in range(len(relative_paths)) for j in range(len(relative_paths)) if i != j)
+
+                done += sum(len(relative_paths) for relative_paths in relative_paths_per_family)
+                self.logger.info(f"{done} pictures out of {self.nb_pictures} generated")
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+        # Compact, as the ground truth files of the real datasets
+        with self.ground_truth_path.open("w", encoding="utf-8") as f:
+            json.dump({"nodes": nodes, "edges": edges}, f, separators=(",", ":"))
+
+        self.logger.info(f"Ground truth of {len(edges)} edges written in {self.ground_truth_path}")
+        return self.pictures_dir, self.ground_truth_path
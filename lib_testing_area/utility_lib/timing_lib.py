@@ -0,0 +1,109 @@
+import time
+
+NB_BUCKETS = 64 # Histogram buckets : durations in [2^(i-1), 2^i[ nanoseconds
+
+
+class Stage_stats():
+    '''
+    Aggregated durations of one stage : count, total, extremes and a log2 histogram, in nanoseconds
+    '''
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = None
+        self.histogram = [0] * NB_BUCKETS
+
+    def add(self, duration_ns: int, count: int = 1):
+        self.count += count
+        self.total += duration_ns
+        if self.min is None or duration_ns < self.min: self.min = duration_ns
+        if self.max is None or duration_ns > self.max: self.max = duration_ns
+        self.histogram[min(duration_ns.bit_length(), NB_BUCKETS - 1)] += 1
+
+    def to_dict(self):
+        # In seconds, as other timings of the results. Histogram as [upper bound of the bucket, number of measures], empty buckets omitted
+        return {"COUNT": self.count,
+                "TOTAL": self.total / 1e9,
+                "MEAN": self.total / self.count / 1e9 if self.count > 0 else None,
+                "MIN": self.min / 1e9 if self.min is not None else None,
+                "MAX": self.max / 1e9 if self.max is not None else None,
+                "HISTOGRAM": [[2 ** i / 1e9, nb] for i, nb in enumerate(self.histogram) if nb > 0]}
+
+
+class Timed_stage():
+    # Context manager of one measure. Cheaper than contextlib.contextmanager for stages called per picture
+    __slots__ = ["timer", "name", "start_ns"]
+
+    def __init__(self, timer, name: str):
+        self.timer = timer
+        self.name = name
+        self.start_ns = None
+
+    def __enter__(self):
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.timer.add(self.name, time.perf_counter_ns() - self.start_ns)
+        return False
+
+
+class Disabled_stage():
+    # Shared context manager of a disabled timer : measures nothing
+    __slots__ = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        return False
+
+
+DISABLED_STAGE = Disabled_stage()
+
+
+class Stage_timer():
+    '''
+    Durations of named stages of a run (decode, match, ransac, ...), measured with perf_counter_ns.
+    Around a block :        with timer.stage("ransac"): ...
+    In loops :              start = timer.start() ... timer.stop("distance", start)
+    A disabled timer measures nothing, and its calls return at once. Stages may be nested (e.g. distance includes match).
+    '''
+
+    def __init__(self, enabled: bool = True, stages: dict = None, prefix: str = ""):
+        self.enabled = enabled
+        self.stages = stages if stages is not None else {} # name : Stage_stats
+        self.prefix = prefix
+
+    def get_child(self, prefix: str):
+        '''
+        Timer writing in the same stages, with prefixed names (e.g. stages of a cascade)
+        '''
+        return Stage_timer(enabled=self.enabled, stages=self.stages, prefix=self.prefix + prefix)
+
+    def stage(self, name: str):
+        if not self.enabled:
+            return DISABLED_STAGE
+        return Timed_stage(self, name)
+
+    def start(self):
+        if not self.enabled:
+            return None
+        return time.perf_counter_ns()
+
+    def stop(self, name: str, start_ns, count: int = 1):
+        if start_ns is None:
+            return
+        self.add(name, time.perf_counter_ns() - start_ns, count)
+
+    def add(self, name: str, duration_ns: int, count: int = 1):
+        name = self.prefix + name
+        curr_stats = self.stages.get(name)
+        if curr_stats is None:
+            curr_stats = self.stages[name] = Stage_stats()
+        curr_stats.add(duration_ns, count)
+
+    def to_dict(self):
+        return {name: curr_stats.to_dict() for name, curr_stats in sorted(self.stages.items())}
@@ -0,0 +1,92 @@
+import os
+import json
+import time
+import pathlib
+import threading
+
+from utility_lib.timing_lib import DISABLED_STAGE
+
+TRACE_FILE = "trace.json"
+MAX_EVENTS = 1000000 # Spans beyond are dropped : about 150 MB of json
+
+
+class Traced_span():
+    # Context manager of one span : a complete event ("X") of the trace
+    __slots__ = ["tracer", "name", "category", "args", "start_us"]
+
+    def __init__(self, tracer, name: str, category: str, args: dict):
+        self.tracer = tracer
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start_us = None
+
+    def __enter__(self):
+        self.start_us = time.perf_counter_ns() / 1000
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        event = {"name": self.name,
+                 "cat": self.category,
+                 "ph": "X",
+                 "ts": self.start_us,
+                 "dur": time.perf_counter_ns() / 1000 - self.start_us,
+                 "pid": os.getpid(),
+                 "tid": threading.get_ident()}
+        if self.args is not None:
+            event["args"] = self.args
+        self.tracer.events.append(event)
+        return False
+
+
+class Tracer():
+    '''
+    Spans of a run in the trace event format, viewable in Perfetto (ui.perfetto.dev) or chrome://tracing.
+    Around a block :        with tracer.span("load_pictures", "load"): ...
+    Spans repeated per picture or per target are sampled : one out of sampling_period is recorded.
+    Timestamps are the monotonic clock, shared by the processes of a machine : traces of parallel runs can be merged.
+    '''
+
+    def __init__(self, enabled: bool = True, sampling_period: int = 1, max_events: int = MAX_EVENTS):
+        if sampling_period < 1:
+            raise Exception(f"Sampling period of a trace should be at least 1 : {sampling_period}")
+        self.enabled = enabled
+        self.sampling_period = sampling_period
+        self.max_events = max_events
+
+        self.events = []
+        self.counters = {} # name : number of sampled spans asked
+        self.nb_dropped = 0
+
+    def span(self, name: str, category: str, sampled: bool = False, args: dict = None):
+        if not self.enabled:
+            return DISABLED_STAGE
+
+        if sampled:
+            nb_asked = self.counters.get(name, 0)
+            self.counters[name] = nb_asked + 1
+            if nb_asked % self.sampling_period != 0:
+                return DISABLED_STAGE
+
+        if len(self.events) >= self.max_events:
+            self.nb_dropped += 1
+            return DISABLED_STAGE
+
+        return Traced_span(self, name, category, args)
+
+    def save(self, file_path: pathlib.Path, process_name: str = None):
+        if not self.enabled:
+            return
+
+        # Name of the process in the viewer, instead of its pid
+        metadata_list = []
+        if process_name is not None:
+            metadata_list.append({"name": "process_name", "ph": "M", "pid": os.getpid(), "args": {"name": process_name}})
+
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        with file_path.open("w", encoding="utf-8") as f:
+            # Compact : traces of big runs are large
+            json.dump({"traceEvents": metadata_list + self.events,
+                       "displayTimeUnit": "ms",
+                       "otherData": {"SAMPLING_PERIOD": self.sampling_period,
+                                     "NB_DROPPED_SPANS": self.nb_dropped}}, f, separators=(",", ":"))